@@ -12,6 +12,7 @@ if (file_exists('config.php')) {
 }
 
 $savedDataFile = 'saved_data.json';
+$sitesFile = 'sites.json'; // Shared with app/site_ingest.py
 $forceRefresh = isset($_GET['force_refresh']) && $_GET['force_refresh'] === 'true';
 $specificSiteName = isset($_GET['site_name']) ? $_GET['site_name'] : null;
 $action = isset($_GET['action']) ? $_GET['action'] : null;
@@ -40,26 +41,7 @@ if (!$forceRefresh && file_exists($savedDataFile)) {
 
 // --- MAIN DATA FETCHING LOGIC ---
 
-$sitesToAnalyze = [
-    ['lat' => 31.8640, 'lon' => -101.4812, 'name' => "Garden City, TX", 'type' => "Wind + Grid"],
-    ['lat' => 31.7833, 'lon' => -102.2046, 'name' => "McCamey, TX", 'type' => "Wind + Grid"],
-    ['lat' => 32.3357, 'lon' => -97.7335, 'name' => "Wolf Hollow, TX", 'type' => "Natural Gas"],
-    ['lat' => 31.0000, 'lon' => -101.0000, 'name' => "Texas Oil Field", 'type' => "Flared Gas"],
-    ['lat' => 46.1416, 'lon' => -98.4662, 'name' => "Ellendale, ND", 'type' => "Wind + Grid"],
-    ['lat' => 46.9103, 'lon' => -98.7039, 'name' => "Jamestown, ND", 'type' => "Wind + Grid"],
-    ['lat' => 46.0000, 'lon' => -102.0000, 'name' => "ND Oil Field", 'type' => "Flared Gas"],
-    ['lat' => 41.5000, 'lon' => -99.6800, 'name' => "Nebraska Solar", 'type' => "Solar + Grid"],
-    ['lat' => 40.6995, 'lon' => -99.0819, 'name' => "Kearney, NE", 'type' => "Grid"],
-    ['lat' => 36.6000, 'lon' => -88.3121, 'name' => "Murray, KY", 'type' => "Grid"],
-    ['lat' => 40.7334, 'lon' => -80.9430, 'name' => "Hannibal, OH", 'type' => "Grid"],
-    ['lat' => 40.3137, 'lon' => -80.7530, 'name' => "Hopedale, OH", 'type' => "Grid"],
-    ['lat' => 41.0442, 'lon' => -83.6499, 'name' => "Findlay, OH", 'type' => "Grid"],
-    ['lat' => -25.4078, 'lon' => -54.5892, 'name' => "Paraguay Hydro", 'type' => "Hydroelectric"],
-    ['lat' => 32.3357, 'lon' => -97.7335, 'name' => "Granbury, TX", 'type' => "Natural Gas"],
-    ['lat' => 60.1700, 'lon' => 24.9400, 'name' => "Finland Pilot", 'type' => "Grid + Heat Recycle"],
-    ['lat' => 24.4539, 'lon' => 54.3773, 'name' => "Masdar City, Abu Dhabi", 'type' => "Grid + Clean Energy Certs"],
-    ['lat' => 24.5149, 'lon' => 54.3900, 'name' => "Mina Zayed, Abu Dhabi", 'type' => "Grid + Clean Energy Certs"]
-];
+$sitesToAnalyze = json_decode(file_get_contents($sitesFile), true);
 
 if ($specificSiteName) {
     $sitesToAnalyze = array_filter($sitesToAnalyze, function($site) use ($specificSiteName) {
@@ -0,0 +1,465 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import date
+from types import SimpleNamespace
+
+import openai
+
+from app.cache import DiskCache, TTLCache
+from app.portfolio import construct_portfolio
+from app.quotes import REFERENCE_PRICES, get_quote_service
+
+MODEL = "gpt-4o"
+TEMPERATURE = 0.7
+
+# Market inputs quoted to the model, completed with btc_price and
+# energy_price from the quote snapshot by get_market_conditions(). They are
+# part of the cache key, so any change in them naturally misses the cache.
+MARKET_CONDITIONS = {
+    "btc_implied_vol": 0.65,
+    "energy_implied_vol": 0.40,
+    "sentiment": "Moderately Bullish on BTC, Neutral on Energy",
+}
+
+AI_CACHE_TTL_SECONDS = 15 * 60
+AI_CACHE_MAX_ENTRIES = 256
+
+BATCH_MAX_ITEMS = 50
+BATCH_MAX_CONCURRENCY = 16
+BATCH_DEFAULT_CONCURRENCY = 4
+BATCH_DEFAULT_ITEM_TIMEOUT = 60.0
+# Overall limit on one batch; items not finished by then fail
+BATCH_DEADLINE_SECONDS = 120.0
+
+_cache = TTLCache(ttl_seconds=AI_CACHE_TTL_SECONDS, max_entries=AI_CACHE_MAX_ENTRIES)
+_disk_cache = None
+
+
+class StubChatClient:
+    """
+    Offline stand-in for openai.OpenAI() that returns a canned portfolio.
+
+    It exposes the same chat.completions.create(...) call shape and counts
+    calls, so caching can be exercised without network access. Enable it for
+    the app with AI_ANALYSIS_STUB=1.
+    """
+
+    def __init__(self, content=None, chunk_size=16, chunk_delay=0.0):
+        self.calls = 0
+        self.content = content
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature=None, stream=False, **kwargs):
+        self.calls += 1
+        content = self.content if self.content is not None else json.dumps(stub_portfolio(), indent=2)
+        if stream:
+            return self._stream(content)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)])
+
+    def _stream(self, content):
+        for start in range(0, len(content), self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            delta = SimpleNamespace(content=content[start:start + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta)])
+
+
+def stub_portfolio():
+    return {
+        "justification": "Stub response: a long BTC call provides positive delta and vega, "
+                         "while a short energy future sets the energy delta.",
+        "impact_to_portfolio_delta": 550.75,
+        "impact_to_portfolio_vega": 120.50,
+        "positions": [
+            {"Asset": "BTC", "Type": "Call Option", "Action": "Buy", "Quantity": 10,
+             "Strike Price": 75000, "Expiry Date": "2099-09-30", "Delta": 0.52, "Vega": 150.20},
+            {"Asset": "Energy", "Type": "Future", "Action": "Sell", "Quantity": 20,
+             "Strike Price": 60, "Expiry Date": "2099-09-30", "Delta": -20.00, "Vega": 0},
+        ],
+    }
+
+
+def get_disk_cache():
+    """Persistent tier, enabled by setting AI_ANALYSIS_CACHE_DIR (read after .env is loaded)."""
+    global _disk_cache
+    directory = os.getenv("AI_ANALYSIS_CACHE_DIR")
+    if directory and (_disk_cache is None or _disk_cache.directory != directory):
+        _disk_cache = DiskCache(directory, AI_CACHE_TTL_SECONDS)
+    return _disk_cache if directory else None
+
+
+def get_client():
+    if os.getenv("AI_ANALYSIS_STUB") == "1":
+        return StubChatClient()
+    return openai.OpenAI()
+
+
+def get_market_conditions():
+    """
+    MARKET_CONDITIONS plus BTC and energy prices, all from one quote snapshot.
+
+    A price with no quote (its source failed, e.g. a malformed BTC_PRICE)
+    falls back to its REFERENCE_PRICES default.
+    """
+    prices = dict(REFERENCE_PRICES, **get_quote_service().prices(tuple(REFERENCE_PRICES)))
+    return dict(MARKET_CONDITIONS, **prices)
+
+
+def normalize_params(data):
+    """Coerce request parameters to a canonical form so equivalent requests share a key."""
+    def number(value):
+        if value is None or value == "":
+            return None
+        return round(float(value), 6)
+
+    horizon = number(data.get('time_horizon'))
+    return {
+        "exposure": number(data.get('exposure')),
+        "btc_delta": number(data.get('btc_delta')),
+        "energy_delta": number(data.get('energy_delta')),
+        "vega": number(data.get('vega')),
+        "time_horizon": int(horizon) if horizon is not None else None,
+    }
+
+
+def cache_key(params, market, today):
+    return (
+        tuple(sorted(params.items())),
+        tuple(sorted(market.items())),
+        today,
+    )
+
+
+def build_prompt(params, market, today):
+    return f"""
+        As a sophisticated financial analyst for a Bitcoin-centric quantitative fund, your task is to construct a derivatives portfolio that matches the user's specified risk sensitivities (Greeks) and constraints.
+
+        User Parameters:
+        - Target Exposure Managed: {params['exposure']}% (The portion of the total portfolio this derivatives strategy should represent)
+        - Target BTC Price Delta: {params['btc_delta']} (The desired sensitivity of the position's value to a $1 change in Bitcoin's price)
+        - Target Energy Price Delta: {params['energy_delta']} (The desired sensitivity of the position's value to a $1 change in the price of energy/MWh)
+        - Target Vega: {params['vega']} (The desired sensitivity of the position's value to a 1% change in implied volatility)
+        - Time Horizon: {params['time_horizon']} days
+
+        Current Market Conditions:
+        - Today's Date: {today}
+        - Current BTC Price: ${market['btc_price']:,.0f}
+        - Current Energy Price: ${market['energy_price']:,.0f}/MWh
+        - BTC Implied Volatility: {market['btc_implied_vol']:.0%}
+        - Energy Implied Volatility: {market['energy_implied_vol']:.0%}
+        - Market Sentiment: {market['sentiment']}
+
+        Instructions:
+        1.  Propose a block of 2 to 5 derivatives positions. You can use options or futures on both BTC and Energy to achieve the target Greeks.
+        2.  For each position, specify:
+            - Asset: (BTC or Energy)
+            - Type: (e.g., Call Option, Put Option, Future)
+            - Action: (Buy or Sell)
+            - Quantity: (Number of contracts)
+            - Strike Price: (in USD)
+            - Expiry Date: (in YYYY-MM-DD format). **Crucially, this date must be in the future relative to today's date ({today}).**
+            - Delta: The individual position's delta.
+            - Vega: The individual position's vega.
+        3.  Provide a brief (2-3 sentence) justification for the overall strategy.
+        4.  Quantify the benefit of this strategy by calculating the total change it will have on the portfolio's overall risk profile. Provide this as "impact_to_portfolio_delta" and "impact_to_portfolio_vega".
+        5.  Format the entire response as a single JSON object. Do not include any other text, greetings, or explanations outside of the JSON object.
+
+        Example JSON structure:
+        {{
+          "justification": "This portfolio uses a long BTC call spread to achieve positive BTC delta and vega, while shorting an energy future to create the target negative energy delta. The overall structure is capital efficient and matches the specified time horizon.",
+          "impact_to_portfolio_delta": 550.75,
+          "impact_to_portfolio_vega": 120.50,
+          "positions": [
+            {{
+              "Asset": "BTC",
+              "Type": "Call Option",
+              "Action": "Buy",
+              "Quantity": 10,
+              "Strike Price": 75000,
+              "Expiry Date": "2025-09-30",
+              "Delta": 0.52,
+              "Vega": 150.20
+            }},
+            {{
+              "Asset": "Energy",
+              "Type": "Future",
+              "Action": "Sell",
+              "Quantity": 20,
+              "Strike Price": 60,
+              "Expiry Date": "2025-09-30",
+              "Delta": -20.00,
+              "Vega": 0
+            }}
+          ]
+        }}
+        """
+
+
+def parse_ai_response(content):
+    """Strip an optional markdown code fence and decode the JSON document."""
+    text = content.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text.startswith("json"):
+            text = text[4:]
+        if text.endswith("```"):
+            text = text[:-3]
+    return json.loads(text)
+
+
+def validate_analysis(result):
+    """Check the decoded document has the shape the dashboard renders."""
+    if not isinstance(result, dict):
+        raise ValueError("AI response is not a JSON object")
+    if not isinstance(result.get("positions"), list) or not result["positions"]:
+        raise ValueError("AI response has no positions")
+    if "justification" not in result:
+        raise ValueError("AI response has no justification")
+    return result
+
+
+def request_analysis(params, market, today, client=None):
+    """Ask the model for a portfolio; always a fresh call, no caching."""
+    client = client or get_client()
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": build_prompt(params, market, today)}],
+        temperature=TEMPERATURE,
+    )
+    return validate_analysis(parse_ai_response(response.choices[0].message.content))
+
+
+class PositionStreamParser:
+    """
+    Incrementally extracts complete objects from the "positions" array of a
+    JSON document that is still being generated.
+
+    feed() takes the next chunk of model output and returns every position
+    object that became complete with it. The scan is a single pass over the
+    text: string/escape state and nesting depth carry over between chunks.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        if self._done:
+            return []
+
+        if not self._in_array:
+            key = self.text.find('"positions"')
+            if key < 0:
+                return []
+            bracket = self.text.find("[", key)
+            if bracket < 0:
+                return []
+            self._in_array = True
+            self._pos = bracket + 1
+
+        positions = []
+        text = self.text
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                if self._depth == 0:
+                    # End of the positions array itself
+                    self._done = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    positions.append(json.loads(text[self._object_start:self._pos + 1]))
+                    self._object_start = None
+            self._pos += 1
+        return positions
+
+
+def stream_ai_analysis(data, client=None):
+    """
+    Generate streaming events for a request body.
+
+    Yields dicts of three kinds: {"type": "delta", "content": ...} for raw model
+    output as it arrives, {"type": "position", "position": {...}} as soon as each
+    position object is complete, and finally {"type": "result", "result": {...}}
+    with the validated document. A cached result is replayed as positions plus
+    result without calling the model. The final result is cached like
+    get_ai_analysis results.
+    """
+    params = normalize_params(data)
+    market = get_market_conditions()
+    today = date.today().strftime("%Y-%m-%d")
+    key = cache_key(params, market, today)
+    disk_cache = get_disk_cache()
+
+    cached = _cache.get_fresh(key)
+    if cached is None and disk_cache is not None:
+        cached = disk_cache.get(key)
+    if cached is not None:
+        for position in cached["positions"]:
+            yield {"type": "position", "position": position}
+        yield {"type": "result", "result": cached, "cached": True}
+        return
+
+    client = client or get_client()
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": build_prompt(params, market, today)}],
+        temperature=TEMPERATURE,
+        stream=True,
+    )
+
+    parser = PositionStreamParser()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if not content:
+            continue
+        yield {"type": "delta", "content": content}
+        for position in parser.feed(content):
+            yield {"type": "position", "position": position}
+
+    result = validate_analysis(parse_ai_response(parser.text))
+    _cache.set(key, result)
+    if disk_cache is not None:
+        disk_cache.set(key, result)
+    yield {"type": "result", "result": result, "cached": False}
+
+
+def get_ai_analysis(data, client=None):
+    """
+    Cached portfolio recommendation for a request body.
+
+    Lookups go memory (LRU+TTL) -> disk (if configured) -> model. Identical
+    requests arriving while a model call is in progress wait for that call.
+    """
+    params = normalize_params(data)
+    market = get_market_conditions()
+    today = date.today().strftime("%Y-%m-%d")
+    key = cache_key(params, market, today)
+    disk_cache = get_disk_cache()
+
+    def load():
+        if disk_cache is not None:
+            cached = disk_cache.get(key)
+            if cached is not None:
+                return cached
+        result = request_analysis(params, market, today, client=client)
+        if disk_cache is not None:
+            disk_cache.set(key, result)
+        return result
+
+    return _cache.get(key, load)
+
+
+def use_local_engine(data):
+    """The request's "engine" field, or AI_ANALYSIS_ENGINE, selects "local" or "llm" (default)."""
+    engine = (data or {}).get('engine') or os.getenv("AI_ANALYSIS_ENGINE", "llm")
+    return engine == "local"
+
+
+def get_local_analysis(data):
+    """Portfolio for a request body from the deterministic local constructor; no model call."""
+    return construct_portfolio(normalize_params(data), get_market_conditions())
+
+
+def get_ai_analysis_batch(items, max_concurrency=BATCH_DEFAULT_CONCURRENCY,
+                          item_timeout=BATCH_DEFAULT_ITEM_TIMEOUT, client=None,
+                          deadline=BATCH_DEADLINE_SECONDS):
+    """
+    Run get_ai_analysis for many parameter sets at once.
+
+    At most max_concurrency items run at a time and each is abandoned after
+    item_timeout seconds of running. An abandoned call is left to finish on
+    its own daemon thread and gives up its slot at once, so a hung model call
+    never holds back the items queued behind it. Items still running or
+    queued when the batch deadline (seconds) passes fail too. Results come
+    back in input order, one dict per item with either "result" or "error",
+    so one failure does not sink the batch. Duplicate items share a single
+    model call through the cache.
+    """
+    max_concurrency = max(1, min(int(max_concurrency), BATCH_MAX_CONCURRENCY))
+    results = [None] * len(items)
+    started = {}
+    finished = queue.Queue()
+
+    def run(index, item):
+        try:
+            finished.put((index, True, get_ai_analysis(item, client=client)))
+        except Exception as e:
+            finished.put((index, False, str(e)))
+
+    def fail(index, error, now):
+        results[index] = {"index": index, "ok": False, "error": error,
+                          "elapsed_ms": (now - started[index]) * 1000.0 if index in started else 0.0}
+
+    batch_end = time.monotonic() + deadline
+    queued = deque(range(len(items)))
+    running = set()
+    while True:
+        now = time.monotonic()
+        while queued and len(running) < max_concurrency and now < batch_end:
+            index = queued.popleft()
+            started[index] = now
+            running.add(index)
+            threading.Thread(target=run, args=(index, items[index]), daemon=True).start()
+        if not running:
+            break
+
+        # Wake up for the next completion or the earliest running deadline
+        wake = min(min(started[i] for i in running) + item_timeout, batch_end)
+        try:
+            index, ok, value = finished.get(timeout=max(0.0, wake - now))
+        except queue.Empty:
+            pass
+        else:
+            # Late answers from abandoned calls are dropped
+            if index in running:
+                running.discard(index)
+                elapsed_ms = (time.monotonic() - started[index]) * 1000.0
+                key = "result" if ok else "error"
+                results[index] = {"index": index, "ok": ok, key: value, "elapsed_ms": elapsed_ms}
+
+        now = time.monotonic()
+        for index in [i for i in running if now - started[i] >= item_timeout or now >= batch_end]:
+            running.discard(index)
+            if now - started[index] >= item_timeout:
+                fail(index, f"Timed out after {item_timeout:g}s", now)
+            else:
+                fail(index, f"Timed out at the {deadline:g}s batch deadline", now)
+
+    for index in queued:
+        fail(index, f"Not started before the {deadline:g}s batch deadline", time.monotonic())
+    return results
+
+
+def get_ai_cache_stats():
+    return _cache.stats()
@@ -0,0 +1,270 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+from app.hedge_ratios import load_inventory
+
+# Per-site power budget, in the inventory's power units, when none is configured
+DEFAULT_POWER_LIMIT = 1_000_000.0
+
+# Price each inventory section's output is sold at
+OUTPUT_PRICES = {"miners": ("hashrate", "hash_price"), "inference": ("tokens", "token_price")}
+ALLOCATION_PRICE_FIELDS = ("hash_price", "token_price", "energy_price")
+
+
+def inventory_items(inventory):
+    """
+    Flatten the inventory into parallel arrays.
+
+    Returns:
+        Dict with item "names", per-unit "output" and "power", and the
+        "price_field" each item's output sells at
+    """
+    names, output, power, fields = [], [], [], []
+    for section, (output_key, price_field) in OUTPUT_PRICES.items():
+        for name, spec in inventory.get(section, {}).items():
+            names.append(name)
+            output.append(float(spec[output_key]))
+            power.append(float(spec["power"]))
+            fields.append(price_field)
+    return {"names": names, "output": np.array(output), "power": np.array(power), "price_field": fields}
+
+
+def unit_margins(items, prices):
+    """Revenue minus energy cost per tick of one unit of each item."""
+    price = np.array([prices[field] for field in items["price_field"]], dtype=float)
+    return items["output"] * price - items["power"] * float(prices["energy_price"])
+
+
+def ratio_order(margin, power):
+    """Items with a positive margin, best margin per unit of power first."""
+    return sorted((i for i in range(len(margin)) if margin[i] > 0), key=lambda i: (-margin[i] / power[i], i))
+
+
+def solve_knapsack(margin, power, limit, caps, incumbent=None, order=None):
+    """
+    Integer counts maximizing margin . counts subject to power . counts <= limit
+    and 0 <= counts <= caps.
+
+    Depth-first branch and bound over items in decreasing margin-per-power
+    order. Each branch is bounded by its LP relaxation (fill the remaining
+    budget greedily by ratio, the last item fractionally), and within an
+    item's loop the bound only falls as fewer units are taken, so the loop
+    stops at the first pruned count. A feasible incumbent, such as the
+    previous tick's allocation, starts the search with a tight lower bound.
+    With a handful of item types this runs on plain lists; numpy's per-call
+    overhead would dominate.
+
+    Returns:
+        (counts, nodes): the optimal counts as a list and the number of search nodes visited
+    """
+    margin = [float(v) for v in margin]
+    power = [float(v) for v in power]
+    n = len(margin)
+    order = ratio_order(margin, power) if order is None else order
+    capped = [min(int(caps[i]), int(limit // power[i])) for i in range(n)]
+    order = [i for i in order if capped[i] > 0]
+    m = [margin[i] for i in order]
+    p = [power[i] for i in order]
+    cap = [capped[i] for i in order]
+    k = len(order)
+
+    best_counts = [0] * n
+    best = 0.0
+    if incumbent is not None:
+        # Keep the previous units that are still worth running, then drop
+        # units of the worst-ratio items until they fit the budget
+        start = [0] * n
+        for i in order:
+            start[i] = min(int(incumbent[i]), capped[i])
+        excess = sum(c * w for c, w in zip(start, power)) - limit
+        for i in reversed(order):
+            if excess <= 0:
+                break
+            drop = min(start[i], -int(-excess // power[i]))
+            start[i] -= drop
+            excess -= drop * power[i]
+        value = sum(c * v for c, v in zip(start, margin))
+        if value > best:
+            best, best_counts = value, start
+
+    chosen = [0] * k
+    nodes = 0
+
+    def bound(j, remaining, value):
+        for i in range(j, k):
+            take = min(cap[i], remaining / p[i])
+            value += take * m[i]
+            remaining -= take * p[i]
+            if remaining <= 0:
+                break
+        return value
+
+    def search(j, remaining, value):
+        nonlocal best, best_counts, nodes
+        nodes += 1
+        if value > best:
+            best = value
+            best_counts = [0] * n
+            for i, c in zip(order[:j], chosen[:j]):
+                best_counts[i] = c
+        if j == k:
+            return
+        for c in range(min(cap[j], int(remaining // p[j])), -1, -1):
+            rest = remaining - c * p[j]
+            gained = value + c * m[j]
+            if bound(j + 1, rest, gained) <= best * (1 + 1e-12):
+                # Fewer units of the best-ratio item cannot raise the bound
+                break
+            chosen[j] = c
+            search(j + 1, rest, gained)
+        chosen[j] = 0
+
+    search(0, float(limit), 0.0)
+    return best_counts, nodes
+
+
+class AllocationOptimizer:
+    """
+    Splits each site's power budget across the miner and inference inventory.
+
+    Every tick, each site gets the integer unit counts that maximize revenue
+    minus energy cost at the tick's hash, token and energy prices, within
+    its power limit and the units it has. Solutions are kept per site and
+    warm-start the next tick's search; a tick whose margins and limits
+    match the last one reuses the stored solution without searching.
+    """
+
+    def __init__(self, inventory=None, sites=None):
+        self.items = inventory_items(inventory if inventory is not None else load_inventory())
+        self._power = self.items["power"].tolist()
+        self.sites = {}
+        self._previous = {}
+        self.stats = {"ticks": 0, "solves": 0, "reused": 0, "nodes": 0}
+        for name, config in (sites or {}).items():
+            self.set_site(name, **config)
+
+    def set_site(self, name, power_limit=DEFAULT_POWER_LIMIT, counts=None):
+        """Configure one site; counts maps item name to units available (unbounded if omitted)."""
+        caps = [sys.maxsize] * len(self.items["names"])
+        for item, units in (counts or {}).items():
+            caps[self.items["names"].index(item)] = int(units)
+        self.sites[name] = {"power_limit": float(power_limit), "caps": tuple(caps)}
+
+    def remove_site(self, name):
+        self.sites.pop(name, None)
+        self._previous.pop(name, None)
+
+    def _describe(self, counts, margin, power_limit, energy_price):
+        power = sum(c * w for c, w in zip(counts, self._power))
+        energy_cost = power * energy_price
+        value = sum(c * v for c, v in zip(counts, margin))
+        return {
+            "counts": dict(zip(self.items["names"], counts)),
+            "power": power,
+            "power_limit": power_limit,
+            "revenue": value + energy_cost,
+            "energy_cost": energy_cost,
+            "margin": value,
+        }
+
+    def solve_site(self, name, prices, margin=None, order=None, solved=None):
+        site = self.sites[name]
+        if margin is None:
+            margin = unit_margins(self.items, prices).tolist()
+        key = (tuple(margin), site["power_limit"], site["caps"])
+        previous = self._previous.get(name)
+        if previous is not None and previous[0] == key:
+            self.stats["reused"] += 1
+            counts = previous[1]
+        elif solved is not None and key in solved:
+            self.stats["reused"] += 1
+            counts = solved[key]
+            self._previous[name] = (key, counts)
+        else:
+            counts, nodes = solve_knapsack(margin, self._power, site["power_limit"], site["caps"],
+                                           incumbent=previous[1] if previous is not None else None,
+                                           order=order)
+            self.stats["solves"] += 1
+            self.stats["nodes"] += nodes
+            self._previous[name] = (key, counts)
+        if solved is not None:
+            solved[key] = counts
+        return self._describe(counts, margin, site["power_limit"], float(prices["energy_price"]))
+
+    def solve(self, prices):
+        """
+        Allocate every site for one tick of prices. Sites with the same
+        power limit and units are solved once.
+
+        Returns:
+            {site name: {"counts", "power", "power_limit", "revenue", "energy_cost", "margin"}}
+        """
+        self.stats["ticks"] += 1
+        margin = unit_margins(self.items, prices).tolist()
+        order = ratio_order(margin, self._power)
+        solved = {}
+        return {name: self.solve_site(name, prices, margin, order, solved) for name in self.sites}
+
+
+_optimizer = None
+_optimizer_lock = threading.Lock()
+
+
+def allocate(site_names, prices, power_limit=DEFAULT_POWER_LIMIT):
+    """
+    Allocate the named sites for one tick on a shared optimizer, so warm
+    starts carry across requests.
+
+    Sites are configured and solved under one lock, so a concurrent request
+    with another power limit cannot change the limits mid-solve. Sites not
+    in site_names are dropped with their warm starts.
+    """
+    global _optimizer
+    with _optimizer_lock:
+        if _optimizer is None:
+            _optimizer = AllocationOptimizer()
+        names = set(site_names)
+        for name in [name for name in _optimizer.sites if name not in names]:
+            _optimizer.remove_site(name)
+        for name in site_names:
+            site = _optimizer.sites.get(name)
+            if site is None or site["power_limit"] != power_limit:
+                _optimizer.set_site(name, power_limit=power_limit)
+        return _optimizer.solve(prices)
+
+
+def reset_optimizer():
+    global _optimizer
+    with _optimizer_lock:
+        _optimizer = None
+
+
+def benchmark(n_sites=1000, ticks=100, seed=0):
+    from app.price_history import load_price_history, synthetic_history
+
+    rng = np.random.default_rng(seed)
+    history = load_price_history(synthetic_history(ticks))
+    inventory = load_inventory()
+    optimizer = AllocationOptimizer(inventory, {
+        f"Site {i}": {"power_limit": float(rng.uniform(2e5, 2e6)),
+                      "counts": {name: int(rng.integers(0, 200)) for name in inventory_items(inventory)["names"]}}
+        for i in range(n_sites)
+    })
+    timings = []
+    for t in range(ticks):
+        prices = {field: float(history[field][t]) for field in ALLOCATION_PRICE_FIELDS}
+        start = time.perf_counter()
+        optimizer.solve(prices)
+        timings.append(time.perf_counter() - start)
+    return {"sites": n_sites, "ticks": ticks, "first_seconds": timings[0],
+            "warm_seconds": float(np.mean(timings[1:])), "stats": dict(optimizer.stats)}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['sites']:,} sites: first tick {result['first_seconds'] * 1e3:.1f} ms, "
+          f"warm-started ticks {result['warm_seconds'] * 1e3:.1f} ms on average "
+          f"({result['stats']['nodes'] / max(result['stats']['solves'], 1):.1f} nodes per solve)")
@@ -1,7 +1,9 @@
-import random
+from app.quotes import get_quotes
+
 
 def get_current_btc_price():
-    base_price = 103512.58
-    fluctuation = random.uniform(-100, 100)
-    price = base_price + fluctuation
-    return f"${price:,.2f}"
+    """BTC price from the shared quote snapshot, formatted for display."""
+    quote = get_quotes(("btc_price",))["quotes"]["btc_price"]
+    if quote is None:
+        return "Unavailable"
+    return f"${quote['price']:,.2f}"
@@ -0,0 +1,135 @@
+import time
+
+import numpy as np
+
+from app.hedge_ratios import fleet_hashrate, fleet_power, load_inventory
+from app.price_history import load_price_history, synthetic_history
+
+DEFAULT_INTERVALS = (1, 3, 6, 12, 24, 48, 96, 144, 288, 576)
+DEFAULT_HEDGE_RATIOS = np.round(np.linspace(0.0, 1.0, 21), 2)
+DEFAULT_COST_BPS = 5.0
+
+# Policies simulated per vectorized pass; each pass holds a few
+# (policies x ticks x 2) arrays
+CHUNK_POLICIES = 128
+
+
+def policy_grid(intervals=DEFAULT_INTERVALS, hedge_ratios=DEFAULT_HEDGE_RATIOS):
+    """Every (rebalance interval, hedge ratio) pair as two parallel arrays."""
+    interval, ratio = np.meshgrid(np.asarray(intervals, dtype=int), np.asarray(hedge_ratios, dtype=float),
+                                  indexing="ij")
+    return {"interval": interval.ravel(), "hedge_ratio": ratio.ravel()}
+
+
+def _hedge_chunk(prices, exposure, remaining, interval, ratio, cost_rate, fixed_cost):
+    """
+    Hedge P&L and trading costs per tick for a chunk of policies.
+
+    Returns:
+        (pnl, cost, trades): (P, T) arrays of hedge P&L and costs, and (P,) trade counts
+    """
+    T = prices.shape[0]
+    t = np.arange(T)
+    # Position held at t is the target set at the last rebalance at or before t
+    last = (t[None, :] // interval[:, None]) * interval[:, None]
+    position = -ratio[:, None, None] * remaining[last][:, :, None] * exposure[None, None, :]
+
+    pnl = np.zeros((interval.size, T))
+    pnl[:, 1:] = np.einsum("ptk,tk->pt", position[:, :-1], np.diff(prices, axis=0))
+
+    traded = np.abs(np.diff(position, axis=1, prepend=0.0))
+    cost = cost_rate * np.einsum("ptk,tk->pt", traded, prices)
+    trading = traded.sum(axis=2) > 0
+    cost += fixed_cost * trading
+    return pnl, cost, trading.sum(axis=1)
+
+
+def backtest(history, hashrate, power, intervals=DEFAULT_INTERVALS, hedge_ratios=DEFAULT_HEDGE_RATIOS,
+             cost_bps=DEFAULT_COST_BPS, fixed_cost=0.0, chunk_policies=CHUNK_POLICIES):
+    """
+    Replay recorded prices for a miner fleet under many delta-hedging policies at once.
+
+    The fleet earns hashrate x hash_price and pays power x energy_price every
+    tick until the end of the history. Its economic P&L is realized margin plus
+    the change in value of the production still to come, marked at current
+    prices. A policy rebalances every interval ticks to short hedge_ratio of
+    that remaining exposure, using hash and energy price contracts, and pays
+    cost_bps of traded notional plus fixed_cost per rebalance.
+
+    Time is vectorized as well as policies: the position each policy holds at
+    every tick is gathered from its last rebalance, so one pass of array
+    operations values a whole chunk of policies over the whole history.
+
+    Returns:
+        Dict with "policies", cumulative "unhedged" (T,) and "hedged" (P, T) P&L,
+        and per-policy "summary" arrays: final_pnl, pnl_vol, variance_reduction,
+        total_cost, trades
+    """
+    prices = np.column_stack([history["hash_price"], history["energy_price"]])
+    T = prices.shape[0]
+    if T < 2:
+        raise ValueError("At least two price points are needed to backtest")
+    exposure = np.array([hashrate, -power])  # margin per tick per unit of price
+    remaining = (T - 1 - np.arange(T)).astype(float)
+
+    margin = prices @ exposure
+    value = np.cumsum(margin) + remaining * margin
+    unhedged = value - value[0]
+    unhedged_changes = np.diff(unhedged, prepend=0.0)
+
+    policies = policy_grid(intervals, hedge_ratios)
+    P = policies["interval"].size
+    hedged = np.empty((P, T))
+    total_cost = np.empty(P)
+    trades = np.empty(P, dtype=int)
+    for start in range(0, P, chunk_policies):
+        chunk = slice(start, start + chunk_policies)
+        pnl, cost, count = _hedge_chunk(prices, exposure, remaining, policies["interval"][chunk],
+                                        policies["hedge_ratio"][chunk], cost_bps / 1e4, fixed_cost)
+        hedged[chunk] = unhedged + np.cumsum(pnl - cost, axis=1)
+        total_cost[chunk] = cost.sum(axis=1)
+        trades[chunk] = count
+
+    changes = np.diff(hedged, axis=1, prepend=0.0)
+    unhedged_var = unhedged_changes.var()
+    return {
+        "policies": policies,
+        "unhedged": unhedged,
+        "hedged": hedged,
+        "summary": {
+            "final_pnl": hedged[:, -1],
+            "pnl_vol": changes.std(axis=1),
+            "variance_reduction": 1.0 - changes.var(axis=1) / unhedged_var if unhedged_var > 0 else np.zeros(P),
+            "total_cost": total_cost,
+            "trades": trades,
+        },
+    }
+
+
+def best_policies(result, count=5, key="pnl_vol"):
+    """The count policies with the lowest summary[key], as dicts."""
+    order = np.argsort(result["summary"][key], kind="stable")[:count]
+    return [
+        dict({name: values[i].item() for name, values in result["policies"].items()},
+             **{name: values[i].item() for name, values in result["summary"].items()})
+        for i in order
+    ]
+
+
+def benchmark(n=8_640):
+    history = load_price_history(synthetic_history(n))
+    inventory = load_inventory()
+    hashrate, power = fleet_hashrate(inventory), fleet_power(inventory)
+    start = time.perf_counter()
+    result = backtest(history, hashrate, power)
+    return {"ticks": n, "policies": result["hedged"].shape[0], "seconds": time.perf_counter() - start,
+            "best": best_policies(result, 3)}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['policies']} policies over {result['ticks']:,} ticks in {result['seconds']:.2f} s")
+    for policy in result["best"]:
+        print(f"  every {policy['interval']:>3} ticks, ratio {policy['hedge_ratio']:.2f}: "
+              f"variance -{policy['variance_reduction']:.1%}, cost {policy['total_cost']:,.0f}, "
+              f"{policy['trades']} trades")
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.fileio import atomic_write_json
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value: Any, stored_at: float):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class _Flight:
+    """A single in-progress load that concurrent callers wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+    Thread-safe keyed cache with stale-while-revalidate and single-flight loads.
+
+    A fresh entry (younger than ttl_seconds) is returned directly. A stale entry
+    (younger than ttl_seconds + stale_seconds) is still returned, while one
+    background refresh brings it up to date. Anything older is a miss: the first
+    caller runs the loader and every concurrent caller for the same key waits for
+    that one result instead of starting its own load.
+
+    With max_entries set the cache is also bounded: the least recently used
+    entry is evicted when a new one would exceed the limit.
+    """
+
+    def __init__(self,
+                 ttl_seconds: float,
+                 stale_seconds: float = 0.0,
+                 max_entries: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "errors": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader at most once per expiry."""
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.stored_at
+                if age < self.ttl_seconds:
+                    self._stats["hits"] += 1
+                    self._entries.move_to_end(key)
+                    return entry.value
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._stats["stale_hits"] += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._inflight:
+                        flight = self._inflight[key] = _Flight()
+                        threading.Thread(target=self._load, args=(key, loader, flight),
+                                         daemon=True).start()
+                    return entry.value
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                self._stats["misses"] += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+
+        if leader:
+            self._load(key, loader, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the stored value for key regardless of age, without loading."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def get_fresh(self, key: Hashable) -> Optional[Any]:
+        """Return the value for key only if it is within its TTL, without loading."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.clock() - entry.stored_at >= self.ttl_seconds:
+                return None
+            self._stats["hits"] += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value as fresh."""
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every key when none is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the current number of entries."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # Caller holds self._lock
+        self._entries[key] = _Entry(value, self.clock())
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: _Flight) -> None:
+        try:
+            value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+        else:
+            flight.value = value
+            with self._lock:
+                self._stats["loads"] += 1
+                self._store(key, value)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+
+class DiskCache:
+    """
+    Persistent JSON cache tier: one file per key under a directory.
+
+    Keys are hashed into file names and every write goes to a temporary file
+    that is renamed into place, so readers never see a partial entry. Entries
+    older than ttl_seconds (by wall-clock time) are treated as missing.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            with open(self._path(key), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - record.get("stored_at", 0) >= self.ttl_seconds:
+            return None
+        return record.get("value")
+
+    def set(self, key: Hashable, value: Any) -> None:
+        atomic_write_json(self._path(key), {"stored_at": time.time(), "value": value}, fsync=False)
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.cache import DiskCache
+from app.forecasting import EWMAForecaster
+from app.garch import GarchModel
+from app.price_history import PRICE_FIELDS, load_price_history, log_returns, synthetic_history
+from app.pricing import norm_ppf
+
+DEFAULT_HORIZONS = (1, 12, 288)
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_MIN_TRAIN = 200
+RESULTS_DIR = "evaluation_results"
+
+
+class RandomWalkForecaster:
+    """Baseline: no drift, bands from the sample vol of the last window returns."""
+
+    def __init__(self, fields=PRICE_FIELDS, window=288):
+        self.fields = tuple(fields)
+        self.window = window
+        self.last_price = None
+        self.vol = None
+
+    def fit(self, history):
+        recent = {f: history[f][-self.window - 1:] for f in self.fields}
+        returns = log_returns(recent, self.fields)
+        self.vol = returns.std(axis=0, ddof=1)
+        self.last_price = np.array([history[f][-1] for f in self.fields])
+
+    def forecast(self, horizon, confidence=DEFAULT_CONFIDENCE):
+        z = float(norm_ppf(0.5 + confidence / 2.0))
+        width = z * self.vol * math.sqrt(horizon)
+        return {"price": self.last_price, "lower": self.last_price * np.exp(-width),
+                "upper": self.last_price * np.exp(width)}
+
+
+class GarchForecaster:
+    """Driftless price forecast with GARCH(1,1) bands, refitted every refit_every ticks."""
+
+    def __init__(self, fields=PRICE_FIELDS, refit_every=288):
+        self.fields = tuple(fields)
+        self.refit_every = refit_every
+        self.model = None
+
+    def fit(self, history):
+        model = self.model
+        if model is None or model.ticks_since_fit >= self.refit_every:
+            self.model = GarchModel(self.fields).fit(history)
+            return
+        start = int(np.searchsorted(history["timestamp"], model.last_timestamp, side="right"))
+        for i in range(start, history["timestamp"].size):
+            model.update([history[f][i] for f in self.fields], history["timestamp"][i])
+
+    def forecast(self, horizon, confidence=DEFAULT_CONFIDENCE):
+        z = float(norm_ppf(0.5 + confidence / 2.0))
+        last = np.exp(self.model.last_log_price)
+        width = z * self.model.forecast([horizon])["horizon_vol"][0]
+        return {"price": last, "lower": last * np.exp(-width), "upper": last * np.exp(width)}
+
+
+# config["model"] -> forecaster class; config["params"] are its keyword arguments
+FORECASTERS = {
+    "ewma": EWMAForecaster,
+    "random_walk": RandomWalkForecaster,
+    "garch": GarchForecaster,
+}
+
+
+def history_digest(history):
+    digest = hashlib.sha256()
+    for key in sorted(history):
+        digest.update(key.encode("utf-8"))
+        digest.update(np.ascontiguousarray(history[key]).tobytes())
+    return digest.hexdigest()
+
+
+def run_key(config, history, horizons, confidence, min_train, step):
+    """Hash identifying one evaluation run: the config, the data and the split settings."""
+    payload = {
+        "config": config,
+        "data": history_digest(history),
+        "horizons": [int(h) for h in horizons],
+        "confidence": confidence,
+        "min_train": min_train,
+        "step": step,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def rolling_origins(n_points, horizons, min_train=DEFAULT_MIN_TRAIN, step=1):
+    """Index of the last training point of each split; every horizon is observable from each."""
+    return np.arange(min_train - 1, n_points - max(horizons), step)
+
+
+def _forecast_block(config, history, origins, horizons, confidence):
+    """
+    Forecasts from each origin of a contiguous block, by one forecaster walked forward.
+
+    Each origin hands the forecaster views of the history up to it, without
+    copying. EWMA reads only the ticks after the last one it has seen, the
+    random walk only its last window of returns, and GARCH filters new ticks
+    one at a time but refits on the whole prefix every refit_every ticks, so
+    its block cost is O(n) per refit rather than per origin.
+
+    Returns:
+        (3, len(origins), len(horizons), k) array of price, lower, upper
+    """
+    forecaster = FORECASTERS[config["model"]](**config.get("params", {}))
+    out = np.empty((3, len(origins), len(horizons), len(forecaster.fields)))
+    for i, origin in enumerate(origins):
+        forecaster.fit({key: values[:origin + 1] for key, values in history.items()})
+        for j, h in enumerate(horizons):
+            result = forecaster.forecast(h, confidence)
+            out[0, i, j], out[1, i, j], out[2, i, j] = result["price"], result["lower"], result["upper"]
+    return out
+
+
+def evaluate(config, history, horizons=DEFAULT_HORIZONS, confidence=DEFAULT_CONFIDENCE,
+             min_train=DEFAULT_MIN_TRAIN, step=1, workers=1, store=None):
+    """
+    Rolling-origin evaluation of one forecaster config.
+
+    Origins are split into contiguous blocks and spread across a process pool.
+    With a store (see get_results_store()), results are saved under run_key()
+    and an unchanged run is returned from the store without recomputing.
+
+    Args:
+        config: {"model": name in FORECASTERS, "params": {...}}
+        history: Output of price_history.load_price_history()
+        horizons: Forecast horizons in ticks
+        min_train: Price points available at the first origin
+        step: Ticks between origins
+
+    Returns:
+        Dict with the config, its run key, origin count, elapsed_ms, "cached", and
+        per-horizon {field: {"mae", "rmse", "coverage"}}
+    """
+    if config.get("model") not in FORECASTERS:
+        raise ValueError(f"Unknown forecaster {config.get('model')!r}")
+    horizons = sorted(int(h) for h in horizons)
+    key = run_key(config, history, horizons, confidence, min_train, step)
+    if store is not None:
+        stored = store.get(key)
+        if stored is not None:
+            return dict(stored, cached=True)
+
+    start = time.perf_counter()
+    n_points = history["timestamp"].size
+    origins = rolling_origins(n_points, horizons, min_train, step)
+    if origins.size == 0:
+        raise ValueError("History is too short for these horizons and min_train")
+
+    blocks = [b for b in np.array_split(origins, max(workers, 1) * 2) if b.size]
+    args = [(config, history, block, horizons, confidence) for block in blocks]
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            forecasts = np.concatenate(list(executor.map(_forecast_block, *zip(*args))), axis=1)
+    else:
+        forecasts = np.concatenate([_forecast_block(*a) for a in args], axis=1)
+
+    fields = FORECASTERS[config["model"]](**config.get("params", {})).fields
+    prices = np.column_stack([history[f] for f in fields])
+    actual = np.stack([prices[origins + h] for h in horizons], axis=1)
+    error = forecasts[0] - actual
+    covered = (actual >= forecasts[1]) & (actual <= forecasts[2])
+
+    result = {
+        "config": config,
+        "key": key,
+        "origins": int(origins.size),
+        "confidence": confidence,
+        "horizons": [
+            {
+                "horizon": h,
+                "fields": {
+                    field: {
+                        "mae": float(np.abs(error[:, j, i]).mean()),
+                        "rmse": float(np.sqrt((error[:, j, i] ** 2).mean())),
+                        "coverage": float(covered[:, j, i].mean()),
+                    }
+                    for i, field in enumerate(fields)
+                },
+            }
+            for j, h in enumerate(horizons)
+        ],
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    if store is not None:
+        store.set(key, result)
+    return dict(result, cached=False)
+
+
+def compare(configs, history, **options):
+    """Evaluate several configs on the same splits; returns results in config order."""
+    return [evaluate(config, history, **options) for config in configs]
+
+
+def get_results_store(directory=None):
+    """Persistent store of evaluation results; entries never expire (the key covers the data)."""
+    return DiskCache(directory or os.getenv("EVALUATION_RESULTS_DIR", RESULTS_DIR), float("inf"))
+
+
+def benchmark(n=3_000, workers=None):
+    history = load_price_history(synthetic_history(n))
+    workers = workers or os.cpu_count() or 1
+    configs = [{"model": "random_walk"}, {"model": "ewma"},
+               {"model": "ewma", "params": {"variance_decay": 0.97}}]
+    start = time.perf_counter()
+    results = compare(configs, history, step=5, workers=workers)
+    return {"n": n, "workers": workers, "seconds": time.perf_counter() - start, "results": results}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{len(result['results'])} forecasters over {result['n']:,} ticks "
+          f"({result['workers']} workers): {result['seconds']:.2f} s")
+    for r in result["results"]:
+        day = r["horizons"][-1]["fields"]["hash_price"]
+        print(f"  {json.dumps(r['config'])}: hash_price +{r['horizons'][-1]['horizon']} ticks "
+              f"RMSE {day['rmse']:.4f}, coverage {day['coverage']:.0%}")
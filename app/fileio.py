@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def atomic_write(path, write, binary=False, fsync=True):
+    """
+    Write a file so readers see either the old or the new contents, never a mix.
+
+    write(f) fills a temporary file in the same directory, which is flushed
+    (and fsynced unless fsync is off) and then renamed over path. The
+    temporary file is removed if anything fails.
+
+    Returns:
+        The (mtime_ns, size) signature of the file as written
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb" if binary else "w") as f:
+            write(f)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        signature = file_signature(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return signature
+
+
+def atomic_write_json(path, payload, fsync=True):
+    """atomic_write() of a compact JSON document."""
+    return atomic_write(path, lambda f: json.dump(payload, f, separators=(",", ":")), fsync=fsync)
@@ -1,15 +1,199 @@
-import random
+import threading
+
+import numpy as np
+
+from app.price_history import PRICE_FIELDS, PriceHistoryFollower, tick_seconds
+from app.pricing import norm_ppf
+
+DEFAULT_HORIZONS = (1, 12, 288)  # ticks: 5 minutes, 1 hour, 1 day of 5-minute prices
+DEFAULT_CONFIDENCE = 0.9
+
+# Decay factors of the exponentially weighted estimates, per tick
+MEAN_DECAY = 0.995
+VARIANCE_DECAY = 0.94  # RiskMetrics
+AR_DECAY = 0.995
+MAX_AR = 0.95
+
+
+class EWMAForecaster:
+    """
+    AR(1)-EWMA model of log returns, for several price series at once.
+
+    Each series' log return is modelled as r_t = mu + phi (r_{t-1} - mu) + e_t
+    with Var(e_t) = s2. mu, phi and s2 are exponentially weighted estimates
+    kept as running sums, so update() is O(1) per tick, whatever the length of
+    history already seen. Forecasts are cached per (horizon, confidence) and
+    the cache is dropped only when a new tick arrives.
+    """
+
+    def __init__(self, fields=PRICE_FIELDS, mean_decay=MEAN_DECAY, variance_decay=VARIANCE_DECAY,
+                 ar_decay=AR_DECAY):
+        self.fields = tuple(fields)
+        self.mean_decay = mean_decay
+        self.variance_decay = variance_decay
+        self.ar_decay = ar_decay
+
+        k = len(self.fields)
+        self.ticks = 0
+        self.tick_seconds = None
+        self.last_timestamp = None
+        self.last_log_price = np.full(k, np.nan)
+        self.last_return = np.zeros(k)
+        self.mu = np.zeros(k)
+        self.var = np.zeros(k)
+        self._sxy = np.zeros(k)
+        self._sxx = np.zeros(k)
+        self._cache = {}
+
+    @property
+    def phi(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            phi = np.where(self._sxx > 0, self._sxy / self._sxx, 0.0)
+        return np.clip(phi, -MAX_AR, MAX_AR)
+
+    def update(self, prices, timestamp=None):
+        """Feed one tick: prices in self.fields order."""
+        log_price = np.log(np.asarray(prices, dtype=float))
+        self._cache.clear()
+        self.ticks += 1
+        self.last_timestamp = timestamp
+        if self.ticks == 1:
+            self.last_log_price = log_price
+            return
+
+        r = log_price - self.last_log_price
+        self.last_log_price = log_price
+        if self.ticks == 2:
+            self.mu = r.copy()
+            self.var = r * r
+            self.last_return = r
+            return
+
+        prev = self.last_return - self.mu
+        residual = r - (self.mu + self.phi * prev)
+        self.var = self.variance_decay * self.var + (1.0 - self.variance_decay) * residual * residual
+        self._sxy = self.ar_decay * self._sxy + prev * (r - self.mu)
+        self._sxx = self.ar_decay * self._sxx + prev * prev
+        self.mu = self.mean_decay * self.mu + (1.0 - self.mean_decay) * r
+        self.last_return = r
+
+    def fit(self, history):
+        """Feed every point of a load_price_history() result not yet seen."""
+        timestamps = history["timestamp"]
+        start = 0
+        if self.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, self.last_timestamp, side="right"))
+        prices = np.column_stack([history[f][start:] for f in self.fields])
+        for i in range(start, timestamps.size):
+            self.update(prices[i - start], timestamps[i])
+        return timestamps.size - start
+
+    def forecast(self, horizon, confidence=DEFAULT_CONFIDENCE):
+        """
+        Median price and central confidence band horizon ticks ahead.
+
+        Returns:
+            Dict of arrays over fields: price, lower, upper, log_sd
+        """
+        key = (int(horizon), float(confidence))
+        if key in self._cache:
+            return self._cache[key]
+        if self.ticks < 3:
+            raise ValueError("At least three ticks are needed to forecast")
+
+        h = key[0]
+        phi = self.phi[:, None]
+        k = np.arange(1, h + 1)[None, :]
+        # The innovation j ticks ahead feeds every later return through phi
+        weights = (1.0 - phi ** (h - k + 1)) / (1.0 - phi)
+        log_mean = self.last_log_price + h * self.mu + (phi * (1.0 - phi ** h) / (1.0 - phi))[:, 0] * (
+            self.last_return - self.mu)
+        log_sd = np.sqrt(self.var * (weights ** 2).sum(axis=1))
+        z = float(norm_ppf(0.5 + confidence / 2.0))
+
+        result = {
+            "price": np.exp(log_mean),
+            "lower": np.exp(log_mean - z * log_sd),
+            "upper": np.exp(log_mean + z * log_sd),
+            "log_sd": log_sd,
+        }
+        self._cache[key] = result
+        return result
+
+    def cache_size(self):
+        return len(self._cache)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_history = None
+
+
+def get_engine():
+    """
+    Shared forecaster, fed only the ticks added to the history file since the last call.
+
+    Returns None while no price history has been recorded.
+    """
+    global _engine, _history
+    with _engine_lock:
+        if _history is None:
+            _history = PriceHistoryFollower()
+        history = _history.poll()
+        if history is not None and history["timestamp"].size:
+            if _engine is None:
+                _engine = EWMAForecaster()
+            _engine.fit(history)
+            if history["timestamp"].size > 1:
+                _engine.tick_seconds = tick_seconds(history)
+        return _engine
+
+
+def reset_engine():
+    global _engine, _history
+    with _engine_lock:
+        _engine = None
+        _history = None
+
+
+def get_forecast_data(horizons=DEFAULT_HORIZONS, confidence=DEFAULT_CONFIDENCE, engine=None):
+    """
+    Forecasts with confidence bands for each recorded price series.
+
+    Returns:
+        Dict with as_of, tick_seconds, confidence and per-field lists of
+        {"horizon", "price", "lower", "upper"}, or an "error" entry when there
+        is not enough history
+    """
+    engine = engine or get_engine()
+    if engine is None or engine.ticks < 3:
+        return {"error": "Not enough recorded price history to forecast."}
+
+    series = {field: [] for field in engine.fields}
+    for h in horizons:
+        result = engine.forecast(h, confidence)
+        for i, field in enumerate(engine.fields):
+            series[field].append({
+                "horizon": int(h),
+                "price": round(float(result["price"][i]), 6),
+                "lower": round(float(result["lower"][i]), 6),
+                "upper": round(float(result["upper"][i]), 6),
+            })
+    return {
+        "as_of": str(engine.last_timestamp),
+        "tick_seconds": engine.tick_seconds,
+        "confidence": confidence,
+        "series": series,
+    }
 
-def get_forecast_data():
-    base_price = 65000
-    forecast_data = []
-    for day in range(1, 6):
-        forecast = round(base_price + random.uniform(-2000, 2000), 2)
-        forecast_data.append({"day": day, "price": forecast})
-    return forecast_data
 
 def forecast_prices():
-    print("Future BTC price forecast (next 5 days):")
     data = get_forecast_data()
-    for item in data:
-        print(f"Day {item['day']}: ${item['price']}")
+    if "error" in data:
+        print(data["error"])
+        return
+    print(f"Price forecast as of {data['as_of']} ({data['confidence']:.0%} bands):")
+    for field, points in data["series"].items():
+        for item in points:
+            print(f"{field} +{item['horizon']} ticks: {item['price']:.4f} "
+                  f"[{item['lower']:.4f}, {item['upper']:.4f}]")
@@ -0,0 +1,238 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from app.price_history import (PRICE_FIELDS, PriceHistoryFollower, load_price_history, log_returns,
+                               synthetic_history, tick_seconds)
+
+DEFAULT_HORIZONS = (1, 12, 288, 2016)  # ticks: 5 minutes, 1 hour, 1 day, 1 week
+
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+
+# Coarse grid over (alpha, alpha + beta), then zoom rounds around the best point
+ALPHA_GRID = np.linspace(0.01, 0.30, 12)
+PERSISTENCE_GRID = np.array([0.5, 0.7, 0.8, 0.85, 0.9, 0.93, 0.95, 0.97, 0.98, 0.99, 0.995, 0.999])
+ZOOM_ROUNDS = 4
+MAX_PERSISTENCE = 0.9995
+
+# Filtered ticks after which the shared model is recalibrated
+REFIT_TICKS = 288
+
+
+def garch_nll(returns, alpha, beta, variance):
+    """
+    GARCH(1,1) negative log-likelihood for many parameter sets at once.
+
+    The variance recursion is sequential in time, so the loop runs over ticks
+    while every (parameter set, series) pair is advanced together as one array
+    operation. omega is fixed by variance targeting: omega = variance (1 - alpha - beta).
+
+    Args:
+        returns: (T, k) demeaned returns
+        alpha, beta: (m, k) candidate parameters
+        variance: (k,) unconditional variance of each series
+
+    Returns:
+        (m, k) negative log-likelihoods (constants dropped)
+    """
+    omega = variance * (1.0 - alpha - beta)
+    s2 = np.broadcast_to(variance, alpha.shape).copy()
+    nll = np.zeros(alpha.shape)
+    for e in returns:
+        e2 = e * e
+        nll += np.log(s2) + e2 / s2
+        s2 = omega + alpha * e2 + beta * s2
+    return 0.5 * nll
+
+
+def _search(returns, variance, alphas, persistence):
+    """Best (alpha, beta) per series over the product of two (g, k) candidate grids."""
+    a = np.repeat(alphas, persistence.shape[0], axis=0)
+    p = np.tile(persistence, (alphas.shape[0], 1))
+    p = np.clip(p, 0.0, MAX_PERSISTENCE)
+    a = np.clip(a, 1e-6, p - 1e-6)
+    nll = garch_nll(returns, a, p - a, variance)
+    best = np.argmin(nll, axis=0)
+    cols = np.arange(returns.shape[1])
+    return a[best, cols], p[best, cols], nll[best, cols]
+
+
+def fit_garch(returns):
+    """
+    Fit GARCH(1,1) with variance targeting to each column of returns.
+
+    A coarse grid over (alpha, persistence) picks a starting point, then a few
+    zoom rounds on finer local grids refine it, every round one vectorized
+    likelihood pass for all series together.
+
+    Returns:
+        Dict of (k,) arrays: mu, omega, alpha, beta, nll
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=float).T).T
+    if returns.shape[0] < 10:
+        raise ValueError("At least ten returns are needed to fit GARCH")
+    k = returns.shape[1]
+    mu = returns.mean(axis=0)
+    e = returns - mu
+    variance = np.maximum(e.var(axis=0), 1e-300)
+
+    alpha, persistence, nll = _search(e, variance, np.tile(ALPHA_GRID[:, None], (1, k)),
+                                      np.tile(PERSISTENCE_GRID[:, None], (1, k)))
+    a_step, p_step = 0.025, 0.02
+    steps = np.linspace(-1.0, 1.0, 5)[:, None]
+    for _ in range(ZOOM_ROUNDS):
+        alpha, persistence, nll = _search(e, variance, alpha + a_step * steps,
+                                          1.0 - (1.0 - persistence) * np.exp(steps * p_step * 10))
+        a_step, p_step = a_step / 2, p_step / 2
+
+    beta = persistence - alpha
+    return {"mu": mu, "omega": variance * (1.0 - persistence), "alpha": alpha, "beta": beta, "nll": nll,
+            "sigma2": _filter(e, variance * (1.0 - persistence), alpha, beta, variance)}
+
+
+def _filter(e, omega, alpha, beta, start):
+    s2 = start.copy()
+    for x in e:
+        s2 = omega + alpha * x * x + beta * s2
+    return s2
+
+
+class GarchModel:
+    """
+    GARCH(1,1) volatility model of hash, token and energy prices.
+
+    fit() calibrates every series at once; update() then filters one new
+    tick in O(1), and forecast() gives the variance term structure from the
+    current conditional variance.
+    """
+
+    def __init__(self, fields=PRICE_FIELDS):
+        self.fields = tuple(fields)
+        self.params = None
+        self.sigma2 = None  # conditional variance of the next tick's return
+        self.last_log_price = None
+        self.last_timestamp = None
+        self.tick_seconds = None
+        self.ticks_since_fit = 0
+
+    def fit(self, history):
+        returns = log_returns(history, self.fields)
+        self.params = fit_garch(returns)
+        self.sigma2 = self.params["sigma2"]
+        self.last_log_price = np.log(np.array([history[f][-1] for f in self.fields]))
+        self.last_timestamp = history["timestamp"][-1]
+        self.tick_seconds = tick_seconds(history)
+        self.ticks_since_fit = 0
+        return self
+
+    def update(self, prices, timestamp=None):
+        """Filter one tick: prices in self.fields order."""
+        log_price = np.log(np.asarray(prices, dtype=float))
+        e = log_price - self.last_log_price - self.params["mu"]
+        self.sigma2 = self.params["omega"] + self.params["alpha"] * e * e + self.params["beta"] * self.sigma2
+        self.last_log_price = log_price
+        self.last_timestamp = timestamp
+        self.ticks_since_fit += 1
+
+    def long_run_variance(self):
+        p = self.params
+        return p["omega"] / (1.0 - p["alpha"] - p["beta"])
+
+    def forecast(self, horizons=DEFAULT_HORIZONS):
+        """
+        Variance term structure.
+
+        E[s2_{t+h}] = V + (alpha + beta)^(h - 1) (s2_{t+1} - V), and the
+        variance of the h-tick return is the sum of those, in closed form.
+
+        Returns:
+            Dict of (len(horizons), k) arrays: tick_vol (vol of the h-th tick's
+            return), horizon_vol (vol of the whole h-tick return) and, when
+            the tick spacing is known, annualized_vol
+        """
+        h = np.asarray(horizons, dtype=float)[:, None]
+        persistence = (self.params["alpha"] + self.params["beta"])[None, :]
+        long_run = self.long_run_variance()[None, :]
+        gap = self.sigma2[None, :] - long_run
+        tick_var = long_run + persistence ** (h - 1) * gap
+        total_var = h * long_run + gap * (1.0 - persistence ** h) / (1.0 - persistence)
+        result = {"tick_vol": np.sqrt(tick_var), "horizon_vol": np.sqrt(total_var)}
+        if self.tick_seconds:
+            result["annualized_vol"] = np.sqrt(total_var / h * SECONDS_PER_YEAR / self.tick_seconds)
+        return result
+
+    def summary(self, horizons=DEFAULT_HORIZONS):
+        forecast = self.forecast(horizons)
+        result = {"as_of": str(self.last_timestamp), "tick_seconds": self.tick_seconds, "series": {}}
+        for i, field in enumerate(self.fields):
+            result["series"][field] = {
+                "alpha": float(self.params["alpha"][i]),
+                "beta": float(self.params["beta"][i]),
+                "omega": float(self.params["omega"][i]),
+                "term_structure": [
+                    {"horizon": int(h), **{name: float(values[j, i]) for name, values in forecast.items()}}
+                    for j, h in enumerate(horizons)
+                ],
+            }
+        return result
+
+
+_model = None
+_model_lock = threading.Lock()
+_history = None
+
+
+def get_model():
+    """
+    Shared GarchModel over the recorded price history.
+
+    Only the ticks added to the history file since the last call are read,
+    and each is filtered in O(1). Once REFIT_TICKS ticks have been filtered
+    since the last fit, the whole file is reloaded and the parameters are
+    recalibrated. Returns None while there is no history to fit.
+    """
+    global _model, _history
+    with _model_lock:
+        if _history is None:
+            _history = PriceHistoryFollower()
+        history = _history.poll()
+        if history is None:
+            return _model
+        if _model is None or _model.ticks_since_fit >= REFIT_TICKS:
+            history = load_price_history(_history.path)
+            if history["timestamp"].size > 10:
+                _model = GarchModel().fit(history)
+        else:
+            for i in range(history["timestamp"].size):
+                _model.update([history[f][i] for f in _model.fields], history["timestamp"][i])
+        return _model
+
+
+def reset_model():
+    global _model, _history
+    with _model_lock:
+        _model = None
+        _history = None
+
+
+def benchmark(n=10_000):
+    history = load_price_history(synthetic_history(n))
+    start = time.perf_counter()
+    model = GarchModel().fit(history)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        model.update([2.5, 3.0, 0.65])
+    update_seconds = (time.perf_counter() - start) / 1000
+    return {"n": n, "fit_seconds": fit_seconds, "update_seconds": update_seconds,
+            "alpha": model.params["alpha"].tolist(), "beta": model.params["beta"].tolist()}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"GARCH(1,1) on {result['n']:,} ticks x 3 series: fit {result['fit_seconds'] * 1000:.0f} ms, "
+          f"update {result['update_seconds'] * 1e6:.1f} us/tick")
+    print(f"  alpha {[round(a, 3) for a in result['alpha']]}, beta {[round(b, 3) for b in result['beta']]}")
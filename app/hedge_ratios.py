@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.price_history import PriceHistoryFollower, load_price_history, synthetic_history
+
+INVENTORY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "cache", "inventory.json")
+
+HEDGE_WINDOWS = (12, 288, 2016)  # ticks: 1 hour, 1 day, 1 week of 5-minute prices
+
+# The recorded history carries no BTC series; pass "btc_price" among the
+# instruments when the price points include one
+HEDGE_INSTRUMENTS = ("energy_price", "token_price")
+
+
+def load_inventory(path=None):
+    with open(path or os.getenv("INVENTORY_FILE", INVENTORY_FILE)) as f:
+        return json.load(f)
+
+
+def _fleet_total(inventory, key, counts=None):
+    counts = counts or {name: 1 for name in inventory["miners"]}
+    return float(sum(inventory["miners"][name][key] * n for name, n in counts.items()))
+
+
+def fleet_hashrate(inventory, counts=None):
+    """Total hashrate of a fleet; counts maps miner type to units (default one of each)."""
+    return _fleet_total(inventory, "hashrate", counts)
+
+
+def fleet_power(inventory, counts=None):
+    """Total power draw of a fleet; counts as for fleet_hashrate()."""
+    return _fleet_total(inventory, "power", counts)
+
+
+class RollingMoments:
+    """
+    Mean and covariance of the last window vectors, updated in O(dim^2) per push.
+
+    Running sums gain the new vector and lose the one leaving the window.
+    They are rebuilt from the ring buffer once per window length, so rounding
+    drift from the subtractions stays bounded at amortized O(1) cost.
+    """
+
+    def __init__(self, dim, window):
+        self.window = window
+        self.buffer = np.zeros((window, dim))
+        self.count = 0
+        self.pushes = 0
+        self._sum = np.zeros(dim)
+        self._outer = np.zeros((dim, dim))
+
+    def push(self, z):
+        z = np.asarray(z, dtype=float)
+        slot = self.pushes % self.window
+        if self.count == self.window:
+            old = self.buffer[slot]
+            self._sum -= old
+            self._outer -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.buffer[slot] = z
+        self._sum += z
+        self._outer += np.outer(z, z)
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            live = self.buffer[:self.count]
+            self._sum = live.sum(axis=0)
+            self._outer = live.T @ live
+
+    def covariance(self):
+        n = self.count
+        if n < 2:
+            return None
+        return (self._outer - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+
+class HedgeRatioEngine:
+    """
+    Minimum-variance hedge ratios of site mining revenue, over several rolling windows.
+
+    Revenue per tick is hashrate x hash_price. For the tick changes of revenue
+    y and instrument prices x, the variance-minimizing hedge holds
+    -Cov(x, x)^-1 Cov(x, y) of the instruments, and hedge effectiveness is the
+    share of revenue variance it removes. Each window keeps running moments,
+    so a tick costs constant time however long the windows are.
+    """
+
+    def __init__(self, hashrate, instruments=HEDGE_INSTRUMENTS, windows=HEDGE_WINDOWS):
+        self.hashrate = hashrate
+        self.instruments = tuple(instruments)
+        self.fields = ("hash_price",) + self.instruments
+        self.windows = {w: RollingMoments(1 + len(self.instruments), w) for w in windows}
+        self.last_prices = None
+        self.last_timestamp = None
+
+    def update(self, prices, timestamp=None):
+        """Feed one tick: prices in self.fields order."""
+        prices = np.asarray(prices, dtype=float)
+        if self.last_prices is not None:
+            change = prices - self.last_prices
+            z = np.concatenate([[self.hashrate * change[0]], change[1:]])
+            for moments in self.windows.values():
+                moments.push(z)
+        self.last_prices = prices
+        self.last_timestamp = timestamp
+
+    def fit(self, history):
+        """Feed every point of a load_price_history() result not yet seen."""
+        timestamps = history["timestamp"]
+        start = 0
+        if self.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, self.last_timestamp, side="right"))
+        prices = np.column_stack([history[f] for f in self.fields])
+        for i in range(start, timestamps.size):
+            self.update(prices[i], timestamps[i])
+        return timestamps.size - start
+
+    def ratios(self):
+        """
+        Hedge per window.
+
+        Returns:
+            {window: {"observations", "hedge" ({instrument: units to hold per
+            tick of revenue}), "effectiveness", "revenue_vol", "hedged_vol"}}
+            or None for windows with too few observations
+        """
+        result = {}
+        for window, moments in self.windows.items():
+            cov = moments.covariance()
+            if cov is None or cov[0, 0] <= 0:
+                result[window] = None
+                continue
+            cxx, cxy, vyy = cov[1:, 1:], cov[1:, 0], cov[0, 0]
+            beta = np.linalg.lstsq(cxx, cxy, rcond=None)[0]
+            explained = float(np.clip(beta @ cxy / vyy, 0.0, 1.0))
+            result[window] = {
+                "observations": moments.count,
+                "hedge": {name: float(-b) for name, b in zip(self.instruments, beta)},
+                "effectiveness": explained,
+                "revenue_vol": float(np.sqrt(vyy)),
+                "hedged_vol": float(np.sqrt(vyy * (1.0 - explained))),
+            }
+        return result
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_history = None
+
+
+def get_engine():
+    """
+    Shared HedgeRatioEngine for the inventory fleet, fed only newly recorded ticks.
+
+    Returns None while no price history has been recorded.
+    """
+    global _engine, _history
+    with _engine_lock:
+        if _history is None:
+            _history = PriceHistoryFollower(fields=("hash_price",) + HEDGE_INSTRUMENTS)
+        history = _history.poll()
+        if history is not None:
+            if _engine is None:
+                _engine = HedgeRatioEngine(fleet_hashrate(load_inventory()))
+            _engine.fit(history)
+        return _engine
+
+
+def reset_engine():
+    global _engine, _history
+    with _engine_lock:
+        _engine = None
+        _history = None
+
+
+def benchmark(n=20_000):
+    history = load_price_history(synthetic_history(n))
+    engine = HedgeRatioEngine(fleet_hashrate(load_inventory()))
+    start = time.perf_counter()
+    engine.fit(history)
+    seconds = time.perf_counter() - start
+    return {"n": n, "tick_us": seconds / n * 1e6, "ratios": engine.ratios()}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['n']:,} ticks at {result['tick_us']:.1f} us/tick")
+    for window, r in result["ratios"].items():
+        print(f"  {window:>5} ticks: hedge {r['hedge']}, effectiveness {r['effectiveness']:.1%}")
@@ -1,8 +1,124 @@
-def get_hedging_suggestions():
-    return [
-        "Recommended hedge: Buy put options to cover 50% of long BTC exposure.",
-        "Alternative: Diversify with short ETH futures or stablecoin allocation."
+from datetime import date
+
+import numpy as np
+
+from app.hedge_ratios import get_engine as get_hedge_engine
+from app.pricing import instrument_code
+from app.risk_book import PositionBook
+from app.scenarios import revalue_grid
+
+# Grid used for /hedging stress reports: BTC x energy forward moves x vol moves
+STRESS_PRICE_SHOCKS = np.linspace(-0.5, 0.5, 21)
+STRESS_VOL_SHOCKS = np.linspace(-0.2, 0.2, 5)
+
+
+DEFAULT_SUGGESTIONS = [
+    "Recommended hedge: Buy put options to cover 50% of long BTC exposure.",
+    "Alternative: Diversify with short ETH futures or stablecoin allocation."
+]
+
+
+def get_hedge_ratios():
+    """Rolling minimum-variance hedge ratios of fleet revenue, keyed by window; None without history."""
+    engine = get_hedge_engine()
+    if engine is None:
+        return None
+    return {str(window): r for window, r in engine.ratios().items()}
+
+
+def get_hedging_suggestions(ratios=None):
+    """Suggestions from the longest window with computed hedge ratios, else the generic advice."""
+    ratios = ratios if ratios is not None else get_hedge_ratios()
+    ready = [(int(w), r) for w, r in (ratios or {}).items() if r is not None]
+    if not ready:
+        return list(DEFAULT_SUGGESTIONS)
+    window, best = max(ready, key=lambda item: item[0])
+    lines = []
+    for instrument, units in best["hedge"].items():
+        action = "Buy" if units > 0 else "Sell"
+        lines.append(f"{action} {abs(units):,.0f} units of {instrument} exposure to hedge fleet revenue "
+                     f"(minimum-variance ratio over the last {best['observations']} ticks).")
+    lines.append(f"This hedge removes {best['effectiveness']:.0%} of revenue variance "
+                 f"(per-tick revenue vol {best['revenue_vol']:,.2f} -> {best['hedged_vol']:,.2f}).")
+    return lines
+
+
+def book_from_positions(positions, market, today=None):
+    """Load positions in the /ai_analysis schema into a PositionBook at market."""
+    book = PositionBook({
+        "BTC": {"forward": market["btc_price"], "vol": market["btc_implied_vol"]},
+        "Energy": {"forward": market["energy_price"], "vol": market["energy_implied_vol"]},
+    }, valuation_date=today, capacity=max(len(positions), 1))
+    if positions:
+        sign = [1.0 if p["Action"].lower() == "buy" else -1.0 for p in positions]
+        book.add_positions(
+            [p["Asset"] for p in positions],
+            [instrument_code(p["Type"]) for p in positions],
+            [float(p["Strike Price"]) for p in positions],
+            [p["Expiry Date"] for p in positions],
+            [s * float(p["Quantity"]) for s, p in zip(sign, positions)],
+        )
+    return book
+
+
+def get_stress_report(positions, market, today=None):
+    """
+    Stress a portfolio over the BTC x energy x vol grid and suggest hedges.
+
+    Returns:
+        Dict with the book's current Greeks, the worst scenarios, the P&L at
+        each asset's largest down and up move (vol unchanged), and suggestions
+    """
+    book = book_from_positions(positions, market, today)
+    grid = revalue_grid(book, {"BTC": STRESS_PRICE_SHOCKS, "Energy": STRESS_PRICE_SHOCKS},
+                        STRESS_VOL_SHOCKS, workers=1)
+    cube = grid["pnl"]
+    flat_vol = int(np.argmin(np.abs(STRESS_VOL_SHOCKS)))
+    flat_price = int(np.argmin(np.abs(STRESS_PRICE_SHOCKS)))
+    moves = {
+        "BTC": cube[[0, -1], flat_price, flat_vol],
+        "Energy": cube[flat_price, [0, -1], flat_vol],
+    }
+    totals = book.totals()
+    subtotals = book.subtotals()
+
+    return {
+        "greeks": {k: round(v, 4) for k, v in totals.items() if k != "pnl"},
+        "worst": grid["worst"],
+        "moves": {
+            asset: {"down": float(pnl[0]), "up": float(pnl[1]),
+                    "shock": float(STRESS_PRICE_SHOCKS[-1])}
+            for asset, pnl in moves.items()
+        },
+        "suggestions": _suggestions(subtotals, grid["worst"][0], moves, totals["vega"], market),
+    }
+
+
+def _suggestions(subtotals, worst, moves, vega, market):
+    shock = STRESS_PRICE_SHOCKS[-1]
+    lines = [
+        f"Worst stressed scenario loses {-worst['pnl']:,.0f} (BTC {worst['BTC_shock']:+.0%}, "
+        f"energy {worst['Energy_shock']:+.0%}, vol {worst['vol_shock']:+.0%})."
+        if worst["pnl"] < 0 else "No stressed scenario loses money."
     ]
+    for asset, unit in (("BTC", "BTC"), ("Energy", "MWh")):
+        delta = subtotals[asset]["delta"]
+        down, up = moves[asset]
+        if abs(delta) < 0.01:
+            continue
+        action = "Sell" if delta > 0 else "Buy"
+        side = "fall" if delta > 0 else "rise"
+        loss = down if delta > 0 else up
+        lines.append(f"{action} {abs(delta):,.2f} {unit} of {asset} futures to neutralise delta; "
+                     f"a {shock:.0%} {side} costs {-loss:,.0f} unhedged.")
+    if abs(vega) >= 1.0:
+        direction = "short" if vega < 0 else "long"
+        lines.append(f"Book is {direction} {abs(vega):,.0f} vega per vol point; "
+                     f"{'buy' if vega < 0 else 'sell'} options to reduce it.")
+    if len(lines) == 1:
+        lines.append("Book is close to flat; no hedge needed.")
+    return lines
+
 
 def suggest_hedges():
     suggestions = get_hedging_suggestions()
@@ -0,0 +1,192 @@
+import time
+
+import numpy as np
+
+from app.pricing import CALL, FUTURE, PUT, black76
+
+# Per-quote status codes returned by implied_vol()
+OK = "ok"
+MAX_ITERATIONS = "max_iterations"
+BELOW_INTRINSIC = "below_intrinsic"
+ABOVE_MAXIMUM = "above_maximum"
+INVALID_INPUT = "invalid_input"
+NOT_AN_OPTION = "not_an_option"
+AT_VOL_BOUND = "at_vol_bound"
+
+VOL_BOUNDS = (1e-4, 5.0)
+
+
+def _initial_guess(forward, strike, time_to_expiry, price, df):
+    """Manaster-Koehler guess, lifted by the Brenner-Subrahmanyam ATM estimate."""
+    mk = np.sqrt(2.0 * np.abs(np.log(forward / strike)) / time_to_expiry)
+    bs = np.sqrt(2.0 * np.pi / time_to_expiry) * price / (df * forward)
+    return np.maximum(mk, bs)
+
+
+def implied_vol(price, forward, strike, time_to_expiry, rate=0.0, instrument=CALL,
+                initial_vol=None, tol=1e-10, vol_tol=1e-10, max_iter=50, vol_bounds=VOL_BOUNDS):
+    """
+    Back out Black-76 implied volatilities for a whole array of option quotes.
+
+    Each quote runs a safeguarded Newton iteration on log(price): a bracket
+    [lo, hi] known to contain the root is tightened on every step, and whenever
+    the Newton step leaves the bracket the step is replaced by bisection. Only
+    quotes that have not yet converged are revalued, so a warm-started chain
+    usually finishes in one or two vectorized passes. A quote whose implied
+    vol lies outside vol_bounds ends with its bracket collapsed onto the
+    bound; it gets status AT_VOL_BOUND and the bound as its vol.
+
+    Args:
+        price: Option premiums
+        forward, strike, time_to_expiry, rate, instrument: As for black76()
+        initial_vol: Optional starting vols, e.g. the previous tick's solution;
+            NaN entries use the default guess
+        tol: Convergence tolerance on price, relative to the quoted premium
+        vol_tol: Convergence tolerance on the size of a Newton step in vol
+        max_iter: Maximum Newton/bisection iterations
+        vol_bounds: (lowest, highest) admissible vol
+
+    Returns:
+        Dict of arrays: vol (NaN where unsolved), converged, iterations and status
+    """
+    price, F, K, T, r, kind = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(forward, dtype=float),
+        np.asarray(strike, dtype=float), np.asarray(time_to_expiry, dtype=float),
+        np.asarray(rate, dtype=float), np.asarray(instrument))
+    shape = price.shape
+    price, F, K, T, r, kind = (a.ravel() for a in (price, F, K, T, r, kind))
+    n = price.size
+
+    vol = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=int)
+    status = np.full(n, OK, dtype=object)
+
+    # Quotes that cannot have an implied vol
+    valid = np.isfinite(price) & (F > 0) & (K > 0) & (T > 0)
+    status[~valid] = INVALID_INPUT
+    status[valid & (kind == FUTURE)] = NOT_AN_OPTION
+    df = np.exp(-r * np.maximum(T, 0.0))
+    phi = np.where(kind == PUT, -1.0, 1.0)
+    intrinsic = df * np.maximum(phi * (F - K), 0.0)
+    upper = df * np.where(kind == PUT, K, F)
+    options = valid & (kind != FUTURE)
+    below = options & (price < intrinsic * (1.0 - tol))
+    above = options & (price >= upper)
+    status[below] = BELOW_INTRINSIC
+    status[above] = ABOVE_MAXIMUM
+    active = np.flatnonzero(options & ~below & ~above)
+
+    lo = np.full(n, vol_bounds[0])
+    hi = np.full(n, vol_bounds[1])
+    guess = _initial_guess(F, K, np.where(T > 0, T, 1.0), price, df)
+    if initial_vol is not None:
+        warm = np.broadcast_to(np.asarray(initial_vol, dtype=float), shape).ravel()
+        guess = np.where(np.isfinite(warm), warm, guess)
+    sigma = np.clip(np.nan_to_num(guess, nan=0.5), vol_bounds[0], vol_bounds[1])
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        s = sigma[active]
+        result = black76(F[active], K[active], T[active], s, r[active], kind[active])
+        diff = result["price"] - price[active]
+        iterations[active] += 1
+
+        priced = np.abs(diff) <= tol * price[active]
+        done = priced.copy()
+
+        # The model price is increasing in vol, so the sign of diff tightens the bracket
+        lo[active] = np.where(diff < 0, s, lo[active])
+        hi[active] = np.where(diff > 0, s, hi[active])
+
+        # Newton on log(price): identical near the root, but it does not crawl
+        # on far out-of-the-money quotes where price is exponential in vol
+        model = result["price"]
+        vega = result["vega"] * 100.0
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = s - np.log(model / price[active]) * model / vega
+        a_lo, a_hi = lo[active], hi[active]
+        use_newton = (model > 0) & (vega > 0) & (newton > a_lo) & (newton < a_hi)
+        step = np.where(use_newton, newton, 0.5 * (a_lo + a_hi))
+        sigma[active] = np.where(done, s, step)
+
+        # A negligible Newton step or a collapsed bracket also pins the root
+        done |= use_newton & (np.abs(newton - s) <= vol_tol)
+        done |= a_hi - a_lo <= vol_tol
+        vol[active[done]] = sigma[active[done]]
+
+        # Stopped without matching the price: the root is beyond one of the bounds
+        final = sigma[active]
+        pinned = done & ~priced & ((final - vol_bounds[0] <= vol_tol) | (vol_bounds[1] - final <= vol_tol))
+        status[active[pinned]] = AT_VOL_BOUND
+        vol[active[pinned]] = np.where(final[pinned] - vol_bounds[0] <= vol_tol, vol_bounds[0], vol_bounds[1])
+        active = active[~done]
+
+    status[active] = MAX_ITERATIONS
+
+    return {
+        "vol": vol.reshape(shape),
+        "converged": (status == OK).reshape(shape),
+        "iterations": iterations.reshape(shape),
+        "status": status.reshape(shape),
+    }
+
+
+class ChainVolSolver:
+    """
+    Implied-vol solver that remembers each quote's last solution.
+
+    Quotes are identified by caller-chosen ids (e.g. "BTC-20250926-75000-C").
+    On every tick the previous vol of each id seeds the Newton iteration, so
+    small market moves converge in a couple of iterations.
+    """
+
+    def __init__(self, **solver_options):
+        self.solver_options = solver_options
+        self.last_vols = {}
+
+    def solve(self, quote_ids, price, forward, strike, time_to_expiry, rate=0.0, instrument=CALL):
+        warm = np.array([self.last_vols.get(q, np.nan) for q in quote_ids], dtype=float)
+        result = implied_vol(price, forward, strike, time_to_expiry, rate, instrument,
+                             initial_vol=warm, **self.solver_options)
+        for quote_id, vol, ok in zip(quote_ids, result["vol"], result["converged"]):
+            if ok:
+                self.last_vols[quote_id] = float(vol)
+        return result
+
+
+def benchmark(n=10_000, seed=0):
+    """Cold and warm-started solve times for n random BTC option quotes."""
+    rng = np.random.default_rng(seed)
+    forward = np.full(n, 68_730.0)
+    strike = forward * rng.uniform(0.6, 1.6, n)
+    expiry = rng.uniform(7 / 365, 1.0, n)
+    true_vol = rng.uniform(0.3, 1.2, n)
+    kind = rng.choice([CALL, PUT], n)
+    price = black76(forward, strike, expiry, true_vol, 0.0, kind)["price"]
+
+    start = time.perf_counter()
+    cold = implied_vol(price, forward, strike, expiry, 0.0, kind)
+    cold_seconds = time.perf_counter() - start
+
+    # Next tick: the market moves a little, seed from the previous vols
+    moved = black76(forward * 1.002, strike, expiry, true_vol * 1.01, 0.0, kind)["price"]
+    start = time.perf_counter()
+    warm = implied_vol(moved, forward * 1.002, strike, expiry, 0.0, kind, initial_vol=cold["vol"])
+    warm_seconds = time.perf_counter() - start
+
+    return {
+        "n": n,
+        "cold_seconds": cold_seconds,
+        "cold_max_iterations": int(cold["iterations"].max()),
+        "warm_seconds": warm_seconds,
+        "warm_max_iterations": int(warm["iterations"].max()),
+        "failures": int((~cold["converged"]).sum() + (~warm["converged"]).sum()),
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Implied vol for {result['n']:,} quotes: cold {result['cold_seconds'] * 1000:.1f} ms "
+          f"({result['cold_max_iterations']} iterations max), warm {result['warm_seconds'] * 1000:.1f} ms "
+          f"({result['warm_max_iterations']} iterations max), {result['failures']} failures")
@@ -0,0 +1,33 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.cache import TTLCache
+
+PRICES_URL = "https://mara-hackathon-api.onrender.com/prices"
+
+# (connect, read) timeouts in seconds, so a slow upstream cannot pin a worker
+REQUEST_TIMEOUT = (3.05, 10)
+
+# The upstream publishes a new price point every few minutes
+PRICES_TTL_SECONDS = 30
+PRICES_STALE_SECONDS = 300
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+_cache = TTLCache(ttl_seconds=PRICES_TTL_SECONDS, stale_seconds=PRICES_STALE_SECONDS)
+
+
+def fetch_market_data():
+    response = _session.get(PRICES_URL, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_market_data():
+    """Upstream price history, shared by every caller through one TTL cache."""
+    return _cache.get("prices", fetch_market_data)
+
+
+def get_market_data_stats():
+    return _cache.stats()
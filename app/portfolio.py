@@ -0,0 +1,214 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.pricing import CALL, FUTURE, PUT, black76, instrument_code
+
+ASSETS = ("BTC", "Energy")
+TYPE_NAMES = {CALL: "Call Option", PUT: "Put Option", FUTURE: "Future"}
+
+# Strikes offered around the forward, as fractions of it
+MONEYNESS = (0.8, 0.9, 0.95, 1.0, 1.05, 1.1, 1.2)
+
+# Quantities are in units of the underlying (BTC, MWh), rounded to this lot
+LOT_SIZE = 0.01
+
+DEFAULT_TOLERANCE = {"btc_delta": 0.01, "energy_delta": 0.01, "vega": 1.0}
+
+
+def _expiry_days(time_horizon):
+    horizon = max(int(time_horizon or 30), 1)
+    return sorted({horizon, 2 * horizon})
+
+
+def _strike_step(asset):
+    return 500.0 if asset == "BTC" else 1.0
+
+
+def build_universe(market, time_horizon, today=None):
+    """
+    Instruments the constructor may choose from, with per-unit Greeks.
+
+    For each asset: one future and calls and puts across MONEYNESS, at expiries
+    of one and two time horizons. All Greeks come from one black76() call.
+
+    Returns:
+        Dict of parallel arrays: asset, type, strike, expiry_days, expiry, price, delta, vega
+    """
+    today = today or date.today()
+    forwards = {"BTC": market["btc_price"], "Energy": market["energy_price"]}
+    vols = {"BTC": market["btc_implied_vol"], "Energy": market["energy_implied_vol"]}
+
+    rows = []
+    for asset in ASSETS:
+        F = forwards[asset]
+        step = _strike_step(asset)
+        for days in _expiry_days(time_horizon):
+            rows.append((asset, FUTURE, F, days))
+            for m in MONEYNESS:
+                strike = max(round(F * m / step) * step, step)
+                rows.append((asset, CALL, strike, days))
+                rows.append((asset, PUT, strike, days))
+
+    asset = np.array([r[0] for r in rows])
+    kind = np.array([r[1] for r in rows])
+    strike = np.array([r[2] for r in rows], dtype=float)
+    days = np.array([r[3] for r in rows])
+    forward = np.where(asset == "BTC", forwards["BTC"], forwards["Energy"])
+    vol = np.where(asset == "BTC", vols["BTC"], vols["Energy"])
+    greeks = black76(forward, strike, days / 365.0, vol, 0.0, kind)
+
+    return {
+        "asset": asset,
+        "type": kind,
+        "strike": strike,
+        "expiry_days": days,
+        "expiry": np.array([(today + timedelta(days=int(d))).isoformat() for d in days]),
+        "price": greeks["price"],
+        "delta": greeks["delta"],
+        "vega": greeks["vega"],
+    }
+
+
+def _round_lot(quantity):
+    return np.round(np.asarray(quantity) / LOT_SIZE) * LOT_SIZE
+
+
+def construct_portfolio(params, market, today=None, tolerance=None):
+    """
+    Deterministic local replacement for the model's portfolio construction.
+
+    Targets are met exactly (up to lot rounding) with at most one option plus a
+    future on each asset: the option sets vega, and the futures absorb the
+    option's delta to land on the BTC and energy delta targets. Every option in
+    the universe is tried at once as array arithmetic, and the one with the
+    smallest premium outlay that stays within tolerance wins.
+
+    Args:
+        params: Normalized request parameters (see ai_analysis.normalize_params)
+        market: Market inputs (prices and implied vols)
+        tolerance: Allowed absolute miss per target after lot rounding
+
+    Returns:
+        Dict in the /ai_analysis response schema, plus "achieved" Greeks and
+        "within_tolerance"
+    """
+    today = today or date.today()
+    tolerance = dict(DEFAULT_TOLERANCE, **(tolerance or {}))
+    targets = {
+        "btc_delta": params.get("btc_delta") or 0.0,
+        "energy_delta": params.get("energy_delta") or 0.0,
+        "vega": params.get("vega") or 0.0,
+    }
+    universe = build_universe(market, params.get("time_horizon"), today)
+    horizon_days = universe["expiry_days"].min()
+    is_btc = universe["asset"] == "BTC"
+    futures = universe["type"] == FUTURE
+    btc_future = np.flatnonzero(futures & is_btc & (universe["expiry_days"] == horizon_days))[0]
+    energy_future = np.flatnonzero(futures & ~is_btc & (universe["expiry_days"] == horizon_days))[0]
+
+    if targets["vega"] == 0:
+        option_qty = np.zeros(1)
+        candidates = np.array([-1])
+    else:
+        candidates = np.flatnonzero(~futures & (universe["vega"] > 0))
+        option_qty = _round_lot(targets["vega"] / universe["vega"][candidates])
+
+    # Delta left for each asset's future once the option is in place
+    option_delta = np.where(candidates >= 0, universe["delta"][candidates] * option_qty, 0.0)
+    option_is_btc = np.where(candidates >= 0, is_btc[candidates], False)
+    btc_qty = _round_lot(targets["btc_delta"] - np.where(option_is_btc, option_delta, 0.0))
+    energy_qty = _round_lot(targets["energy_delta"] - np.where(option_is_btc, 0.0, option_delta))
+
+    achieved_vega = np.where(candidates >= 0, universe["vega"][candidates] * option_qty, 0.0)
+    achieved_btc = btc_qty + np.where(option_is_btc, option_delta, 0.0)
+    achieved_energy = energy_qty + np.where(option_is_btc, 0.0, option_delta)
+    ok = ((np.abs(achieved_btc - targets["btc_delta"]) <= tolerance["btc_delta"])
+          & (np.abs(achieved_energy - targets["energy_delta"]) <= tolerance["energy_delta"])
+          & (np.abs(achieved_vega - targets["vega"]) <= tolerance["vega"]))
+
+    premium = np.where(candidates >= 0, np.abs(universe["price"][candidates] * option_qty), 0.0)
+    # Prefer feasible candidates, then the cheapest, then the first in the universe
+    best = int(np.lexsort((np.arange(candidates.size), premium, ~ok))[0])
+
+    legs = []
+    if candidates[best] >= 0:
+        legs.append((candidates[best], option_qty[best]))
+    legs.append((btc_future, btc_qty[best]))
+    legs.append((energy_future, energy_qty[best]))
+
+    positions = []
+    for index, quantity in legs:
+        if abs(quantity) < LOT_SIZE / 2:
+            continue
+        positions.append({
+            "Asset": str(universe["asset"][index]),
+            "Type": TYPE_NAMES[int(universe["type"][index])],
+            "Action": "Buy" if quantity > 0 else "Sell",
+            "Quantity": round(abs(float(quantity)), 2),
+            "Strike Price": round(float(universe["strike"][index]), 2),
+            "Expiry Date": str(universe["expiry"][index]),
+            "Delta": round(float(universe["delta"][index] * quantity), 4) + 0.0,
+            "Vega": round(float(universe["vega"][index] * quantity), 2) + 0.0,
+        })
+
+    achieved = {
+        "btc_delta": round(float(achieved_btc[best]), 4),
+        "energy_delta": round(float(achieved_energy[best]), 4),
+        "vega": round(float(achieved_vega[best]), 2),
+    }
+    return {
+        "justification": _justification(positions, achieved, params),
+        "impact_to_portfolio_delta": round(achieved["btc_delta"] + achieved["energy_delta"], 4),
+        "impact_to_portfolio_vega": achieved["vega"],
+        "positions": positions,
+        "achieved": achieved,
+        "within_tolerance": bool(ok[best]),
+        "engine": "local",
+    }
+
+
+def _justification(positions, achieved, params):
+    options = [p for p in positions if p["Type"] != "Future"]
+    futures = [p for p in positions if p["Type"] == "Future"]
+    parts = []
+    if options:
+        o = options[0]
+        parts.append(f"{o['Action'].lower()}ing {o['Quantity']} {o['Asset']} "
+                     f"{o['Type'].lower()}s struck at {o['Strike Price']:,g} sets the vega at {achieved['vega']:,g}")
+    if futures:
+        legs = ", ".join(f"{f['Action'].lower()} {f['Quantity']} {f['Asset']} futures" for f in futures)
+        parts.append(f"{legs} bring delta to {achieved['btc_delta']} BTC and {achieved['energy_delta']} energy")
+    text = "; ".join(parts) if parts else "No positions are needed for these targets"
+    return (f"{text[0].upper()}{text[1:]}. The block is the lowest-premium structure in the generated "
+            f"universe that meets the targets over a {params.get('time_horizon')}-day horizon.")
+
+
+def portfolio_greeks(positions, market, today=None):
+    """
+    Reprice positions in the /ai_analysis schema and return their true Greeks.
+
+    Useful for checking model-proposed portfolios: the per-position Delta and
+    Vega a model reports are not otherwise verified.
+    """
+    today = today or date.today()
+    if not positions:
+        return {"btc_delta": 0.0, "energy_delta": 0.0, "vega": 0.0}
+
+    asset = np.array([p["Asset"] for p in positions])
+    kind = np.array([instrument_code(p["Type"]) for p in positions])
+    sign = np.array([1.0 if p["Action"].lower() == "buy" else -1.0 for p in positions])
+    quantity = np.array([float(p["Quantity"]) for p in positions]) * sign
+    strike = np.array([float(p["Strike Price"]) for p in positions])
+    expiry = np.array([(date.fromisoformat(p["Expiry Date"]) - today).days / 365.0 for p in positions])
+    is_btc = asset == "BTC"
+    forward = np.where(is_btc, market["btc_price"], market["energy_price"])
+    vol = np.where(is_btc, market["btc_implied_vol"], market["energy_implied_vol"])
+    greeks = black76(forward, strike, expiry, vol, 0.0, kind)
+
+    delta = greeks["delta"] * quantity
+    return {
+        "btc_delta": float(delta[is_btc].sum()),
+        "energy_delta": float(delta[~is_btc].sum()),
+        "vega": float((greeks["vega"] * quantity).sum()),
+    }
@@ -0,0 +1,194 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# Series recorded by price_monitor.PriceMonitor for every price point
+PRICE_FIELDS = ("hash_price", "token_price", "energy_price")
+
+# Where PriceMonitor.save_prices_to_file() writes by default
+DEFAULT_HISTORY_FILE = "prices_history.json"
+
+# Bytes read at a time when scanning a history file for new points
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def parse_timestamp(value):
+    """
+    Naive UTC datetime of a price point timestamp (ISO string or Unix seconds).
+
+    A string with a UTC offset is converted to UTC; one without is taken to
+    be UTC already.
+    """
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    when = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def load_price_history(source=None, fields=PRICE_FIELDS):
+    """
+    Load PriceMonitor price points as chronological numpy arrays.
+
+    The API (and prices_history.json) lists points most recent first; models
+    want them oldest first, once per timestamp. Points missing a field or
+    with a non-positive price are dropped.
+
+    Args:
+        source: List of price point dicts, or a JSON file path (default PRICE_HISTORY_FILE
+                env var, else prices_history.json)
+
+    Returns:
+        Dict with "timestamp" (datetime64[s] array) and one float array per field
+    """
+    if source is None or isinstance(source, (str, os.PathLike)):
+        path = source or os.getenv("PRICE_HISTORY_FILE", DEFAULT_HISTORY_FILE)
+        with open(path) as f:
+            source = json.load(f)
+
+    by_time = {}
+    for point in source:
+        try:
+            values = [float(point[field]) for field in fields]
+            when = parse_timestamp(point["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if all(v > 0 for v in values):
+            by_time[when] = values
+
+    times = sorted(by_time)
+    values = np.array([by_time[t] for t in times], dtype=float).reshape(len(times), len(fields))
+    history = {"timestamp": np.array(times, dtype="datetime64[s]")}
+    for i, field in enumerate(fields):
+        history[field] = values[:, i]
+    return history
+
+
+def iter_price_points(f, chunk_size=READ_CHUNK_BYTES):
+    """Yield the elements of a JSON array file one at a time, reading it chunk by chunk."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Price history file is not a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                point, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield point
+                pos = end
+                continue
+        elif eof:
+            if not started:
+                raise ValueError("Price history file is empty")
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+
+class PriceHistoryFollower:
+    """
+    Follows a PriceMonitor history file, reading only the points recorded since the last poll.
+
+    PriceMonitor rewrites the whole file with the most recent point first, so
+    new points are at its head. The first poll loads the whole file; later
+    polls decode points from its start, a chunk at a time, and stop at the
+    first one already seen, so taking in k new ticks reads and parses O(k)
+    points rather than the whole file.
+    """
+
+    def __init__(self, path=None, fields=PRICE_FIELDS):
+        self.path = path or os.getenv("PRICE_HISTORY_FILE", DEFAULT_HISTORY_FILE)
+        self.fields = tuple(fields)
+        self.last_timestamp = None
+        self._signature = None
+
+    def poll(self):
+        """
+        Points recorded since the last poll, as a load_price_history() result.
+
+        Returns None if the file is missing or has not changed.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return None
+
+        if self.last_timestamp is None:
+            history = load_price_history(self.path, self.fields)
+        else:
+            points = []
+            with open(self.path) as f:
+                for point in iter_price_points(f):
+                    try:
+                        when = np.datetime64(parse_timestamp(point["timestamp"]), "s")
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if when <= self.last_timestamp:
+                        break
+                    points.append(point)
+            history = load_price_history(points, self.fields)
+        if history["timestamp"].size:
+            self.last_timestamp = history["timestamp"][-1]
+        self._signature = signature
+        return history
+
+
+def price_matrix(history, fields=PRICE_FIELDS):
+    """(n_points, n_fields) array of prices, oldest first."""
+    return np.column_stack([history[field] for field in fields])
+
+
+def log_returns(history, fields=PRICE_FIELDS):
+    """(n_points - 1, n_fields) array of tick-to-tick log returns."""
+    return np.diff(np.log(price_matrix(history, fields)), axis=0)
+
+
+def tick_seconds(history):
+    """Median spacing between price points, in seconds."""
+    if history["timestamp"].size < 2:
+        return None
+    return float(np.median(np.diff(history["timestamp"]).astype(float)))
+
+
+def synthetic_history(n, seed=0, interval_minutes=5, start=None):
+    """
+    A reproducible price history in the PriceMonitor format, for tests and benchmarks.
+
+    Hash, token and energy prices follow correlated geometric random walks.
+    Points are listed most recent first, as the API returns them.
+    """
+    rng = np.random.default_rng(seed)
+    corr = np.array([[1.0, 0.6, -0.3], [0.6, 1.0, -0.2], [-0.3, -0.2, 1.0]])
+    vols = np.array([0.004, 0.006, 0.008])
+    steps = rng.standard_normal((n, 3)) @ np.linalg.cholesky(corr).T * vols
+    prices = np.array([2.5, 3.0, 0.65]) * np.exp(np.cumsum(steps, axis=0))
+    start = start or datetime(2025, 6, 1)
+    points = [
+        {
+            "timestamp": (start + timedelta(minutes=interval_minutes * i)).isoformat(),
+            "hash_price": float(prices[i, 0]),
+            "token_price": float(prices[i, 1]),
+            "energy_price": float(prices[i, 2]),
+        }
+        for i in range(n)
+    ]
+    return points[::-1]
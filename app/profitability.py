@@ -0,0 +1,232 @@
+import threading
+import time
+
+import numpy as np
+
+from app.allocation import ALLOCATION_PRICE_FIELDS, inventory_items
+from app.hedge_ratios import load_inventory
+from app.price_history import PriceHistoryFollower, load_price_history, parse_timestamp, synthetic_history
+
+INITIAL_CAPACITY = 1024
+
+
+class ProfitabilityTables:
+    """
+    Revenue per watt and margin of every inventory item at every recorded tick.
+
+    An item's revenue per unit of power is its output per watt (fixed by its
+    specs) times its output price, which is also its breakeven energy price:
+    above it the machine costs more to run than it earns. Tables are built
+    for a whole history in one vectorized pass and grown by appending rows
+    as ticks arrive (amortized O(1) each, capacity doubles). The latest
+    breakevens and running means are kept alongside, so breakeven lookups
+    are constant time.
+    """
+
+    def __init__(self, inventory=None, capacity=INITIAL_CAPACITY):
+        self.items = inventory_items(inventory if inventory is not None else load_inventory())
+        self.names = tuple(self.items["names"])
+        self.fields = ALLOCATION_PRICE_FIELDS
+        self.output_per_watt = self.items["output"] / self.items["power"]
+        self._column = {name: i for i, name in enumerate(self.names)}
+        self._price_index = np.array([self.fields.index(f) for f in self.items["price_field"]])
+
+        n = len(self.names)
+        self._timestamps = np.empty(capacity, dtype="datetime64[s]")
+        self._prices = np.empty((capacity, len(self.fields)))
+        self._revenue_per_watt = np.empty((capacity, n))
+        self._margin = np.empty((capacity, n))
+        self.count = 0
+        self._revenue_per_watt_sum = np.zeros(n)
+        self._margin_sum = np.zeros(n)
+        self._profitable_ticks = np.zeros(n, dtype=np.int64)
+        self._breakevens = {}
+        self.last_timestamp = None
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, rows):
+        needed = self.count + rows
+        if needed <= self._timestamps.size:
+            return
+        capacity = max(needed, 2 * self._timestamps.size)
+        for name in ("_timestamps", "_prices", "_revenue_per_watt", "_margin"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _append(self, timestamps, prices):
+        """Add rows for (k,) timestamps and (k, fields) prices in one pass."""
+        k = prices.shape[0]
+        if k == 0:
+            return 0
+        self._grow(k)
+        energy = prices[:, self.fields.index("energy_price")]
+        revenue_per_watt = prices[:, self._price_index] * self.output_per_watt
+        margin = (revenue_per_watt - energy[:, None]) * self.items["power"]
+
+        rows = slice(self.count, self.count + k)
+        self._timestamps[rows] = timestamps
+        self._prices[rows] = prices
+        self._revenue_per_watt[rows] = revenue_per_watt
+        self._margin[rows] = margin
+        self.count += k
+
+        self._revenue_per_watt_sum += revenue_per_watt.sum(axis=0)
+        self._margin_sum += margin.sum(axis=0)
+        self._profitable_ticks += (margin > 0).sum(axis=0)
+        self._breakevens = dict(zip(self.names, revenue_per_watt[-1].tolist()))
+        self.last_timestamp = timestamps[-1]
+        return k
+
+    def update(self, prices, timestamp=None):
+        """
+        Add one tick; prices maps hash_price, token_price and energy_price to values.
+
+        timestamp (a price point's timestamp, default now) identifies the
+        tick: one at or before the last recorded tick is skipped, so polling
+        the same quote again adds nothing. Returns the number of rows added.
+        """
+        if timestamp is None:
+            timestamp = np.datetime64("now", "s")
+        elif isinstance(timestamp, np.datetime64):
+            timestamp = timestamp.astype("datetime64[s]")
+        else:
+            timestamp = np.datetime64(parse_timestamp(timestamp), "s")
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return 0
+        return self._append(np.array([timestamp]), np.array([[float(prices[f]) for f in self.fields]]))
+
+    def fit(self, history):
+        """Add every point of a load_price_history() result not yet seen, in one pass."""
+        timestamps = history["timestamp"].astype("datetime64[s]")
+        start = 0
+        if self.last_timestamp is not None:
+            start = int(np.searchsorted(timestamps, self.last_timestamp, side="right"))
+        prices = np.column_stack([history[f][start:] for f in self.fields])
+        return self._append(timestamps[start:], prices)
+
+    def breakeven_energy_price(self, item, prices=None):
+        """
+        Energy price at which one item's margin is zero.
+
+        Uses the latest tick, or the output prices in prices when given;
+        either way it is a constant-time lookup.
+        """
+        if prices is None:
+            return self._breakevens.get(item)
+        i = self._column[item]
+        return float(prices[self.items["price_field"][i]]) * float(self.output_per_watt[i])
+
+    def breakevens(self):
+        """{item: breakeven energy price} at the latest tick."""
+        return dict(self._breakevens)
+
+    def fleet_breakeven(self, counts=None, prices=None):
+        """Energy price at which a fleet (default one of each item) stops making money."""
+        counts = np.array([1 if counts is None else counts.get(name, 0) for name in self.names], dtype=float)
+        if prices is None:
+            if not self.count:
+                return None
+            revenue_per_watt = self._revenue_per_watt[self.count - 1]
+        else:
+            price = np.array([float(prices[f]) for f in self.items["price_field"]])
+            revenue_per_watt = price * self.output_per_watt
+        watts = counts * self.items["power"]
+        total = watts.sum()
+        return float(revenue_per_watt @ watts / total) if total > 0 else None
+
+    def table(self, last=None):
+        """
+        Views of the tables, oldest first: the last `last` ticks, or all of them.
+
+        Returns:
+            Dict with "items", "timestamp" (T,), "revenue_per_watt" and "margin" (T, items)
+        """
+        start = 0 if last is None else max(self.count - last, 0)
+        rows = slice(start, self.count)
+        return {
+            "items": self.names,
+            "timestamp": self._timestamps[rows],
+            "revenue_per_watt": self._revenue_per_watt[rows],
+            "margin": self._margin[rows],
+        }
+
+    def summary(self):
+        """Per item: latest revenue per watt, margin and breakeven, and means over the whole history."""
+        if not self.count:
+            return {}
+        latest = self.count - 1
+        return {
+            name: {
+                "revenue_per_watt": float(self._revenue_per_watt[latest, i]),
+                "margin": float(self._margin[latest, i]),
+                "breakeven_energy_price": self._breakevens[name],
+                "mean_revenue_per_watt": float(self._revenue_per_watt_sum[i] / self.count),
+                "mean_margin": float(self._margin_sum[i] / self.count),
+                "profitable_share": float(self._profitable_ticks[i] / self.count),
+            }
+            for i, name in enumerate(self.names)
+        }
+
+
+_tables = None
+_tables_lock = threading.Lock()
+_history = None
+
+
+def get_tables():
+    """
+    Shared ProfitabilityTables for the inventory, fed only newly recorded ticks.
+
+    Returns None while no price history has been recorded.
+    """
+    global _tables, _history
+    with _tables_lock:
+        if _history is None:
+            _history = PriceHistoryFollower(fields=ALLOCATION_PRICE_FIELDS)
+        history = _history.poll()
+        if history is not None:
+            if _tables is None:
+                _tables = ProfitabilityTables()
+            _tables.fit(history)
+        return _tables
+
+
+def reset_tables():
+    global _tables, _history
+    with _tables_lock:
+        _tables = None
+        _history = None
+
+
+def benchmark(n=100_000, updates=10_000):
+    history = load_price_history(synthetic_history(n))
+    tables = ProfitabilityTables()
+    start = time.perf_counter()
+    tables.fit(history)
+    fit_seconds = time.perf_counter() - start
+
+    last = {f: float(history[f][-1]) for f in tables.fields}
+    start = time.perf_counter()
+    for i in range(updates):
+        tables.update(last, history["timestamp"][-1] + np.timedelta64(300 * (i + 1), "s"))
+    update_seconds = (time.perf_counter() - start) / updates
+
+    start = time.perf_counter()
+    for _ in range(updates):
+        tables.breakeven_energy_price("hydro")
+    lookup_seconds = (time.perf_counter() - start) / updates
+    return {"ticks": n, "fit_seconds": fit_seconds, "update_seconds": update_seconds,
+            "lookup_seconds": lookup_seconds, "breakevens": tables.breakevens()}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Tables for {result['ticks']:,} ticks in {result['fit_seconds'] * 1e3:.1f} ms; "
+          f"{result['update_seconds'] * 1e6:.1f} us per new tick, "
+          f"{result['lookup_seconds'] * 1e9:.0f} ns per breakeven lookup")
+    for item, price in result["breakevens"].items():
+        print(f"  {item}: breakeven energy price {price:.3f}")
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from app.cache import TTLCache
+from app.market_data import get_market_data
+
+# Reference levels for the assets with no live feed in this app; override
+# with BTC_PRICE / ENERGY_PRICE (energy in USD/MWh)
+REFERENCE_PRICES = {"btc_price": 68730.0, "energy_price": 55.0}
+
+# Latest upstream price point fields published as quotes
+UPSTREAM_FIELDS = ("hash_price", "token_price")
+# The upstream tick's own energy price, in the units its hash and token
+# prices are set against; kept apart from the USD/MWh reference energy_price
+UPSTREAM_ENERGY_FIELD = "upstream_energy_price"
+
+QUOTE_FIELDS = tuple(REFERENCE_PRICES) + UPSTREAM_FIELDS + (UPSTREAM_ENERGY_FIELD,)
+
+QUOTES_TTL_SECONDS = 15
+QUOTES_STALE_SECONDS = 300
+
+
+def reference_quotes():
+    return {
+        field: {"price": float(os.getenv(field.split("_")[0].upper() + "_PRICE", default)),
+                "source": "reference"}
+        for field, default in REFERENCE_PRICES.items()
+    }
+
+
+def upstream_quotes():
+    latest = get_market_data()[0]
+    fields = dict(zip(UPSTREAM_FIELDS, UPSTREAM_FIELDS), **{UPSTREAM_ENERGY_FIELD: "energy_price"})
+    return {
+        field: {"price": float(latest[key]), "source": "upstream", "as_of": latest.get("timestamp")}
+        for field, key in fields.items()
+    }
+
+
+class QuoteService:
+    """
+    One cached snapshot of numeric quotes from several sources.
+
+    Every reader gets the same snapshot until it expires; after that the
+    stale snapshot keeps being served while one background refresh replaces
+    it (see TTLCache). A source that fails keeps its quotes from the
+    previous snapshot, flagged "stale", instead of failing the whole lookup.
+
+    With initial_sources set, a cold service does not wait on the slow
+    sources either: until the first full snapshot has loaded in the
+    background, readers get a snapshot built from initial_sources alone.
+    """
+
+    def __init__(self, sources=(reference_quotes, upstream_quotes), ttl_seconds=QUOTES_TTL_SECONDS,
+                 stale_seconds=QUOTES_STALE_SECONDS, clock=time.monotonic, initial_sources=None):
+        self.sources = tuple(sources)
+        self.initial_sources = tuple(initial_sources) if initial_sources is not None else None
+        self._cache = TTLCache(ttl_seconds=ttl_seconds, stale_seconds=stale_seconds, clock=clock)
+        self._last = {}
+        self._lock = threading.Lock()
+        self._initial = None
+        self._priming = None
+        self._primed = self.initial_sources is None
+
+    def _load(self, sources=None):
+        quotes = {}
+        errors = []
+        for source in self.sources if sources is None else sources:
+            try:
+                quotes.update(source())
+            except (requests.exceptions.RequestException, KeyError, IndexError, TypeError, ValueError) as e:
+                errors.append(f"{source.__name__}: {e}")
+        with self._lock:
+            for field, quote in self._last.items():
+                if field not in quotes:
+                    quotes[field] = dict(quote, stale=True)
+            self._last.update({f: q for f, q in quotes.items() if not q.get("stale")})
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "quotes": quotes,
+            "errors": errors,
+        }
+
+    def _prime(self):
+        try:
+            self._cache.get("snapshot", self._load)
+        finally:
+            self._primed = True
+
+    def snapshot(self):
+        if not self._primed:
+            with self._lock:
+                if self._priming is None:
+                    self._priming = threading.Thread(target=self._prime, daemon=True)
+                    self._priming.start()
+            if self._initial is None:
+                self._initial = self._load(self.initial_sources)
+            return self._initial
+        return self._cache.get("snapshot", self._load)
+
+    def get_quotes(self, fields=None):
+        """
+        Batched lookup: all requested quotes from one snapshot.
+
+        Returns:
+            Dict with the snapshot timestamp and {field: quote or None}
+        """
+        snapshot = self.snapshot()
+        fields = QUOTE_FIELDS if fields is None else fields
+        return {
+            "timestamp": snapshot["timestamp"],
+            "quotes": {field: snapshot["quotes"].get(field) for field in fields},
+        }
+
+    def prices(self, fields=None):
+        """{field: price} from one snapshot, for fields that have a quote."""
+        quotes = self.get_quotes(fields)["quotes"]
+        return {field: quote["price"] for field, quote in quotes.items() if quote is not None}
+
+    def upstream_prices(self):
+        """
+        hash_price, token_price and energy_price of one upstream tick, from
+        one snapshot, or {} if the snapshot has no complete tick. The energy
+        price is the tick's own, never the reference quote.
+        """
+        fields = dict(zip(UPSTREAM_FIELDS, UPSTREAM_FIELDS), energy_price=UPSTREAM_ENERGY_FIELD)
+        quotes = self.get_quotes(tuple(fields.values()))["quotes"]
+        tick = [quotes[field] for field in fields.values()]
+        if any(quote is None for quote in tick) or len({quote.get("as_of") for quote in tick}) != 1:
+            return {}
+        return {name: quotes[field]["price"] for name, field in fields.items()}
+
+    def refresh(self):
+        """Drop the cached snapshot so the next lookup loads a new one."""
+        self._cache.invalidate()
+
+    def stats(self):
+        return self._cache.stats()
+
+
+# Reference quotes are local, so the first page load never waits on upstream
+_service = QuoteService(initial_sources=(reference_quotes,))
+
+
+def get_quote_service():
+    return _service
+
+
+def get_quotes(fields=None):
+    return _service.get_quotes(fields)
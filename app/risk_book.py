@@ -0,0 +1,292 @@
+import time
+from datetime import date
+
+import numpy as np
+
+from app.pricing import CALL, FUTURE, PUT, black76
+
+# Columns of every contribution vector / subtotal
+RISK_FIELDS = ("value", "pnl", "delta", "gamma", "vega", "theta")
+_N_FIELDS = len(RISK_FIELDS)
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+class PositionBook:
+    """
+    Book of option and futures positions with incrementally maintained risk.
+
+    Positions live in preallocated column arrays. Every position's per-unit
+    price and Greeks are cached, so adding, removing or resizing a position
+    only prices that one position and adjusts the running totals. A move in
+    one asset's forward or vol revalues just that asset's positions, as one
+    vectorized black76() call, and rebuilds its subtotals with bincount.
+
+    Totals and subtotals (per asset, and per asset and expiry) are arrays
+    over RISK_FIELDS: value, pnl, delta, gamma, vega, theta.
+    """
+
+    def __init__(self, market, valuation_date=None, rate=0.0, capacity=1024):
+        """
+        Args:
+            market: {asset: {"forward": float, "vol": float}}, e.g. for "BTC" and "Energy"
+            valuation_date: Date Greeks are computed as of (default today)
+            rate: Continuously compounded discount rate
+            capacity: Initial number of position slots; grows as needed
+        """
+        self.valuation_date = _as_date(valuation_date or date.today())
+        self.rate = rate
+        self.market = {asset: dict(inputs) for asset, inputs in market.items()}
+
+        self._assets = list(self.market)
+        self._asset_ids = {asset: i for i, asset in enumerate(self._assets)}
+        self._expiries = []
+        self._expiry_ids = {}
+
+        self._size = 0
+        self._free = []
+        self._allocate(capacity)
+
+        self._totals = np.zeros(_N_FIELDS)
+        self._asset_totals = np.zeros((len(self._assets), _N_FIELDS))
+        self._expiry_totals = np.zeros((len(self._assets), 0, _N_FIELDS))
+
+    # -- storage ---------------------------------------------------------
+
+    def _allocate(self, capacity):
+        def grow(old, dtype, fill=0):
+            new = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                new[:old.size] = old
+            return new
+
+        self._asset = grow(getattr(self, "_asset", None), np.int16)
+        self._kind = grow(getattr(self, "_kind", None), np.int8)
+        self._strike = grow(getattr(self, "_strike", None), float)
+        self._expiry = grow(getattr(self, "_expiry", None), np.int32)
+        self._qty = grow(getattr(self, "_qty", None), float)
+        self._entry = grow(getattr(self, "_entry", None), float)
+        self._active = grow(getattr(self, "_active", None), bool, False)
+        unit = np.zeros((capacity, 5))
+        if getattr(self, "_unit", None) is not None:
+            unit[:self._unit.shape[0]] = self._unit
+        self._unit = unit  # price, delta, gamma, vega, theta per unit
+
+    def _asset_id(self, asset):
+        if asset not in self._asset_ids:
+            raise KeyError(f"No market data for asset {asset!r}")
+        return self._asset_ids[asset]
+
+    def _expiry_id(self, expiry):
+        expiry = _as_date(expiry)
+        if expiry not in self._expiry_ids:
+            self._expiry_ids[expiry] = len(self._expiries)
+            self._expiries.append(expiry)
+            pad = np.zeros((len(self._assets), 1, _N_FIELDS))
+            self._expiry_totals = np.concatenate([self._expiry_totals, pad], axis=1)
+        return self._expiry_ids[expiry]
+
+    def _years(self, expiry_ids):
+        days = np.array([(e - self.valuation_date).days for e in self._expiries], dtype=float)
+        return days[expiry_ids] / 365.0
+
+    def _price(self, idx):
+        """Per-unit price and Greeks for slots idx, as an (n, 5) array."""
+        forwards = np.array([self.market[a]["forward"] for a in self._assets])
+        vols = np.array([self.market[a]["vol"] for a in self._assets])
+        asset = self._asset[idx]
+        kind = self._kind[idx]
+        # Futures are valued against their entry level
+        strike = np.where(kind == FUTURE, self._entry[idx], self._strike[idx])
+        g = black76(forwards[asset], strike, self._years(self._expiry[idx]),
+                    vols[asset], self.rate, kind)
+        return np.column_stack([g["price"], g["delta"], g["gamma"], g["vega"], g["theta"]])
+
+    def _contributions(self, idx):
+        """(n, len(RISK_FIELDS)) risk contributions of slots idx."""
+        qty = self._qty[idx][:, None]
+        unit = self._unit[idx]
+        entry = np.where(self._kind[idx] == FUTURE, 0.0, self._entry[idx])
+        value = qty[:, 0] * unit[:, 0]
+        pnl = qty[:, 0] * (unit[:, 0] - entry)
+        return np.column_stack([value, pnl, qty * unit[:, 1:]])
+
+    def _apply(self, idx, sign):
+        contrib = self._contributions(idx) * sign
+        self._totals += contrib.sum(axis=0)
+        np.add.at(self._asset_totals, self._asset[idx], contrib)
+        np.add.at(self._expiry_totals, (self._asset[idx], self._expiry[idx]), contrib)
+
+    # -- positions -------------------------------------------------------
+
+    def add_positions(self, asset, instrument, strike, expiry, quantity, entry_price=None):
+        """
+        Add many positions at once; arguments are equal-length sequences.
+
+        entry_price defaults to the current per-unit price (current forward
+        for futures), i.e. positions start with zero P&L. For futures the
+        entry level replaces strike; NaN entries take the default.
+
+        Returns:
+            Array of position ids
+        """
+        asset_ids = np.array([self._asset_id(a) for a in asset], dtype=np.int16)
+        n = asset_ids.size
+        expiry_ids = np.array([self._expiry_id(e) for e in expiry], dtype=np.int32)
+
+        slots = [self._free.pop() for _ in range(min(n, len(self._free)))]
+        fresh = n - len(slots)
+        if self._size + fresh > self._active.size:
+            self._allocate(max(2 * self._active.size, self._size + fresh))
+        idx = np.array(slots + list(range(self._size, self._size + fresh)), dtype=np.int64)
+        self._size += fresh
+
+        self._asset[idx] = asset_ids
+        self._kind[idx] = np.asarray(instrument)
+        self._strike[idx] = np.asarray(strike, dtype=float)
+        self._expiry[idx] = expiry_ids
+        self._qty[idx] = np.asarray(quantity, dtype=float)
+        self._active[idx] = True
+
+        # A future's entry level doubles as its strike, so it is set before pricing
+        given = np.full(n, np.nan) if entry_price is None else np.asarray(entry_price, dtype=float)
+        is_future = self._kind[idx] == FUTURE
+        forwards = np.array([self.market[a]["forward"] for a in self._assets])
+        self._entry[idx] = np.where(is_future, np.where(np.isnan(given), forwards[asset_ids], given), 0.0)
+        self._unit[idx] = self._price(idx)
+        self._entry[idx] = np.where(is_future | ~np.isnan(given),
+                                    np.where(is_future, self._entry[idx], given),
+                                    self._unit[idx, 0])
+        self._apply(idx, 1.0)
+        return idx
+
+    def add_position(self, asset, instrument, strike, expiry, quantity, entry_price=None):
+        """Add one position; returns its id."""
+        entry = None if entry_price is None else [entry_price]
+        return int(self.add_positions([asset], [instrument], [strike], [expiry], [quantity], entry)[0])
+
+    def remove_position(self, position_id):
+        idx = np.array([position_id])
+        if not self._active[position_id]:
+            raise KeyError(f"Position {position_id} is not in the book")
+        self._apply(idx, -1.0)
+        self._active[position_id] = False
+        self._qty[position_id] = 0.0
+        self._free.append(position_id)
+
+    def update_quantity(self, position_id, quantity):
+        if not self._active[position_id]:
+            raise KeyError(f"Position {position_id} is not in the book")
+        idx = np.array([position_id])
+        self._apply(idx, -1.0)
+        self._qty[position_id] = quantity
+        self._apply(idx, 1.0)
+
+    # -- market ----------------------------------------------------------
+
+    def update_market(self, asset, forward=None, vol=None):
+        """Move one asset's forward and/or vol and revalue only its positions."""
+        a = self._asset_id(asset)
+        if forward is not None:
+            self.market[asset]["forward"] = forward
+        if vol is not None:
+            self.market[asset]["vol"] = vol
+
+        idx = np.flatnonzero(self._active[:self._size] & (self._asset[:self._size] == a))
+        self._unit[idx] = self._price(idx)
+        self._rebuild_asset(a, idx)
+
+    def set_valuation_date(self, valuation_date):
+        """Roll the book forward in time; every position is revalued."""
+        self.valuation_date = _as_date(valuation_date)
+        for a in range(len(self._assets)):
+            idx = np.flatnonzero(self._active[:self._size] & (self._asset[:self._size] == a))
+            self._unit[idx] = self._price(idx)
+            self._rebuild_asset(a, idx)
+
+    def _rebuild_asset(self, a, idx):
+        contrib = self._contributions(idx)
+        by_expiry = np.zeros((len(self._expiries), _N_FIELDS))
+        for field in range(_N_FIELDS):
+            by_expiry[:, field] = np.bincount(self._expiry[idx], weights=contrib[:, field],
+                                              minlength=len(self._expiries))
+        self._expiry_totals[a] = by_expiry
+        self._asset_totals[a] = by_expiry.sum(axis=0)
+        self._totals = self._asset_totals.sum(axis=0)
+
+    # -- reporting -------------------------------------------------------
+
+    def __len__(self):
+        return int(self._active[:self._size].sum())
+
+    def totals(self):
+        return dict(zip(RISK_FIELDS, self._totals.tolist()))
+
+    def subtotals(self):
+        """Risk per asset, with a nested breakdown per expiry date."""
+        result = {}
+        for a, asset in enumerate(self._assets):
+            by_expiry = {
+                expiry.isoformat(): dict(zip(RISK_FIELDS, self._expiry_totals[a, e].tolist()))
+                for e, expiry in enumerate(self._expiries)
+                if self._expiry_totals[a, e].any()
+            }
+            result[asset] = dict(zip(RISK_FIELDS, self._asset_totals[a].tolist()), expiries=by_expiry)
+        return result
+
+    def positions(self):
+        """Snapshot of live positions as column arrays."""
+        idx = np.flatnonzero(self._active[:self._size])
+        return {
+            "id": idx,
+            "asset": np.array(self._assets)[self._asset[idx]],
+            "instrument": self._kind[idx].copy(),
+            "strike": self._strike[idx].copy(),
+            "expiry": np.array([self._expiries[e] for e in self._expiry[idx]]),
+            "quantity": self._qty[idx].copy(),
+            "entry_price": self._entry[idx].copy(),
+        }
+
+
+def random_book(n, market, valuation_date=None, seed=0):
+    """A reproducible book of n BTC and energy positions, for tests and benchmarks."""
+    rng = np.random.default_rng(seed)
+    valuation_date = _as_date(valuation_date or date.today())
+    book = PositionBook(market, valuation_date, capacity=n)
+    assets = rng.choice(list(market), n)
+    forwards = np.array([market[a]["forward"] for a in assets])
+    expiries = [date.fromordinal(valuation_date.toordinal() + int(d))
+                for d in rng.choice([7, 14, 30, 60, 90, 180, 365], n)]
+    book.add_positions(assets, rng.choice([CALL, PUT, FUTURE], n),
+                       forwards * rng.uniform(0.7, 1.3, n), expiries,
+                       rng.integers(-50, 51, n).astype(float))
+    return book
+
+
+def benchmark(n=100_000, seed=0):
+    market = {"BTC": {"forward": 68_730.0, "vol": 0.65}, "Energy": {"forward": 55.0, "vol": 0.40}}
+    start = time.perf_counter()
+    book = random_book(n, market, seed=seed)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    book.update_market("BTC", forward=69_000.0)
+    refresh_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pid = book.add_position("BTC", CALL, 70_000.0, date.today().replace(year=date.today().year + 1), 5)
+    book.update_quantity(pid, 10)
+    book.remove_position(pid)
+    edit_seconds = (time.perf_counter() - start) / 3
+
+    return {"n": n, "build_seconds": build_seconds, "refresh_seconds": refresh_seconds,
+            "edit_seconds": edit_seconds}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['n']:,}-position book: built in {result['build_seconds'] * 1000:.0f} ms, "
+          f"BTC move refreshed in {result['refresh_seconds'] * 1000:.1f} ms, "
+          f"single-position edit {result['edit_seconds'] * 1e6:.0f} us")
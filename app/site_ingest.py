@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.cache import DiskCache
+from app.site_scoring import score_site
+from app.site_store import get_site_store
+from app.spatial_index import WEATHER_GRID_DEGREES, cell_center, cell_key, grid_cell
+
+# Sites to analyze, shared with api.php
+SITES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sites.json")
+
+
+def load_sites(path=None):
+    """[{"lat", "lon", "name", "type"}] from the shared site list (SITES_FILE env var overrides)."""
+    with open(path or os.getenv("SITES_FILE", SITES_FILE)) as f:
+        return json.load(f)
+
+
+SITES = load_sites()
+
+# Base URLs can be pointed at a local stand-in server (see tests/test_site_ingest.py)
+NASA_POWER_URL = os.getenv("NASA_POWER_URL", "https://power.larc.nasa.gov")
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com")
+
+SOLAR_START = "20240101"
+SOLAR_END = "20240131"
+CURRENT_WEATHER = ("temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,"
+                   "cloud_cover,wind_speed_10m,wind_direction_10m")
+HOURLY_WEATHER = "temperature_2m,cloud_cover,wind_speed_10m"
+
+SITE_CACHE_DIR = "site_cache"
+# Solar data for a past date range never changes; weather does
+WEATHER_TTL_SECONDS = 15 * 60
+# Sites refreshed more recently than this are skipped
+SITE_MAX_AGE_SECONDS = 60 * 60
+
+CONCURRENCY = 8
+TIMEOUT_SECONDS = 10.0
+# Overall limit on one refresh; sites not done by then are reported as failed
+REFRESH_DEADLINE_SECONDS = 30.0
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+
+PANEL_AREA = 1000
+PANEL_EFFICIENCY = 0.20
+MJ_TO_KWH = 0.277778
+
+
+def solar_url(lat, lon, start=SOLAR_START, end=SOLAR_END):
+    return (f"{NASA_POWER_URL}/api/temporal/daily/point?parameters=ALLSKY_SFC_SW_DWN&community=SB"
+            f"&start={start}&end={end}&latitude={lat}&longitude={lon}&format=JSON")
+
+
+def weather_url(lat, lon):
+    return (f"{OPEN_METEO_URL}/v1/forecast?latitude={lat}&longitude={lon}&current={CURRENT_WEATHER}"
+            f"&hourly={HOURLY_WEATHER}&timezone=auto")
+
+
+def generate_basic_recommendation(avg_daily_kwh, weather):
+    temp = ((weather or {}).get("current") or {}).get("temperature_2m", 25)
+    if avg_daily_kwh > 4000:
+        if 10 < temp < 30:
+            return "Excellent solar potential with ideal operating temperatures."
+        return "High solar output, but monitor temperatures."
+    elif avg_daily_kwh > 2000:
+        return "Good solar potential. Suitable for most operations."
+    return "Moderate solar potential. Consider for smaller scale or supplementary power."
+
+
+def process_site_data(solar, weather, site, rng=random):
+    """
+    Per-site record in the saved_data.json shape, as processSiteData in api.php.
+
+    performance_score comes from score_site() instead of random noise, so it
+    is reproducible; the hardware block is still mock data drawn from rng.
+
+    Returns:
+        The site dict, or None if the solar response has no irradiance data
+    """
+    try:
+        irradiance = solar["properties"]["parameter"]["ALLSKY_SFC_SW_DWN"]
+    except (KeyError, TypeError):
+        return None
+
+    total_kwh = 0.0
+    for value in irradiance.values():
+        if value < 0:
+            continue
+        total_kwh += value * MJ_TO_KWH * PANEL_AREA * PANEL_EFFICIENCY
+    avg_daily_kwh = total_kwh / len(irradiance) if irradiance else 0
+
+    # Mock hardware data
+    gpu_total = rng.randint(500, 2000)
+    gpu_used = rng.randint(100, gpu_total)
+    battery_capacity_mwh = rng.randint(5, 20)
+
+    record = {
+        "name": site["name"],
+        "lat": site["lat"],
+        "lon": site["lon"],
+        "energy_type": site["type"],
+        "total_kwh": total_kwh,
+        "avg_daily_kwh": avg_daily_kwh,
+        "annual_kwh_yr": avg_daily_kwh * 365,
+        "weather": weather,
+        "performance_score": None,
+        "recommendation": generate_basic_recommendation(avg_daily_kwh, weather),
+        "hardware": {
+            "gpu_total": gpu_total,
+            "gpu_used": gpu_used,
+            "battery_brand": "LG",
+            "battery_capacity_mwh": battery_capacity_mwh,
+        },
+    }
+    record["performance_score"] = score_site(record)
+    return record
+
+
+class SiteIngester:
+    """
+    Fetches solar and weather data for many sites with bounded concurrency.
+
+    At most `concurrency` HTTP requests are in flight at once, each with a
+    timeout, and failed requests (connection errors, 429/5xx, bad JSON) are
+    retried with exponential backoff. Responses are cached on disk by
+    (lat, lon, date range) for solar data, so solar data that never changes
+    is fetched once. Weather is fetched once per weather grid cell, at the
+    cell's center, and stored once per cell for every site in it. Sites
+    whose stored data is younger than max_age_seconds are skipped, and a
+    site that fails keeps its stored data.
+    """
+
+    def __init__(self, store=None, cache_dir=None, concurrency=CONCURRENCY, timeout=TIMEOUT_SECONDS,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS, max_age_seconds=SITE_MAX_AGE_SECONDS,
+                 weather_ttl_seconds=WEATHER_TTL_SECONDS, weather_grid_degrees=WEATHER_GRID_DEGREES,
+                 rng=None):
+        self.store = store if store is not None else get_site_store()
+        cache_dir = cache_dir or os.getenv("SITE_CACHE_DIR", SITE_CACHE_DIR)
+        self.solar_cache = DiskCache(os.path.join(cache_dir, "solar"), float("inf"))
+        self.weather_cache = DiskCache(os.path.join(cache_dir, "weather"), weather_ttl_seconds)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_age_seconds = max_age_seconds
+        self.weather_grid_degrees = weather_grid_degrees
+        self.rng = rng or random.Random()
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0}
+        self._inflight = {}
+
+    def stale_sites(self, sites=SITES, now=None):
+        """Sites with no stored data or data older than max_age_seconds."""
+        now = time.time() if now is None else now
+        stale = []
+        for site in sites:
+            updated_at = self.store.updated_at(site["name"])
+            if updated_at is None or now - updated_at >= self.max_age_seconds:
+                stale.append(site)
+        return stale
+
+    def _get(self, url):
+        response = requests.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch(self, cache, key, url, semaphore, executor):
+        """One shared task per key, so sites at the same coordinates wait on a single request."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(
+                self._fetch_uncached(cache, key, url, semaphore, executor))
+        return task
+
+    async def _fetch_uncached(self, cache, key, url, semaphore, executor):
+        cached = cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            async with semaphore:
+                self.stats["requests"] += 1
+                try:
+                    data = await loop.run_in_executor(executor, self._get, url)
+                    break
+                except requests.exceptions.HTTPError as e:
+                    status = e.response.status_code if e.response is not None else 0
+                    if (status != 429 and status < 500) or attempt == self.retries:
+                        raise
+                except (requests.exceptions.RequestException, ValueError):
+                    if attempt == self.retries:
+                        raise
+            self.stats["retries"] += 1
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+        cache.set(key, data)
+        return data
+
+    async def _ingest_site(self, site, semaphore, executor):
+        lat, lon = site["lat"], site["lon"]
+        cell = grid_cell(lat, lon, self.weather_grid_degrees)
+        solar, weather = await asyncio.gather(
+            self._fetch(self.solar_cache, ("solar", lat, lon, SOLAR_START, SOLAR_END),
+                        solar_url(lat, lon), semaphore, executor),
+            self._fetch(self.weather_cache, ("weather", self.weather_grid_degrees, cell),
+                        weather_url(*cell_center(cell, self.weather_grid_degrees)), semaphore, executor),
+        )
+        record = process_site_data(solar, weather, site, self.rng)
+        if record is None:
+            raise ValueError("No ALLSKY_SFC_SW_DWN data in the solar response")
+        self.store.put(record, weather_cell=cell_key(cell, self.weather_grid_degrees))
+        return record
+
+    async def ingest(self, sites=SITES, force=False, deadline=None):
+        """
+        Refresh stale sites (all of them with force) into the store.
+
+        With a deadline (seconds), sites still being fetched when it passes
+        are abandoned and reported as failed; sites already done are kept.
+
+        Returns:
+            Dict with the names of "updated", "skipped" and "failed" sites,
+            {name: error} in "errors", and request "stats"
+        """
+        targets = list(sites) if force else self.stale_sites(sites)
+        self._inflight = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        tasks = [asyncio.ensure_future(self._ingest_site(site, semaphore, executor)) for site in targets]
+        pending = set()
+        try:
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=deadline)
+            if pending:
+                # Requests already running finish on their own, bounded by their timeout
+                abandoned = list(pending) + [t for t in self._inflight.values() if not t.done()]
+                for task in abandoned:
+                    task.cancel()
+                await asyncio.gather(*abandoned, return_exceptions=True)
+        finally:
+            executor.shutdown(wait=not pending, cancel_futures=True)
+
+        target_names = {site["name"] for site in targets}
+        errors = {}
+        for site, task in zip(targets, tasks):
+            if task in pending:
+                errors[site["name"]] = f"Timed out after {deadline:g} s"
+            elif task.exception() is not None:
+                errors[site["name"]] = str(task.exception())
+        return {
+            "updated": [site["name"] for site in targets if site["name"] not in errors],
+            "skipped": [site["name"] for site in sites if site["name"] not in target_names],
+            "failed": list(errors),
+            "errors": errors,
+            "stats": dict(self.stats),
+        }
+
+
+def refresh_sites(names=None, force=False, deadline=None, **kwargs):
+    """Synchronous entry point: refresh the named sites (default all) into the shared store."""
+    sites = SITES if names is None else [site for site in SITES if site["name"] in set(names)]
+    return asyncio.run(SiteIngester(**kwargs).ingest(sites, force=force, deadline=deadline))
+
+
+def main():
+    """python -m app.site_ingest [--force] [site name ...]"""
+    args = sys.argv[1:]
+    force = "--force" in args
+    names = [a for a in args if a != "--force"] or None
+    start = time.perf_counter()
+    result = refresh_sites(names, force=force)
+    print(f"Updated {len(result['updated'])}, skipped {len(result['skipped'])}, "
+          f"failed {len(result['failed'])} in {time.perf_counter() - start:.2f} s")
+    for name, error in result["errors"].items():
+        print(f"  {name}: {error}")
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import bisect
+import threading
+import time
+
+import numpy as np
+
+from app.site_store import get_site_store
+
+# Each factor is scaled to 0..1 and the weighted mean maps onto the
+# 1..10 performance_score scale. Sites missing a factor are scored on the
+# others, with the weights renormalized.
+SCORE_WEIGHTS = {
+    "energy": 0.60,
+    "temperature": 0.15,
+    "cloud_cover": 0.10,
+    "gpu_headroom": 0.10,
+    "battery": 0.05,
+}
+# avg_daily_kwh that scores 0.5 on the energy factor (the old score saturated here)
+ENERGY_HALF_KWH = 5000.0
+# Ideal operating temperatures, as in generateBasicRecommendation; the
+# factor falls to 0 this many degrees outside the range
+IDEAL_TEMPERATURE = (10.0, 30.0)
+TEMPERATURE_FALLOFF = 20.0
+BATTERY_FULL_MWH = 20.0
+
+FEATURES = ("avg_daily_kwh", "temperature_2m", "cloud_cover", "gpu_total", "gpu_used", "battery_capacity_mwh")
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def site_features(site):
+    """Raw scoring inputs of one site dict, NaN where missing."""
+    current = (site.get("weather") or {}).get("current") or {}
+    hardware = site.get("hardware") or {}
+    return [
+        _number(site.get("avg_daily_kwh")),
+        _number(current.get("temperature_2m")),
+        _number(current.get("cloud_cover")),
+        _number(hardware.get("gpu_total")),
+        _number(hardware.get("gpu_used")),
+        _number(hardware.get("battery_capacity_mwh")),
+    ]
+
+
+def score_features(features):
+    """
+    Scores for an (n, len(FEATURES)) feature array in one vectorized pass.
+
+    Returns:
+        (n,) unrounded scores in [1, 10]; performance_score is these rounded to 0.1
+    """
+    X = np.atleast_2d(np.asarray(features, dtype=float))
+    kwh, temp, cloud, gpu_total, gpu_used, battery = X.T
+    low, high = IDEAL_TEMPERATURE
+    with np.errstate(invalid="ignore", divide="ignore"):
+        factors = np.column_stack([
+            np.maximum(kwh, 0) / (np.maximum(kwh, 0) + ENERGY_HALF_KWH),
+            np.clip(1 - np.maximum(low - temp, temp - high).clip(min=0) / TEMPERATURE_FALLOFF, 0, 1),
+            np.clip(1 - cloud / 100, 0, 1),
+            np.where(gpu_total > 0, np.clip(1 - gpu_used / gpu_total, 0, 1), np.nan),
+            np.clip(battery / BATTERY_FULL_MWH, 0, 1),
+        ])
+    weights = np.array(list(SCORE_WEIGHTS.values()))
+    present = ~np.isnan(factors)
+    total_weight = present @ weights
+    weighted = np.where(present, factors, 0) @ weights
+    quality = np.divide(weighted, total_weight, out=np.zeros_like(weighted), where=total_weight > 0)
+    return 1 + 9 * quality
+
+
+def score_site(site):
+    """Deterministic performance_score of one site dict."""
+    return round(float(score_features([site_features(site)])[0]), 1)
+
+
+class ScoringEngine:
+    """
+    Scores and ranks all sites, keeping the ranking current as single sites change.
+
+    All sites are scored in one pass over a (sites x features) array. The
+    ranking is a sorted list of (-score, position) keys, so an update
+    re-scores one row and moves one key (a bisect plus a list shift) instead
+    of re-sorting. Ranked results refer to sites by name and index into the
+    engine's site list rather than copying site data.
+    """
+
+    def __init__(self, sites=()):
+        self.load(sites)
+
+    def load(self, sites):
+        self.sites = [site for site in sites if site]
+        self.names = [site["name"] for site in self.sites]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self.features = np.array([site_features(s) for s in self.sites], dtype=float).reshape(-1, len(FEATURES))
+        self.scores = score_features(self.features) if self.sites else np.empty(0)
+        self._order = sorted((-s, i) for i, s in enumerate(self.scores.tolist()))
+        self.synced_at = None
+
+    def __len__(self):
+        return len(self.sites)
+
+    def update(self, site):
+        """Add or re-score one site; returns its new score."""
+        name = site["name"]
+        i = self._index.get(name)
+        if i is None:
+            i = len(self.sites)
+            self.sites.append(site)
+            self.names.append(name)
+            self._index[name] = i
+            self.features = np.vstack([self.features, site_features(site)])
+            self.scores = np.append(self.scores, 0.0)
+        else:
+            del self._order[bisect.bisect_left(self._order, (-self.scores[i], i))]
+            self.sites[i] = site
+            self.features[i] = site_features(site)
+        score = float(score_features(self.features[i])[0])
+        self.scores[i] = score
+        bisect.insort(self._order, (-score, i))
+        return score
+
+    def top(self, k=None):
+        """Indices of the k best sites (all sites if k is None), best first; ties keep site order."""
+        return [i for _, i in self._order[:k]]
+
+    def ranking(self, k=None):
+        """[{"rank", "name", "score"}] for the k best sites."""
+        return [{"rank": rank, "name": self.names[i], "score": round(float(self.scores[i]), 1)}
+                for rank, i in enumerate(self.top(k), start=1)]
+
+    def ranked_sites(self, k=None):
+        """The k best site dicts themselves (not copies), best first."""
+        return [self.sites[i] for i in self.top(k)]
+
+    def best(self):
+        top = self.top(1)
+        return self.sites[top[0]] if top else None
+
+    def rank_of(self, name):
+        i = self._index[name]
+        return bisect.bisect_left(self._order, (-self.scores[i], i)) + 1
+
+    def sync(self, store):
+        """
+        Re-score the sites changed in store since the last sync; reload
+        everything on the first sync or when sites were added or removed.
+        """
+        now = time.time()
+        if self.synced_at is None or store.names() != self.names:
+            self.load(store.all())
+        else:
+            for site in store.changed_since(self.synced_at):
+                self.update(site)
+        self.synced_at = now
+        return self
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Shared ScoringEngine over the site store, brought up to date with its changes."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = ScoringEngine()
+        return _engine.sync(get_site_store())
+
+
+def reset_engine():
+    global _engine
+    with _engine_lock:
+        _engine = None
+
+
+def synthetic_sites(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    gpu_total = rng.integers(500, 2001, n)
+    return [{
+        "name": f"Site {i}",
+        "avg_daily_kwh": float(rng.uniform(500, 16000)),
+        "weather": {"current": {"temperature_2m": float(rng.normal(25, 10)),
+                                "cloud_cover": int(rng.integers(0, 101))}},
+        "hardware": {"gpu_total": int(gpu_total[i]), "gpu_used": int(rng.integers(100, gpu_total[i] + 1)),
+                     "battery_capacity_mwh": int(rng.integers(5, 21))},
+    } for i in range(n)]
+
+
+def benchmark(n=10_000, updates=1_000):
+    sites = synthetic_sites(n)
+    start = time.perf_counter()
+    engine = ScoringEngine(sites)
+    load_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    for i in rng.integers(0, n, updates):
+        site = dict(sites[i], avg_daily_kwh=float(rng.uniform(500, 16000)))
+        engine.update(site)
+        engine.top(10)
+    update_seconds = (time.perf_counter() - start) / updates
+    return {"sites": n, "load_seconds": load_seconds, "update_seconds": update_seconds,
+            "top": engine.ranking(3)}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Scored and ranked {result['sites']:,} sites in {result['load_seconds'] * 1e3:.1f} ms; "
+          f"one-site update + top 10 in {result['update_seconds'] * 1e6:.1f} us")
+    for row in result["top"]:
+        print(f"  {row['rank']}. {row['name']}: {row['score']}")
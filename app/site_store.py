@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from app.fileio import atomic_write_json
+
+SITE_STORE_PATH = "sites.db"
+SAVED_DATA_FILE = "saved_data.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    weather_cell TEXT
+);
+CREATE TABLE IF NOT EXISTS weather (
+    cell TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+
+class SiteStore:
+    """
+    One SQLite row per site, replacing the monolithic saved_data.json.
+
+    Sites are looked up by name through the primary key, and refreshing one
+    site rewrites only its row. Weather shared by the sites of one grid cell
+    is stored once, in the weather table, and their rows hold only the cell
+    key; reads put it back under "weather", one dict per cell shared by its
+    sites. Sites written without a cell (imported documents) keep their own
+    weather in their row. export() rebuilds the saved_data.json document
+    ({"sites": [...], "bestSite": {...}}) in the original site order, with
+    bestSite the top of the ScoringEngine ranking, first site on ties.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("SITE_STORE_PATH", SITE_STORE_PATH)
+        self._local = threading.local()
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(sites)")]
+            if "weather_cell" not in columns:
+                db.execute("ALTER TABLE sites ADD COLUMN weather_cell TEXT")
+
+    def _connect(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _sites(self, rows):
+        """Site dicts from (data, weather_cell) rows, each cell's weather parsed once."""
+        db = self._connect()
+        weather = {}
+        sites = []
+        for data, cell in rows:
+            site = json.loads(data)
+            if cell is not None:
+                if cell not in weather:
+                    row = db.execute("SELECT data FROM weather WHERE cell = ?", (cell,)).fetchone()
+                    weather[cell] = json.loads(row[0]) if row else None
+                site["weather"] = weather[cell]
+            sites.append(site)
+        return sites
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sites").fetchone()[0]
+
+    def names(self):
+        return [row[0] for row in self._connect().execute("SELECT name FROM sites ORDER BY position")]
+
+    def get(self, name):
+        rows = self._connect().execute("SELECT data, weather_cell FROM sites WHERE name = ?", (name,)).fetchall()
+        return self._sites(rows)[0] if rows else None
+
+    def all(self):
+        return self._sites(self._connect().execute("SELECT data, weather_cell FROM sites ORDER BY position"))
+
+    def weather(self, cell):
+        row = self._connect().execute("SELECT data FROM weather WHERE cell = ?", (cell,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, site, weather_cell=None):
+        """
+        Insert or replace one site; a new site goes after the existing ones.
+
+        With weather_cell, the site's weather (if any) replaces that cell's
+        stored weather and the row keeps only the cell key.
+        """
+        if weather_cell is not None:
+            weather = site.get("weather")
+            site = {key: value for key, value in site.items() if key != "weather"}
+        db = self._connect()
+        with db:
+            now = time.time()
+            if weather_cell is not None and weather is not None:
+                db.execute("INSERT OR REPLACE INTO weather (cell, data, updated_at) VALUES (?, ?, ?)",
+                           (weather_cell, _dumps(weather), now))
+            row = db.execute("SELECT position FROM sites WHERE name = ?", (site["name"],)).fetchone()
+            if row is None:
+                position = db.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM sites").fetchone()[0]
+            else:
+                position = row[0]
+            db.execute(
+                "INSERT OR REPLACE INTO sites (name, position, data, updated_at, weather_cell) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (site["name"], position, _dumps(site), now, weather_cell),
+            )
+
+    def update(self, name, fields):
+        """
+        Merge fields into one site's top-level fields and rewrite only that row.
+
+        New weather for a site in a cell is written to the cell, so it
+        reaches every site there.
+
+        Returns:
+            The updated site, or None if there is no site with that name
+        """
+        db = self._connect()
+        with db:
+            row = db.execute("SELECT data, weather_cell FROM sites WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            site = json.loads(row[0])
+            site.update(fields)
+            site["name"] = name
+            cell = row[1]
+            now = time.time()
+            if cell is not None and "weather" in fields:
+                db.execute("INSERT OR REPLACE INTO weather (cell, data, updated_at) VALUES (?, ?, ?)",
+                           (cell, _dumps(site.pop("weather")), now))
+            db.execute("UPDATE sites SET data = ?, updated_at = ? WHERE name = ?", (_dumps(site), now, name))
+        if cell is not None:
+            site["weather"] = fields["weather"] if "weather" in fields else self.weather(cell)
+        return site
+
+    def delete(self, name):
+        with self._connect() as db:
+            return db.execute("DELETE FROM sites WHERE name = ?", (name,)).rowcount > 0
+
+    def best_site(self, sites=None):
+        """The top-ranked of sites (default all stored sites) by ScoringEngine score, or None."""
+        from app.site_scoring import ScoringEngine  # site_scoring imports this module
+        return ScoringEngine(self.all() if sites is None else sites).best()
+
+    def changed_since(self, timestamp):
+        """Sites written, or whose cell's weather was written, after timestamp, in site order."""
+        return self._sites(self._connect().execute(
+            "SELECT s.data, s.weather_cell FROM sites s LEFT JOIN weather w ON w.cell = s.weather_cell "
+            "WHERE s.updated_at > ? OR w.updated_at > ? ORDER BY s.position", (timestamp, timestamp)))
+
+    def updated_at(self, name):
+        row = self._connect().execute("SELECT updated_at FROM sites WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def export(self):
+        """The saved_data.json document."""
+        sites = self.all()
+        # bestSite is one of the exported dicts, not a copy; the document
+        # repeats it in full because api.php and script.js read its fields
+        return {"sites": sites, "bestSite": self.best_site(sites)}
+
+    def export_to_file(self, path=SAVED_DATA_FILE):
+        """Write the saved_data.json document atomically, for readers of the old file."""
+        atomic_write_json(path, self.export())
+
+    def import_document(self, document):
+        """Load a saved_data.json document; existing sites with the same names are replaced."""
+        for site in document.get("sites", []):
+            if site:
+                self.put(site)
+        return len(document.get("sites", []))
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_site_store():
+    """Shared SiteStore at SITE_STORE_PATH, seeded from saved_data.json when empty."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SiteStore()
+            if len(_store) == 0 and os.path.exists(SAVED_DATA_FILE):
+                with open(SAVED_DATA_FILE) as f:
+                    _store.import_document(json.load(f))
+        return _store
+
+
+def main():
+    """python -m app.site_store import|export [saved_data.json]"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print(main.__doc__)
+        return 1
+    path = sys.argv[2] if len(sys.argv) > 2 else SAVED_DATA_FILE
+    store = SiteStore()
+    if sys.argv[1] == "import":
+        with open(path) as f:
+            count = store.import_document(json.load(f))
+        print(f"Imported {count} sites from {path} into {store.path}")
+    else:
+        store.export_to_file(path)
+        print(f"Exported {len(store)} sites from {store.path} to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import heapq
+import threading
+import time
+
+import numpy as np
+
+from app.site_store import get_site_store
+
+EARTH_RADIUS_KM = 6371.0088
+# Cell size used to group sites that share weather; Open-Meteo's models
+# are gridded at roughly 0.03-0.25 degrees depending on the region
+WEATHER_GRID_DEGREES = 0.1
+LEAF_SIZE = 16
+
+
+def unit_vectors(lat, lon):
+    """(n, 3) points on the unit sphere; chord length between them is monotone in great-circle distance."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def grid_cell(lat, lon, degrees=WEATHER_GRID_DEGREES):
+    """(row, col) of the weather grid cell containing a point."""
+    return int(np.floor(lat / degrees)), int(np.floor(lon / degrees))
+
+
+def cell_center(cell, degrees=WEATHER_GRID_DEGREES):
+    """(lat, lon) of a grid cell's center, rounded for use in request URLs."""
+    return round((cell[0] + 0.5) * degrees, 6), round((cell[1] + 0.5) * degrees, 6)
+
+
+def cell_key(cell, degrees=WEATHER_GRID_DEGREES):
+    """Text key of a grid cell at a given cell size, as stored by SiteStore."""
+    return f"{degrees:g}:{cell[0]},{cell[1]}"
+
+
+def group_by_cell(sites, degrees=WEATHER_GRID_DEGREES):
+    """{cell: [site names]} for sites with coordinates, in first-seen order."""
+    groups = {}
+    for site in sites:
+        groups.setdefault(grid_cell(site["lat"], site["lon"], degrees), []).append(site["name"])
+    return groups
+
+
+class SiteIndex:
+    """
+    KD-tree over site coordinates for nearest-site and radius queries.
+
+    Sites are placed on the unit sphere, so the tree works in three
+    Cartesian dimensions and straight-line (chord) distance orders points
+    the same way great-circle distance does, with no special cases at the
+    poles or the antimeridian. Leaves hold up to leaf_size sites and are
+    searched with one numpy distance computation each.
+    """
+
+    def __init__(self, sites, leaf_size=LEAF_SIZE):
+        self.sites = [site for site in sites if site and site.get("lat") is not None]
+        self.names = [site["name"] for site in self.sites]
+        self.points = unit_vectors([s["lat"] for s in self.sites], [s["lon"] for s in self.sites]).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self._order = np.arange(len(self.sites))
+        # Node: (axis, split, left, right) for branches, (None, start, end) for leaves
+        self._nodes = []
+        self._root = self._build(0, len(self.sites)) if self.sites else None
+
+    def __len__(self):
+        return len(self.sites)
+
+    def _build(self, start, end):
+        if end - start <= self.leaf_size:
+            self._nodes.append((None, start, end))
+            return len(self._nodes) - 1
+        block = self.points[self._order[start:end]]
+        axis = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+        mid = (end - start) // 2
+        part = np.argpartition(block[:, axis], mid)
+        self._order[start:end] = self._order[start:end][part]
+        split = float(self.points[self._order[start + mid], axis])
+        node = len(self._nodes)
+        self._nodes.append(None)
+        left = self._build(start, start + mid)
+        right = self._build(start + mid, end)
+        self._nodes[node] = (axis, split, left, right)
+        return node
+
+    def _leaf_distances(self, node, q):
+        _, start, end = node
+        idx = self._order[start:end]
+        return idx, np.sqrt(((self.points[idx] - q) ** 2).sum(axis=1))
+
+    def nearest(self, lat, lon, k=1):
+        """
+        The k sites closest to a point.
+
+        Returns:
+            [{"name", "distance_km"}], nearest first
+        """
+        if self._root is None or k < 1:
+            return []
+        q = unit_vectors(lat, lon)
+        heap = []  # (-chord, -index): max-heap of the best k so far
+
+        def visit(n):
+            node = self._nodes[n]
+            if node[0] is None:
+                idx, dist = self._leaf_distances(node, q)
+                for i, d in zip(idx.tolist(), dist.tolist()):
+                    item = (-d, -i)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+                return
+            axis, split, left, right = node
+            gap = q[axis] - split
+            near, far = (left, right) if gap < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or gap * gap <= heap[0][0] ** 2:
+                visit(far)
+
+        visit(self._root)
+        found = sorted((-d, -i) for d, i in heap)
+        return [{"name": self.names[i], "distance_km": float(chord_to_km(d))} for d, i in found]
+
+    def within(self, lat, lon, radius_km):
+        """All sites within radius_km of a point, as [{"name", "distance_km"}], nearest first."""
+        if self._root is None:
+            return []
+        q = unit_vectors(lat, lon)
+        radius = km_to_chord(radius_km)
+        found = []
+        stack = [self._root]
+        while stack:
+            node = self._nodes[stack.pop()]
+            if node[0] is None:
+                idx, dist = self._leaf_distances(node, q)
+                hit = dist <= radius
+                found.extend(zip(dist[hit].tolist(), idx[hit].tolist()))
+                continue
+            axis, split, left, right = node
+            gap = q[axis] - split
+            if gap <= radius:
+                stack.append(left)
+            if gap >= -radius:
+                stack.append(right)
+        return [{"name": self.names[i], "distance_km": float(chord_to_km(d))} for d, i in sorted(found)]
+
+    def weather_cells(self, degrees=WEATHER_GRID_DEGREES):
+        """{cell: [site names]} grouping sites that share a weather grid cell."""
+        return group_by_cell(self.sites, degrees)
+
+
+_index = None
+_index_built_at = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Shared SiteIndex over the site store, rebuilt when a site has been written since it was built."""
+    global _index, _index_built_at
+    store = get_site_store()
+    with _index_lock:
+        if _index is None or len(store) != len(_index) or store.changed_since(_index_built_at):
+            _index_built_at = time.time()
+            _index = SiteIndex(store.all())
+        return _index
+
+
+def reset_index():
+    global _index, _index_built_at
+    with _index_lock:
+        _index = _index_built_at = None
+
+
+def synthetic_sites(n=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    lat = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    lon = rng.uniform(-180, 180, n)
+    return [{"name": f"Site {i}", "lat": float(a), "lon": float(o)} for i, (a, o) in enumerate(zip(lat, lon))]
+
+
+def benchmark(n=100_000, queries=1_000):
+    sites = synthetic_sites(n)
+    start = time.perf_counter()
+    index = SiteIndex(sites)
+    build_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    points = [(float(a), float(o)) for a, o in zip(rng.uniform(-60, 60, queries), rng.uniform(-180, 180, queries))]
+    start = time.perf_counter()
+    for lat, lon in points:
+        index.nearest(lat, lon, 5)
+    nearest_seconds = (time.perf_counter() - start) / queries
+
+    lats = np.array([s["lat"] for s in sites])
+    lons = np.array([s["lon"] for s in sites])
+    start = time.perf_counter()
+    for lat, lon in points[:100]:
+        np.argpartition(haversine_km(lat, lon, lats, lons), 5)[:5]
+    brute_seconds = (time.perf_counter() - start) / 100
+    return {"sites": n, "build_seconds": build_seconds, "nearest_seconds": nearest_seconds,
+            "brute_force_seconds": brute_seconds}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Indexed {result['sites']:,} sites in {result['build_seconds']:.2f} s; 5 nearest in "
+          f"{result['nearest_seconds'] * 1e6:.0f} us (brute force {result['brute_force_seconds'] * 1e6:.0f} us)")
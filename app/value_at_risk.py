@@ -0,0 +1,202 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.price_history import (PRICE_FIELDS, load_price_history, log_returns, price_matrix,
+                               synthetic_history, tick_seconds)
+
+DEFAULT_HORIZONS = (1, 12, 288)  # ticks: 5 minutes, 1 hour, 1 day of 5-minute prices
+DEFAULT_CONFIDENCE = (0.95, 0.99)
+
+# Paths generated per chunk; peak memory per chunk is a few arrays of
+# CHUNK_PATHS x n_series floats, whatever the total path count
+CHUNK_PATHS = 100_000
+MAX_PATHS = 1_000_000
+
+
+def calibrate(history, fields=PRICE_FIELDS, drift=False):
+    """
+    Fit a correlated lognormal model to price history.
+
+    Args:
+        history: Output of price_history.load_price_history()
+        fields: Series to model
+        drift: Use the sample mean log return per tick; by default paths are driftless
+
+    Returns:
+        Dict with fields, spot (latest prices), per-tick mean and covariance of
+        log returns, per-tick vol, the correlation matrix and tick_seconds
+    """
+    returns = log_returns(history, fields)
+    if returns.shape[0] < 2:
+        raise ValueError("At least three price points are needed to calibrate")
+    cov = np.atleast_2d(np.cov(returns, rowvar=False))
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.where(np.outer(vol, vol) > 0, cov / np.outer(vol, vol), np.eye(len(fields)))
+    return {
+        "fields": tuple(fields),
+        "spot": price_matrix(history, fields)[-1],
+        "mean": returns.mean(axis=0) if drift else np.zeros(len(fields)),
+        "cov": cov,
+        "vol": vol,
+        "correlation": corr,
+        "n_returns": returns.shape[0],
+        "tick_seconds": tick_seconds(history),
+    }
+
+
+def _factor(cov):
+    """Matrix A with A @ A.T == cov, falling back to eigenvalues when cov is only semi-definite."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0.0, None))
+
+
+def _simulate_chunk(seed, n_paths, spot, mean, factor, exposures, horizons):
+    """
+    P&L of one chunk of paths at each horizon.
+
+    Log returns are i.i.d. per tick, so the move between consecutive horizons
+    is one normal draw with the covariance scaled by the tick count; each path
+    costs one draw per horizon rather than one per tick.
+    """
+    rng = np.random.default_rng(seed)
+    log_move = np.zeros((n_paths, spot.size))
+    pnl = np.empty((n_paths, len(horizons)))
+    base = spot @ exposures
+    previous = 0
+    for h, ticks in enumerate(horizons):
+        dt = ticks - previous
+        previous = ticks
+        z = rng.standard_normal((n_paths, spot.size))
+        log_move += dt * mean + math.sqrt(dt) * (z @ factor.T)
+        pnl[:, h] = (spot * np.exp(log_move)) @ exposures - base
+    return pnl
+
+
+def simulate_pnl(model, exposures, horizons=DEFAULT_HORIZONS, n_paths=100_000, seed=0,
+                 chunk_paths=CHUNK_PATHS, workers=1):
+    """
+    Simulate portfolio P&L on correlated price paths.
+
+    Paths are generated in chunks of chunk_paths, each with its own child of
+    SeedSequence(seed), so results depend only on (seed, n_paths, chunk_paths)
+    and not on how many worker processes run the chunks.
+
+    Args:
+        model: Output of calibrate()
+        exposures: {field: units held}, e.g. {"hash_price": 1000, "energy_price": -3333}
+        horizons: Horizons in ticks of the calibration history
+        workers: Worker processes; 1 runs in this process
+
+    Returns:
+        (n_paths, len(horizons)) array of P&L
+    """
+    if n_paths < 1 or n_paths > MAX_PATHS:
+        raise ValueError(f"n_paths must be between 1 and {MAX_PATHS:,}")
+    horizons = sorted(int(h) for h in horizons)
+    if not horizons or horizons[0] < 1:
+        raise ValueError("Horizons must be positive tick counts")
+    unknown = set(exposures) - set(model["fields"])
+    if unknown:
+        raise ValueError(f"No model for {sorted(unknown)}")
+    weights = np.array([float(exposures.get(f, 0.0)) for f in model["fields"]])
+
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    factor = _factor(model["cov"])
+    args = [(s, size, model["spot"], model["mean"], factor, weights, horizons)
+            for s, size in zip(seeds, sizes)]
+
+    pnl = np.empty((n_paths, len(horizons)))
+    offsets = np.cumsum([0] + sizes)
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(_simulate_chunk, *zip(*args))
+            for i, chunk in enumerate(chunks):
+                pnl[offsets[i]:offsets[i + 1]] = chunk
+    else:
+        for i, a in enumerate(args):
+            pnl[offsets[i]:offsets[i + 1]] = _simulate_chunk(*a)
+    return pnl
+
+
+def check_confidence(confidence):
+    """Confidence levels as floats; raises ValueError unless each is strictly between 0 and 1."""
+    levels = [float(c) for c in confidence]
+    for c in levels:
+        if not 0.0 < c < 1.0:  # also rejects NaN
+            raise ValueError(f"confidence levels must be between 0 and 1, got {c}")
+    return levels
+
+
+def risk_measures(pnl, confidence=DEFAULT_CONFIDENCE):
+    """
+    VaR and expected shortfall of a P&L sample, as positive loss figures.
+
+    Returns:
+        {confidence: {"var": ..., "es": ...}} for a 1-D sample
+    """
+    check_confidence(confidence)
+    pnl = np.sort(np.asarray(pnl, dtype=float))
+    result = {}
+    for c in confidence:
+        tail = max(int(math.ceil(round((1.0 - c) * pnl.size, 9))), 1)
+        result[c] = {"var": float(-pnl[tail - 1]), "es": float(-pnl[:tail].mean())}
+    return result
+
+
+def portfolio_var(history, exposures, horizons=DEFAULT_HORIZONS, confidence=DEFAULT_CONFIDENCE,
+                  n_paths=100_000, seed=0, workers=None):
+    """
+    Calibrate on history, simulate and report VaR/ES per horizon.
+
+    Returns:
+        Dict with the calibrated correlation and vols, and per-horizon
+        {"ticks", "mean_pnl", "measures": {confidence: {"var", "es"}}}
+    """
+    confidence = check_confidence(confidence)
+    model = calibrate(history)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8) if n_paths > CHUNK_PATHS else 1
+    horizons = sorted(int(h) for h in horizons)
+    pnl = simulate_pnl(model, exposures, horizons, n_paths, seed, workers=workers)
+    return {
+        "fields": list(model["fields"]),
+        "correlation": np.round(model["correlation"], 4).tolist(),
+        "vol_per_tick": model["vol"].tolist(),
+        "tick_seconds": model["tick_seconds"],
+        "paths": n_paths,
+        "seed": seed,
+        "horizons": [
+            {
+                "ticks": ticks,
+                "mean_pnl": float(pnl[:, h].mean()),
+                "measures": {str(c): m for c, m in risk_measures(pnl[:, h], confidence).items()},
+            }
+            for h, ticks in enumerate(horizons)
+        ],
+    }
+
+
+def benchmark(n_paths=1_000_000, workers=None):
+    history = load_price_history(synthetic_history(2_000))
+    exposures = {"hash_price": 1000.0, "token_price": 500.0, "energy_price": -3333.0}
+    start = time.perf_counter()
+    result = portfolio_var(history, exposures, n_paths=n_paths, workers=workers)
+    return {"paths": n_paths, "seconds": time.perf_counter() - start, "result": result}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['paths']:,} paths in {result['seconds']:.2f} s")
+    for horizon in result["result"]["horizons"]:
+        measures = ", ".join(f"{c}: VaR {m['var']:,.1f} ES {m['es']:,.1f}"
+                             for c, m in horizon["measures"].items())
+        print(f"  {horizon['ticks']:>4} ticks - {measures}")
@@ -0,0 +1,214 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from app.fileio import atomic_write, atomic_write_json
+from app.site_store import SAVED_DATA_FILE
+
+WEATHER_VARIABLES = ("temperature_2m", "cloud_cover", "wind_speed_10m")
+WEATHER_MATRIX_FILE = "weather_matrix.npy"
+
+
+class WeatherMatrix:
+    """
+    Hourly weather for all sites as one dense (sites x hours x variables) array.
+
+    Open-Meteo reports hours in each site's local time, so they are shifted by
+    utc_offset_seconds onto a shared UTC hour index. Hours a site has no data
+    for (and sites without hourly weather) are NaN, so aggregations use the
+    nan* reductions, e.g. np.nanmean(matrix.variable("cloud_cover"), axis=0)
+    is the cross-site mean cloud cover per hour.
+
+    The data is stored variable-major, (variables, sites, hours), so each
+    variable is one contiguous block; values is a (sites, hours, variables)
+    view of it.
+    """
+
+    def __init__(self, sites, times, variables, data):
+        self.sites = tuple(sites)
+        self.times = np.asarray(times, dtype="datetime64[h]")
+        self.variables = tuple(variables)
+        self.data = data
+        self.values = data.transpose(1, 2, 0)
+        self._site_index = {name: i for i, name in enumerate(self.sites)}
+        self._variable_index = {name: i for i, name in enumerate(self.variables)}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def site_index(self, name):
+        return self._site_index[name]
+
+    def time_index(self, when):
+        """Index of a UTC hour (datetime64 or ISO string), or None if it is not covered."""
+        when = np.datetime64(when, "h")
+        i = int(np.searchsorted(self.times, when))
+        return i if i < self.times.size and self.times[i] == when else None
+
+    def variable(self, name):
+        """(sites, hours) view of one variable."""
+        return self.data[self._variable_index[name]]
+
+    def site(self, name):
+        """(hours, variables) view of one site."""
+        return self.values[self._site_index[name]]
+
+    def site_means(self):
+        """{variable: (sites,) mean over each site's hours}, NaN for sites without data."""
+        present = ~np.isnan(self.data)
+        with np.errstate(invalid="ignore", divide="ignore"):  # all-NaN sites
+            means = np.where(present, self.data, 0).sum(axis=2) / present.sum(axis=2)
+        return dict(zip(self.variables, means))
+
+
+def _utc_hours(weather):
+    hourly = weather.get("hourly") or {}
+    local = np.asarray(hourly.get("time") or [], dtype="datetime64[h]")
+    # Nearest whole hour; a half-hour zone such as -03:30 goes to -3, so each
+    # reading lands on the UTC hour that contains it
+    offset = int(np.floor(int(weather.get("utc_offset_seconds") or 0) / 3600 + 0.5))
+    return local - np.timedelta64(offset, "h"), hourly
+
+
+def build_weather_matrix(sites, variables=WEATHER_VARIABLES, dtype=np.float32):
+    """Pack the weather.hourly arrays of saved_data.json-style site dicts into a WeatherMatrix."""
+    parsed = [_utc_hours(site.get("weather") or {}) for site in sites]
+    stamps = [hours for hours, _ in parsed if hours.size]
+    times = np.unique(np.concatenate(stamps)) if stamps else np.array([], dtype="datetime64[h]")
+
+    data = np.full((len(variables), len(sites), times.size), np.nan, dtype=dtype)
+    for i, (hours, hourly) in enumerate(parsed):
+        if not hours.size:
+            continue
+        columns = np.searchsorted(times, hours)
+        for k, name in enumerate(variables):
+            series = hourly.get(name)
+            if series is not None:
+                data[k, i, columns] = np.array(series, dtype=float)  # None -> nan
+    return WeatherMatrix([site["name"] for site in sites], times, variables, data)
+
+
+def _source_signature(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+
+def save_weather_matrix(matrix, path, source_signature=None):
+    """
+    Write the data as a .npy file (memory-mappable) and the site and time
+    indexes to a <path>.meta.json sidecar, each atomically.
+
+    The sidecar is written last and records the (mtime_ns, size) of the .npy
+    file it indexes, so it is the commit point: a reader that finds the two
+    out of step (a crash or a concurrent save between the renames) rebuilds
+    instead of pairing the data with the wrong indexes.
+    """
+    signature = atomic_write(path, lambda f: np.save(f, np.ascontiguousarray(matrix.data)), binary=True)
+    atomic_write_json(f"{path}.meta.json", {
+        "sites": list(matrix.sites),
+        "times": [str(t) for t in matrix.times],
+        "variables": list(matrix.variables),
+        "source": source_signature,
+        "data_signature": list(signature),
+    })
+
+
+def _read_meta(path):
+    try:
+        with open(f"{path}.meta.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _open_matrix(path, meta):
+    """Memory-map the .npy file if it is the one meta was written for, else None."""
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if [st.st_mtime_ns, st.st_size] != meta.get("data_signature"):
+                return None
+            # Map through the handle just checked, not by name, so a concurrent save cannot swap the file
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            return np.memmap(f, dtype=dtype, mode="r", shape=shape, order="F" if fortran_order else "C",
+                             offset=f.tell())
+    except FileNotFoundError:
+        return None
+
+
+def load_weather_matrix(source=SAVED_DATA_FILE, cache_path=None, variables=WEATHER_VARIABLES):
+    """
+    WeatherMatrix for a saved_data.json file, memory-mapped from the binary cache.
+
+    The cache is rebuilt when the source file's mtime or size differs from the
+    one it was built from (or the variables differ); otherwise loading costs
+    one stat() and a small JSON read, and the values are paged in on demand.
+    """
+    cache_path = cache_path or os.getenv("WEATHER_MATRIX_FILE", WEATHER_MATRIX_FILE)
+    signature = _source_signature(source)
+    meta = _read_meta(cache_path)
+    data = None
+    if meta and meta["source"] == signature and tuple(meta["variables"]) == tuple(variables):
+        data = _open_matrix(cache_path, meta)
+    if data is None:
+        with open(source) as f:
+            sites = json.load(f).get("sites", [])
+        matrix = build_weather_matrix([s for s in sites if s], variables)
+        save_weather_matrix(matrix, cache_path, signature)
+        meta = _read_meta(cache_path)
+        data = _open_matrix(cache_path, meta) if meta else None
+        if data is None:  # Replaced by a concurrent save
+            return matrix
+    return WeatherMatrix(meta["sites"], meta["times"], meta["variables"], data)
+
+
+def synthetic_sites(n_sites=1000, hours=168, seed=0):
+    """Site dicts with random hourly weather, for benchmarks."""
+    rng = np.random.default_rng(seed)
+    times = [str(t) for t in np.datetime64("2025-06-21T00", "h") + np.arange(hours)]
+    return [{
+        "name": f"Site {i}",
+        "weather": {
+            "utc_offset_seconds": int(rng.integers(-12, 13)) * 3600,
+            "hourly": {
+                "time": times,
+                "temperature_2m": np.round(rng.normal(25, 8, hours), 1).tolist(),
+                "cloud_cover": rng.integers(0, 101, hours).tolist(),
+                "wind_speed_10m": np.round(rng.gamma(2.0, 6.0, hours), 1).tolist(),
+            },
+        },
+    } for i in range(n_sites)]
+
+
+def benchmark(n_sites=1000, path="weather_matrix_benchmark.npy"):
+    sites = synthetic_sites(n_sites)
+    document = json.dumps({"sites": sites})
+
+    start = time.perf_counter()
+    sites = json.loads(document)["sites"]
+    walked = {name: [sum(s["weather"]["hourly"][name]) / len(s["weather"]["hourly"][name]) for s in sites]
+              for name in WEATHER_VARIABLES}
+    walk_seconds = time.perf_counter() - start
+
+    save_weather_matrix(build_weather_matrix(sites), path)
+    start = time.perf_counter()
+    meta = _read_meta(path)
+    matrix = WeatherMatrix(meta["sites"], meta["times"], meta["variables"], np.load(path, mmap_mode="r"))
+    means = matrix.site_means()
+    vector_seconds = time.perf_counter() - start
+    os.remove(path)
+    os.remove(f"{path}.meta.json")
+    assert all(np.allclose(means[name], walked[name]) for name in WEATHER_VARIABLES)
+    return {"sites": n_sites, "shape": matrix.shape, "walk_seconds": walk_seconds, "vector_seconds": vector_seconds}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['shape']} matrix: per-site means from the memory-mapped cache in {result['vector_seconds'] * 1e3:.2f} ms "
+          f"(parsing and walking the JSON {result['walk_seconds'] * 1e3:.2f} ms)")
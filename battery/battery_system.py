@@ -11,6 +11,8 @@ import os
 # Add parent directory to path to import price_monitor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from price_monitor.price_monitor import PriceMonitor
+from battery.checkpoint import BatteryCheckpointer
+from app.profitability import ProfitabilityTables
 
 @dataclass
 class BatteryState:
@@ -70,11 +72,35 @@ class BatterySystem:
         # Threading
         self.is_running = False
         self.thread = None
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()
         
         # History tracking
         self.operation_history: List[Dict] = []
+        self.decision_history: List[Dict] = []
+        self.decision_history_limit = 50
         
+        # Optional durability (see battery/checkpoint.py)
+        self.checkpointer = None
+        
+        # Optional fleet economics (see app/profitability.py): when attached,
+        # the battery also discharges whenever grid power costs more than the
+        # fleet earns per unit of power at the current hash/token prices
+        self.profitability = None
+        
+    def _state_fields(self) -> Dict:
+        """Mutable state persisted with every journaled operation"""
+        return {
+            "charge_level": self.state.charge_level,
+            "total_energy_stored": self.state.total_energy_stored,
+            "total_energy_used": self.state.total_energy_used,
+            "last_updated": self.state.last_updated.isoformat()
+        }
+    
+    def _journal(self, kind: str, payload: Dict):
+        """Write a state change to the checkpointer's WAL, if one is attached"""
+        if self.checkpointer is not None:
+            self.checkpointer.log(self, kind, payload)
+    
     def get_available_energy_mwh(self) -> float:
         """Get available energy in MWh"""
         return (self.state.charge_level / 100.0) * self.capacity_mwh
@@ -115,6 +141,7 @@ class BatterySystem:
                 "charge_after": self.state.charge_level
             }
             self.operation_history.append(operation)
+            self._journal("operation", {"operation": operation, "state": self._state_fields()})
             
             return {
                 "success": True,
@@ -147,6 +174,7 @@ class BatterySystem:
                 "charge_after": self.state.charge_level
             }
             self.operation_history.append(operation)
+            self._journal("operation", {"operation": operation, "state": self._state_fields()})
             
             return {
                 "success": True,
@@ -179,6 +207,7 @@ class BatterySystem:
                 "charge_after": self.state.charge_level
             }
             self.operation_history.append(operation)
+            self._journal("operation", {"operation": operation, "state": self._state_fields()})
             
             return {
                 "success": True,
@@ -187,9 +216,17 @@ class BatterySystem:
                 "new_charge_level": self.state.charge_level
             }
     
+    def fleet_breakeven(self, hash_price: float, token_price: float) -> Optional[float]:
+        """Energy price above which the fleet loses money on grid power, if profitability tables are attached"""
+        if self.profitability is None:
+            return None
+        return self.profitability.fleet_breakeven(prices={"hash_price": hash_price, "token_price": token_price})
+    
     def make_decision(self, energy_price: float, hash_price: float, token_price: float) -> Dict:
         """Make charging/discharging decision based on current prices"""
         current_demand = self.mining_demand_mw + self.inference_demand_mw
+        breakeven = self.fleet_breakeven(hash_price, token_price)
+        discharge_threshold = self.discharge_threshold if breakeven is None else min(self.discharge_threshold, breakeven)
         
         # Check if we should sell energy back to grid (highest priority)
         if self.state.charge_level > self.sell_threshold and self.can_discharge():
@@ -213,13 +250,13 @@ class BatterySystem:
                 "result": result
             }
         
-        elif energy_price > self.discharge_threshold and self.can_discharge():
+        elif energy_price > discharge_threshold and self.can_discharge():
             # Energy is expensive, use battery
             discharge_power = min(self.max_discharge_rate_mw, current_demand)
             result = self.discharge(discharge_power, 1.0)
             return {
                 "action": "discharge",
-                "reason": f"Energy price ({energy_price:.2f}) above threshold ({self.discharge_threshold})",
+                "reason": f"Energy price ({energy_price:.2f}) above threshold ({round(discharge_threshold, 2)})",
                 "result": result
             }
         
@@ -276,10 +313,26 @@ class BatterySystem:
     
     def update_thresholds(self, charge_threshold: float, discharge_threshold: float, sell_threshold: Optional[float] = None):
         """Update decision thresholds"""
-        self.charge_threshold = charge_threshold
-        self.discharge_threshold = discharge_threshold
-        if sell_threshold is not None:
-            self.sell_threshold = sell_threshold
+        with self.lock:
+            self.charge_threshold = charge_threshold
+            self.discharge_threshold = discharge_threshold
+            if sell_threshold is not None:
+                self.sell_threshold = sell_threshold
+            
+            self._journal("thresholds", {
+                "charge_threshold": self.charge_threshold,
+                "discharge_threshold": self.discharge_threshold,
+                "sell_threshold": self.sell_threshold
+            })
+    
+    def record_decision(self, decision_record: Dict):
+        """Keep a decision record, bounded to the most recent decision_history_limit entries"""
+        with self.lock:
+            self.decision_history.append(decision_record)
+            if len(self.decision_history) > self.decision_history_limit:
+                self.decision_history = self.decision_history[-self.decision_history_limit:]
+            
+            self._journal("decision", decision_record)
 
 def main():
     """Example usage of the BatterySystem"""
@@ -294,6 +347,17 @@ def main():
         initial_charge=50.0
     )
     
+    # Resume from the last checkpoint, if any
+    checkpointer = BatteryCheckpointer()
+    recovery = checkpointer.recover(battery)
+    checkpointer.attach(battery)
+    if recovery["checkpoint_loaded"] or recovery["wal_records_replayed"]:
+        print(f"♻️  Restored battery state in {recovery['recovery_ms']:.1f} ms "
+              f"({recovery['wal_records_replayed']} WAL records replayed)")
+    
+    # Discharge when the fleet would lose money on grid power
+    battery.profitability = ProfitabilityTables()
+    
     # Create price monitor
     price_monitor = PriceMonitor()
     price_monitor.start()
@@ -307,6 +371,9 @@ def main():
             latest_prices = price_monitor.get_latest_prices()
             
             if latest_prices:
+                # Recorded once per quote, not once per loop
+                battery.profitability.update(latest_prices, latest_prices.get('timestamp'))
+                
                 # Make battery decision
                 decision = battery.make_decision(
                     energy_price=latest_prices['energy_price'],
@@ -336,6 +403,7 @@ def main():
     except KeyboardInterrupt:
         print("\n🛑 Stopping battery system...")
         price_monitor.stop()
+        checkpointer.checkpoint(battery)
         battery.save_history()
         print("👋 Battery system stopped")
 
@@ -13,6 +13,7 @@ import urllib.parse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from battery.battery_system import BatterySystem
 from price_monitor.price_monitor import PriceMonitor
+from battery.checkpoint import BatteryCheckpointer
 
 # LG Energy Solution Battery Specifications
 # Based on LG Energy Solution's commercial battery systems for industrial applications
@@ -35,6 +36,7 @@ LG_BATTERY_SPECS = {
 # Global variables
 battery_system = None
 price_monitor = None
+checkpointer = None
 is_running = False
 decision_history = []
 current_status = {}
@@ -44,18 +46,35 @@ charge_threshold = 1.7
 discharge_threshold = 2.0
 sell_threshold = 80.0  # Sell when battery charge level > 80%
 
+def create_battery():
+    """Create a battery with the LG specifications in its initial state"""
+    return BatterySystem(
+        capacity_mwh=LG_BATTERY_SPECS["capacity_mwh"],
+        max_charge_rate_mw=LG_BATTERY_SPECS["max_charge_rate_mw"],
+        max_discharge_rate_mw=LG_BATTERY_SPECS["max_discharge_rate_mw"],
+        efficiency=LG_BATTERY_SPECS["efficiency"],
+        initial_charge=50.0
+    )
+
 def initialize_systems():
     """Initialize battery and price monitor systems with LG battery specifications"""
-    global battery_system, price_monitor
+    global battery_system, price_monitor, checkpointer, decision_history
+    global charge_threshold, discharge_threshold, sell_threshold
     
     if battery_system is None:
-        battery_system = BatterySystem(
-            capacity_mwh=LG_BATTERY_SPECS["capacity_mwh"],
-            max_charge_rate_mw=LG_BATTERY_SPECS["max_charge_rate_mw"],
-            max_discharge_rate_mw=LG_BATTERY_SPECS["max_discharge_rate_mw"],
-            efficiency=LG_BATTERY_SPECS["efficiency"],
-            initial_charge=50.0
-        )
+        battery_system = create_battery()
+        
+        # Resume from the last checkpoint so a restart keeps SoC, totals,
+        # thresholds and decisions
+        checkpointer = BatteryCheckpointer()
+        recovery = checkpointer.recover(battery_system)
+        checkpointer.attach(battery_system)
+        decision_history = list(battery_system.decision_history)
+        charge_threshold = battery_system.charge_threshold
+        discharge_threshold = battery_system.discharge_threshold
+        sell_threshold = battery_system.sell_threshold
+        print(f"♻️  Battery state recovered in {recovery['recovery_ms']:.1f} ms "
+              f"({recovery['wal_records_replayed']} WAL records replayed)")
     
     if price_monitor is None:
         price_monitor = PriceMonitor()
@@ -102,17 +121,14 @@ def monitor_loop():
                         "battery_status": status
                     }
                     
-                    # Update global state
-                    decision_history.append(decision_record)
+                    # Update global state (the battery keeps only the last 50 decisions)
+                    battery_system.record_decision(decision_record)
+                    decision_history = list(battery_system.decision_history)
                     current_status = {
                         "latest_decision": decision_record,
                         "battery_status": status,
                         "price_data": latest_prices
                     }
-                    
-                    # Keep only last 50 decisions
-                    if len(decision_history) > 50:
-                        decision_history = decision_history[-50:]
             
             time.sleep(10)  # Update every 10 seconds
             
@@ -211,7 +227,7 @@ class BatteryRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def handle_api_post(self):
         """Handle API POST requests"""
-        global is_running, battery_system, price_monitor
+        global is_running, battery_system, price_monitor, decision_history
         
         try:
             content_length = int(self.headers['Content-Length'])
@@ -276,13 +292,13 @@ class BatteryRequestHandler(http.server.SimpleHTTPRequestHandler):
             
             elif self.path == '/api/reset_battery':
                 if battery_system:
-                    battery_system = BatterySystem(
-                        capacity_mwh=LG_BATTERY_SPECS["capacity_mwh"],
-                        max_charge_rate_mw=LG_BATTERY_SPECS["max_charge_rate_mw"],
-                        max_discharge_rate_mw=LG_BATTERY_SPECS["max_discharge_rate_mw"],
-                        efficiency=LG_BATTERY_SPECS["efficiency"],
-                        initial_charge=50.0
-                    )
+                    battery_system = create_battery()
+                    decision_history = []
+                    
+                    # Persist the reset so a restart does not resurrect the old state
+                    if checkpointer:
+                        checkpointer.attach(battery_system)
+                        checkpointer.checkpoint(battery_system)
                 
                 response = {
                     "success": True,
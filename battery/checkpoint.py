@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.fileio import atomic_write_json
+
+CHECKPOINT_FILE = "battery_checkpoint.json"
+WAL_FILE = "battery_wal.jsonl"
+
+class BatteryCheckpointer:
+    def __init__(self,
+                 directory: str = "battery_state",
+                 checkpoint_every: int = 100,
+                 fsync: bool = True,
+                 history_limit: int = 50):
+        """
+        Durable state for a BatterySystem: compact checkpoints plus a write-ahead log
+
+        Every state change made by an attached battery is appended to the WAL before
+        the call returns. Once `checkpoint_every` records have accumulated a full
+        snapshot is written atomically and the WAL is truncated, so a restart never
+        replays more than `checkpoint_every` records on top of the last snapshot.
+        Each record carries a sequence number, and the snapshot stores the last one
+        it covers, so records left behind by a crash between writing the snapshot
+        and truncating the WAL are skipped instead of replayed twice.
+
+        Args:
+            directory: Directory holding the checkpoint and WAL files
+            checkpoint_every: Number of WAL records that triggers a new checkpoint
+            fsync: Flush WAL appends and checkpoints to disk before returning
+            history_limit: Number of most recent operations kept in a snapshot
+        """
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+        self.fsync = fsync
+        self.history_limit = history_limit
+        self.checkpoint_path = os.path.join(directory, CHECKPOINT_FILE)
+        self.wal_path = os.path.join(directory, WAL_FILE)
+        self.wal_records = 0
+        self.sequence = 0
+        self.last_recovery: Optional[Dict] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def attach(self, battery) -> None:
+        """Route the battery's state changes through this checkpointer"""
+        battery.checkpointer = self
+
+    def log(self, battery, kind: str, payload: Dict) -> None:
+        """Append one record to the WAL, checkpointing when the log is long enough"""
+        self.sequence += 1
+        record = {"seq": self.sequence, "kind": kind, "payload": payload}
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with open(self.wal_path, "a") as f:
+            f.write(line)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.wal_records += 1
+
+        if self.wal_records >= self.checkpoint_every:
+            self.checkpoint(battery)
+
+    def checkpoint(self, battery) -> None:
+        """Write a full snapshot atomically and start a fresh WAL"""
+        # Hold the battery lock throughout so no operation lands between the
+        # snapshot and the WAL truncation
+        with battery.lock:
+            snapshot = snapshot_battery(battery, self.sequence, self.history_limit)
+
+            atomic_write_json(self.checkpoint_path, snapshot, fsync=self.fsync)
+
+            # The snapshot now covers everything in the log
+            with open(self.wal_path, "w") as f:
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self.wal_records = 0
+
+    def recover(self, battery) -> Dict:
+        """
+        Restore the battery from the last checkpoint and replay the WAL on top of it
+
+        Returns:
+            Recovery statistics, including the wall time spent in milliseconds
+        """
+        start = time.perf_counter()
+        checkpoint_loaded = False
+        sequence = 0
+        replayed = 0
+        skipped = 0
+
+        with battery.lock:
+            if os.path.exists(self.checkpoint_path):
+                with open(self.checkpoint_path, "r") as f:
+                    snapshot = json.load(f)
+                restore_battery(battery, snapshot)
+                sequence = snapshot.get("sequence", 0)
+                checkpoint_loaded = True
+
+            for record in self._read_wal():
+                # Already in the snapshot: the crash came before the WAL was truncated
+                if record.get("seq", sequence + 1) <= sequence:
+                    skipped += 1
+                    continue
+                apply_record(battery, record)
+                sequence = record.get("seq", sequence + 1)
+                replayed += 1
+
+        self.sequence = sequence
+        self.wal_records = replayed + skipped
+        self.last_recovery = {
+            "checkpoint_loaded": checkpoint_loaded,
+            "wal_records_replayed": replayed,
+            "wal_records_skipped": skipped,
+            "operations_restored": len(battery.operation_history),
+            "recovery_ms": (time.perf_counter() - start) * 1000.0
+        }
+        return self.last_recovery
+
+    def _read_wal(self) -> List[Dict]:
+        """Read WAL records, ignoring a torn final line left by a crash"""
+        if not os.path.exists(self.wal_path):
+            return []
+
+        records = []
+        with open(self.wal_path, "r") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+def snapshot_battery(battery, sequence: int = 0, history_limit: Optional[int] = None) -> Dict:
+    """
+    Build a compact, JSON-serialisable snapshot of the whole controller
+
+    Args:
+        battery: BatterySystem to snapshot
+        sequence: Sequence number of the last WAL record the snapshot covers
+        history_limit: Keep only this many of the most recent operations (all if None)
+    """
+    operations = battery.operation_history
+    if history_limit is not None:
+        operations = operations[-history_limit:] if history_limit > 0 else []
+    return {
+        "version": 2,
+        "sequence": sequence,
+        "config": {
+            "capacity_mwh": battery.capacity_mwh,
+            "max_charge_rate_mw": battery.max_charge_rate_mw,
+            "max_discharge_rate_mw": battery.max_discharge_rate_mw,
+            "efficiency": battery.efficiency
+        },
+        "state": battery._state_fields(),
+        "thresholds": {
+            "charge_threshold": battery.charge_threshold,
+            "discharge_threshold": battery.discharge_threshold,
+            "sell_threshold": battery.sell_threshold
+        },
+        "demand": {
+            "mining_demand_mw": battery.mining_demand_mw,
+            "inference_demand_mw": battery.inference_demand_mw
+        },
+        "operation_history": operations,
+        "decision_history": battery.decision_history
+    }
+
+def restore_battery(battery, snapshot: Dict) -> None:
+    """Overwrite the battery's state with a snapshot produced by snapshot_battery"""
+    config = snapshot["config"]
+    battery.capacity_mwh = config["capacity_mwh"]
+    battery.max_charge_rate_mw = config["max_charge_rate_mw"]
+    battery.max_discharge_rate_mw = config["max_discharge_rate_mw"]
+    battery.efficiency = config["efficiency"]
+    battery.state.capacity = config["capacity_mwh"]
+    battery.state.max_charge_rate = config["max_charge_rate_mw"]
+    battery.state.max_discharge_rate = config["max_discharge_rate_mw"]
+    battery.state.efficiency = config["efficiency"]
+
+    _restore_state(battery, snapshot["state"])
+
+    thresholds = snapshot["thresholds"]
+    battery.charge_threshold = thresholds["charge_threshold"]
+    battery.discharge_threshold = thresholds["discharge_threshold"]
+    battery.sell_threshold = thresholds["sell_threshold"]
+
+    demand = snapshot["demand"]
+    battery.mining_demand_mw = demand["mining_demand_mw"]
+    battery.inference_demand_mw = demand["inference_demand_mw"]
+
+    battery.operation_history = list(snapshot["operation_history"])
+    battery.decision_history = list(snapshot["decision_history"])
+
+def apply_record(battery, record: Dict) -> None:
+    """Replay a single WAL record onto the battery"""
+    kind = record["kind"]
+    payload = record["payload"]
+
+    if kind == "operation":
+        battery.operation_history.append(payload["operation"])
+        _restore_state(battery, payload["state"])
+    elif kind == "thresholds":
+        battery.charge_threshold = payload["charge_threshold"]
+        battery.discharge_threshold = payload["discharge_threshold"]
+        battery.sell_threshold = payload["sell_threshold"]
+    elif kind == "decision":
+        battery.decision_history.append(payload)
+        if len(battery.decision_history) > battery.decision_history_limit:
+            battery.decision_history = battery.decision_history[-battery.decision_history_limit:]
+
+def _restore_state(battery, state: Dict) -> None:
+    battery.state.charge_level = state["charge_level"]
+    battery.state.total_energy_stored = state["total_energy_stored"]
+    battery.state.total_energy_used = state["total_energy_used"]
+    battery.state.last_updated = datetime.fromisoformat(state["last_updated"])
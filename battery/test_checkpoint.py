@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from battery.battery_system import BatterySystem
+from battery.checkpoint import BatteryCheckpointer
+
+def run_operations(battery):
+    battery.update_thresholds(1.5, 2.2, 85.0)
+    battery.make_decision(energy_price=1.2, hash_price=1.7, token_price=1.0)
+    battery.make_decision(energy_price=2.5, hash_price=1.7, token_price=1.0)
+    battery.charge(5.0, 1.0)
+    battery.record_decision({"timestamp": "2025-06-21T13:00:00", "energy_price": 1.2})
+
+def test_recover_from_wal_only(tmp_path):
+    """A restart without any checkpoint replays the WAL to the exact same state"""
+    checkpointer = BatteryCheckpointer(str(tmp_path), checkpoint_every=1000, fsync=False)
+    battery = BatterySystem(initial_charge=40.0)
+    checkpointer.attach(battery)
+    run_operations(battery)
+
+    restored = BatterySystem(initial_charge=50.0)
+    recovery = BatteryCheckpointer(str(tmp_path), fsync=False).recover(restored)
+
+    assert not recovery["checkpoint_loaded"]
+    assert recovery["wal_records_replayed"] == 5
+    assert restored.get_status() == battery.get_status()
+    assert restored.operation_history == battery.operation_history
+    assert restored.decision_history == battery.decision_history
+    assert (restored.charge_threshold, restored.discharge_threshold, restored.sell_threshold) == (1.5, 2.2, 85.0)
+
+def test_checkpoint_bounds_wal_replay(tmp_path):
+    """Periodic checkpoints keep the number of replayed records below checkpoint_every"""
+    checkpointer = BatteryCheckpointer(str(tmp_path), checkpoint_every=4, fsync=False)
+    battery = BatterySystem(capacity_mwh=1000.0, initial_charge=10.0)
+    checkpointer.attach(battery)
+    for _ in range(30):
+        battery.charge(1.0, 1.0)
+
+    restored = BatterySystem()
+    recovery = BatteryCheckpointer(str(tmp_path), checkpoint_every=4, fsync=False).recover(restored)
+
+    assert recovery["checkpoint_loaded"]
+    assert recovery["wal_records_replayed"] < 4
+    assert recovery["operations_restored"] == 30
+    assert restored.capacity_mwh == 1000.0
+    assert restored.get_status() == battery.get_status()
+
+def test_torn_wal_tail_is_ignored(tmp_path):
+    """A half-written final WAL line from a crash does not break recovery"""
+    checkpointer = BatteryCheckpointer(str(tmp_path), fsync=False)
+    battery = BatterySystem(initial_charge=20.0)
+    checkpointer.attach(battery)
+    battery.charge(5.0, 1.0)
+    with open(checkpointer.wal_path, "a") as f:
+        f.write('{"kind":"operation","payl')
+
+    restored = BatterySystem()
+    recovery = BatteryCheckpointer(str(tmp_path), fsync=False).recover(restored)
+
+    assert recovery["wal_records_replayed"] == 1
+    assert restored.state.charge_level == battery.state.charge_level
+
+def test_wal_left_behind_by_checkpoint_crash_is_not_replayed(tmp_path):
+    """Records already covered by the snapshot are skipped if the WAL was never truncated"""
+    checkpointer = BatteryCheckpointer(str(tmp_path), checkpoint_every=1000, fsync=False)
+    battery = BatterySystem(capacity_mwh=1000.0, initial_charge=10.0)
+    checkpointer.attach(battery)
+    for _ in range(3):
+        battery.charge(1.0, 1.0)
+    with open(checkpointer.wal_path) as f:
+        wal = f.read()
+    # Crash after the snapshot is renamed into place but before the WAL is truncated
+    checkpointer.checkpoint(battery)
+    with open(checkpointer.wal_path, "w") as f:
+        f.write(wal)
+    battery.charge(1.0, 1.0)
+
+    restored = BatterySystem()
+    recovery = BatteryCheckpointer(str(tmp_path), fsync=False).recover(restored)
+
+    assert recovery["wal_records_skipped"] == 3
+    assert recovery["wal_records_replayed"] == 1
+    assert restored.operation_history == battery.operation_history
+    assert restored.get_status() == battery.get_status()
+
+def test_snapshot_keeps_bounded_history(tmp_path):
+    """Snapshots hold only the most recent history_limit operations"""
+    checkpointer = BatteryCheckpointer(str(tmp_path), checkpoint_every=1000, fsync=False, history_limit=5)
+    battery = BatterySystem(capacity_mwh=1000.0, initial_charge=10.0)
+    checkpointer.attach(battery)
+    for _ in range(12):
+        battery.charge(1.0, 1.0)
+    checkpointer.checkpoint(battery)
+
+    restored = BatterySystem()
+    BatteryCheckpointer(str(tmp_path), fsync=False).recover(restored)
+
+    assert restored.operation_history == battery.operation_history[-5:]
+    assert restored.get_status() == battery.get_status()
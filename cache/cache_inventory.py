@@ -1,30 +1,33 @@
 #!/usr/bin/env python3
 import requests
-import json
+import sys
 import os
 
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache.file_cache import FileCache
+
+INVENTORY_URL = "https://mara-hackathon-api.onrender.com/inventory"
+INVENTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory.json")
+
+# Equipment specs rarely change
+INVENTORY_TTL_SECONDS = 24 * 3600
+
+def fetch_inventory():
+    response = requests.get(INVENTORY_URL, timeout=(3.05, 30))
+    response.raise_for_status()
+    return response.json()
+
+inventory_cache = FileCache(INVENTORY_FILE, fetch=fetch_inventory, ttl_seconds=INVENTORY_TTL_SECONDS)
+
 def fetch_and_cache_inventory():
     """Fetch inventory from the API and cache it locally"""
-    url = "https://mara-hackathon-api.onrender.com/inventory"
-    
     try:
         print("Fetching inventory from API...")
-        response = requests.get(url)
-        response.raise_for_status()
+        inventory_data = fetch_inventory()
+        inventory_cache.store(inventory_data, source=INVENTORY_URL)
         
-        inventory_data = response.json()
-        
-        # Create cache directory if it doesn't exist
-        cache_dir = "cache"
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        
-        # Save to cache file
-        cache_file = os.path.join(cache_dir, "inventory.json")
-        with open(cache_file, 'w') as f:
-            json.dump(inventory_data, f, indent=2)
-        
-        print(f"✅ Inventory cached successfully to {cache_file}")
+        print(f"✅ Inventory cached successfully to {INVENTORY_FILE}")
         
         # Display inventory summary
         print("\n📦 Inventory Summary:")
@@ -47,17 +50,8 @@ def fetch_and_cache_inventory():
         return None
 
 def load_cached_inventory():
-    """Load cached inventory from local file"""
-    cache_file = "cache/inventory.json"
-    
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"❌ Error loading cached inventory: {e}")
-    
-    return None
+    """Load cached inventory; re-read only when the file changes, refreshed in the background once expired"""
+    return inventory_cache.load()
 
 if __name__ == "__main__":
     # Fetch and cache inventory
@@ -1,31 +1,33 @@
 #!/usr/bin/env python3
 import requests
-import json
+import sys
 import os
-from datetime import datetime
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache.file_cache import FileCache
+
+PRICES_URL = "https://mara-hackathon-api.onrender.com/prices"
+PRICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prices.json")
+
+# The API publishes a new price point every few minutes
+PRICES_TTL_SECONDS = 300
+
+def fetch_prices():
+    response = requests.get(PRICES_URL, timeout=(3.05, 30))
+    response.raise_for_status()
+    return response.json()
+
+prices_cache = FileCache(PRICES_FILE, fetch=fetch_prices, ttl_seconds=PRICES_TTL_SECONDS)
 
 def fetch_and_cache_prices():
     """Fetch prices from the API and cache them locally"""
-    url = "https://mara-hackathon-api.onrender.com/prices"
-    
     try:
         print("Fetching prices from API...")
-        response = requests.get(url)
-        response.raise_for_status()
+        prices_data = fetch_prices()
+        prices_cache.store(prices_data, source=PRICES_URL)
         
-        prices_data = response.json()
-        
-        # Create cache directory if it doesn't exist
-        cache_dir = "cache"
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        
-        # Save to cache file
-        cache_file = os.path.join(cache_dir, "prices.json")
-        with open(cache_file, 'w') as f:
-            json.dump(prices_data, f, indent=2)
-        
-        print(f"✅ Prices cached successfully to {cache_file}")
+        print(f"✅ Prices cached successfully to {PRICES_FILE}")
         print(f"📊 Total price points: {len(prices_data)}")
         
         # Show latest prices
@@ -46,17 +48,8 @@ def fetch_and_cache_prices():
         return None
 
 def load_cached_prices():
-    """Load cached prices from local file"""
-    cache_file = "cache/prices.json"
-    
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"❌ Error loading cached prices: {e}")
-    
-    return None
+    """Load cached prices; re-read only when the file changes, refreshed in the background once expired"""
+    return prices_cache.load()
 
 if __name__ == "__main__":
     # Fetch and cache prices
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.fileio import atomic_write_json, file_signature
+
+class FileCache:
+    """
+    JSON file cache with an in-memory tier, TTL metadata and background refresh.
+
+    The parsed document and its metadata are kept in memory and re-read only
+    when the data file's mtime (or size) changes, so repeated loads cost one
+    stat() call, with or without a TTL.
+    Writes go to a temporary file in the same directory that is renamed into
+    place, so other processes see either the old or the new file, never a
+    half-written one. When and how the data was fetched is recorded in a
+    sidecar <file>.meta.json, leaving the data file in its original shape.
+    The sidecar is written last and names the signature of the data file it
+    describes, so it is the commit point: metadata that does not match the
+    data file on disk (a crash or a reader between the two renames) is
+    ignored rather than paired with the wrong data.
+    """
+
+    def __init__(self,
+                 path: str,
+                 fetch: Optional[Callable[[], Any]] = None,
+                 ttl_seconds: Optional[float] = None,
+                 refresh_in_background: bool = True):
+        """
+        Args:
+            path: JSON file backing the cache
+            fetch: Loader for fresh data (e.g. an API call); None for a read-only cache
+            ttl_seconds: Age after which data is refreshed; None never expires
+            refresh_in_background: Serve expired data while one thread refreshes it,
+                                   instead of blocking the caller
+        """
+        self.path = path
+        self.meta_path = f"{path}.meta.json"
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.refresh_in_background = refresh_in_background
+
+        self._data: Any = None
+        self._signature: Optional[tuple] = None
+        self._meta: Dict[str, Any] = {}
+        self._meta_signature: Optional[tuple] = None
+        self._lock = threading.RLock()
+        self._refreshing = False
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "writes": 0}
+
+    def _file_signature(self) -> Optional[tuple]:
+        return file_signature(self.path)
+
+    def _read_meta(self, signature: tuple) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if meta.get("data_signature") != list(signature):
+            return {}
+        return meta
+
+    def _metadata(self, signature: Optional[tuple]) -> Dict[str, Any]:
+        """Sidecar metadata of the data file with this signature, read once per signature."""
+        if signature is None:
+            return {}
+        with self._lock:
+            if signature != self._meta_signature:
+                self._meta = self._read_meta(signature)
+                self._meta_signature = signature
+            return self._meta
+
+    def age_seconds(self, signature: Optional[tuple] = None) -> Optional[float]:
+        """Seconds since the data was fetched (file mtime if there is no metadata)."""
+        signature = signature or self._file_signature()
+        if signature is None:
+            return None
+        fetched_at = self._metadata(signature).get("fetched_at")
+        if fetched_at is None:
+            fetched_at = signature[0] / 1e9
+        return time.time() - fetched_at
+
+    def is_expired(self, signature: Optional[tuple] = None) -> bool:
+        if self.ttl_seconds is None:
+            return False
+        age = self.age_seconds(signature)
+        return age is None or age >= self.ttl_seconds
+
+    def _read(self, signature: Optional[tuple] = None) -> Any:
+        """In-memory data, re-parsed only if the file changed on disk."""
+        with self._lock:
+            signature = signature or self._file_signature()
+            if signature is None:
+                return None
+            if signature == self._signature:
+                self._stats["hits"] += 1
+                return self._data
+            self._stats["misses"] += 1
+            try:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"❌ Error loading {self.path}: {e}")
+                return self._data
+            self._signature = signature
+            return self._data
+
+    def load(self) -> Any:
+        """
+        Current data: from memory, the file, or a fetch when nothing is cached.
+
+        Expired data is returned as-is while a background refresh runs (or
+        refreshed first when refresh_in_background is off).
+        """
+        signature = self._file_signature()
+        data = self._read(signature)
+        if self.fetch is None or not self.is_expired(signature):
+            return data
+        if data is None or not self.refresh_in_background:
+            return self.refresh()
+        self._refresh_async()
+        return data
+
+    def store(self, data: Any, source: Optional[str] = None) -> None:
+        """Atomically write data and its metadata, and keep it in memory."""
+        with self._lock:
+            signature = atomic_write_json(self.path, data)
+            meta = {
+                "fetched_at": time.time(),
+                "ttl_seconds": self.ttl_seconds,
+                "source": source,
+                "data_signature": list(signature),
+            }
+            atomic_write_json(self.meta_path, meta)
+            self._data = data
+            self._signature = signature
+            self._meta = meta
+            self._meta_signature = signature
+            self._stats["writes"] += 1
+
+    def refresh(self) -> Any:
+        """Fetch and store fresh data; on failure the cached data is returned."""
+        if self.fetch is None:
+            return self._read()
+        try:
+            data = self.fetch()
+        except Exception as e:
+            self._stats["refresh_errors"] += 1
+            print(f"❌ Error refreshing {self.path}: {e}")
+            return self._read()
+        self.store(data, source=getattr(self.fetch, "__name__", None))
+        self._stats["refreshes"] += 1
+        return data
+
+    def _refresh_async(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["age_seconds"] = self.age_seconds()
+        return stats
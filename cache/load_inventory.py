@@ -1,19 +1,10 @@
 #!/usr/bin/env python3
-import json
+import sys
 import os
 
-def load_cached_inventory():
-    """Load cached inventory from local file"""
-    cache_file = "cache/inventory.json"
-    
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"❌ Error loading cached inventory: {e}")
-    
-    return None
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache.cache_inventory import load_cached_inventory
 
 def get_inventory_summary():
     """Get a formatted summary of the cached inventory"""
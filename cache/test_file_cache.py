@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache.file_cache import FileCache
+
+def test_reparses_only_when_file_changes(tmp_path):
+    """Repeated loads are served from memory until the file's mtime changes"""
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps({"miners": {"air": {"hashrate": 1000}}}))
+    cache = FileCache(str(path))
+
+    first = cache.load()
+    assert cache.load() is first
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+
+    path.write_text(json.dumps({"miners": {"air": {"hashrate": 2000}}}))
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert cache.load()["miners"]["air"]["hashrate"] == 2000
+    assert cache.stats()["misses"] == 2
+
+def test_store_is_atomic_and_keeps_shape(tmp_path):
+    """Readers in other threads never see a partial file while it is rewritten"""
+    path = tmp_path / "prices.json"
+    cache = FileCache(str(path), ttl_seconds=60)
+    big = [{"timestamp": str(i), "hash_price": i * 0.5} for i in range(2000)]
+    cache.store(big)
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with open(path) as f:
+                    assert len(json.load(f)) in (2000, 2001)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for _ in range(10):
+        cache.store(big + [{"timestamp": "x", "hash_price": 1.0}])
+        cache.store(big)
+    stop.set()
+    thread.join()
+
+    assert errors == []
+    assert json.loads(path.read_text()) == big
+    meta = json.loads((tmp_path / "prices.json.meta.json").read_text())
+    assert meta["ttl_seconds"] == 60
+    assert not [p for p in os.listdir(tmp_path) if p.endswith(".tmp")]
+
+def test_expired_data_is_served_while_refreshing(tmp_path):
+    """Past its TTL, load() returns the cached data and refreshes in the background"""
+    path = tmp_path / "prices.json"
+    fetched = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        fetched.set()
+        release.wait(5)
+        return [{"hash_price": 2.0}]
+
+    cache = FileCache(str(path), fetch=fetch, ttl_seconds=0.05)
+    cache.store([{"hash_price": 1.0}])
+    time.sleep(0.1)
+    assert cache.load() == [{"hash_price": 1.0}]
+    assert fetched.wait(5)
+    assert cache.load() == [{"hash_price": 1.0}]  # one refresh in flight, not two
+    release.set()
+    for _ in range(100):
+        if cache.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+    assert cache.load() == [{"hash_price": 2.0}]
+    assert cache.stats()["refreshes"] == 1
+
+def test_missing_file_fetches_synchronously_and_failures_keep_data(tmp_path):
+    """A cold cache blocks on the fetch; a failing refresh keeps the old data"""
+    path = tmp_path / "inventory.json"
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("API down")
+        return {"miners": {}}
+
+    cache = FileCache(str(path), fetch=fetch, ttl_seconds=60, refresh_in_background=False)
+    assert cache.load() == {"miners": {}}
+    assert cache.refresh() == {"miners": {}}
+    assert cache.stats()["refresh_errors"] == 1
+
+def test_loads_with_a_ttl_read_metadata_once(tmp_path, monkeypatch):
+    """The sidecar is parsed once per version of the data file, not on every load"""
+    path = tmp_path / "prices.json"
+    cache = FileCache(str(path), fetch=lambda: [{"hash_price": 1.0}], ttl_seconds=60)
+    cache.load()
+    reads = []
+    read_meta = cache._read_meta
+    monkeypatch.setattr(cache, "_read_meta", lambda signature: reads.append(signature) or read_meta(signature))
+
+    for _ in range(5):
+        assert cache.load() == [{"hash_price": 1.0}]
+    assert reads == [] and cache.age_seconds() < 60
+
+    path.write_text(json.dumps([{"hash_price": 2.0}]))
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    cache.load()
+    cache.load()
+    assert len(reads) == 1
+
+def test_metadata_for_other_data_is_ignored(tmp_path):
+    """Data renamed into place without its sidecar is not paired with the old metadata"""
+    path = tmp_path / "prices.json"
+    cache = FileCache(str(path), ttl_seconds=60)
+    cache.store([{"hash_price": 1.0}], source="old")
+    assert cache.age_seconds() < 60
+
+    # A crash between the two renames: new data, previous sidecar
+    path.write_text(json.dumps([{"hash_price": 2.0}, {"hash_price": 3.0}]))
+    os.utime(path, ns=(time.time_ns() - 120 * 10**9, time.time_ns() - 120 * 10**9))
+    assert cache._read_meta(cache._file_signature()) == {}
+    assert cache.age_seconds() >= 120
+    assert cache.is_expired()
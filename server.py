@@ -1,15 +1,30 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
+from app.allocation import ALLOCATION_PRICE_FIELDS, DEFAULT_POWER_LIMIT, allocate
 from app.api import get_current_btc_price
 from app.forecasting import get_forecast_data
-from app.hedging import get_hedging_suggestions
+from app.garch import get_model as get_garch_model
+from app.hedging import get_hedge_ratios, get_hedging_suggestions, get_stress_report
+from app.market_data import get_market_data, get_market_data_stats
+from app.quotes import get_quote_service
+from app.site_ingest import REFRESH_DEADLINE_SECONDS, refresh_sites
+from app.site_scoring import get_engine as get_scoring_engine
+from app.spatial_index import get_index as get_site_index
+from app.site_store import get_site_store
+from app.price_history import load_price_history
+from app.profitability import get_tables as get_profitability_tables
+from app.value_at_risk import portfolio_var, DEFAULT_CONFIDENCE, DEFAULT_HORIZONS, MAX_PATHS
+from app.ai_analysis import (get_ai_analysis, get_ai_analysis_batch, get_ai_cache_stats,
+                             get_local_analysis, stream_ai_analysis, use_local_engine, BATCH_MAX_ITEMS,
+                             get_market_conditions,
+                             BATCH_DEFAULT_CONCURRENCY, BATCH_DEFAULT_ITEM_TIMEOUT)
 import requests
 import random
 import time
 from dotenv import load_dotenv
 import os
 import openai
-from datetime import date
 import json
+import math
 
 load_dotenv()
 
@@ -26,112 +41,218 @@ def index():
 def ai_analysis():
     try:
         data = request.json
-        exposure = data.get('exposure')
-        btc_delta = data.get('btc_delta')
-        energy_delta = data.get('energy_delta')
-        vega = data.get('vega')
-        time_horizon = data.get('time_horizon')
-
-        # Get today's date to pass to the prompt
-        today = date.today().strftime("%Y-%m-%d")
-
-        prompt = f"""
-        As a sophisticated financial analyst for a Bitcoin-centric quantitative fund, your task is to construct a derivatives portfolio that matches the user's specified risk sensitivities (Greeks) and constraints.
-
-        User Parameters:
-        - Target Exposure Managed: {exposure}% (The portion of the total portfolio this derivatives strategy should represent)
-        - Target BTC Price Delta: {btc_delta} (The desired sensitivity of the position's value to a $1 change in Bitcoin's price)
-        - Target Energy Price Delta: {energy_delta} (The desired sensitivity of the position's value to a $1 change in the price of energy/MWh)
-        - Target Vega: {vega} (The desired sensitivity of the position's value to a 1% change in implied volatility)
-        - Time Horizon: {time_horizon} days
-
-        Current Market Conditions:
-        - Today's Date: {today}
-        - Current BTC Price: $68,730
-        - Current Energy Price: $55/MWh
-        - BTC Implied Volatility: 65%
-        - Energy Implied Volatility: 40%
-        - Market Sentiment: Moderately Bullish on BTC, Neutral on Energy
-
-        Instructions:
-        1.  Propose a block of 2 to 5 derivatives positions. You can use options or futures on both BTC and Energy to achieve the target Greeks.
-        2.  For each position, specify:
-            - Asset: (BTC or Energy)
-            - Type: (e.g., Call Option, Put Option, Future)
-            - Action: (Buy or Sell)
-            - Quantity: (Number of contracts)
-            - Strike Price: (in USD)
-            - Expiry Date: (in YYYY-MM-DD format). **Crucially, this date must be in the future relative to today's date ({today}).**
-            - Delta: The individual position's delta.
-            - Vega: The individual position's vega.
-        3.  Provide a brief (2-3 sentence) justification for the overall strategy.
-        4.  Quantify the benefit of this strategy by calculating the total change it will have on the portfolio's overall risk profile. Provide this as "impact_to_portfolio_delta" and "impact_to_portfolio_vega".
-        5.  Format the entire response as a single JSON object. Do not include any other text, greetings, or explanations outside of the JSON object.
-
-        Example JSON structure:
-        {{
-          "justification": "This portfolio uses a long BTC call spread to achieve positive BTC delta and vega, while shorting an energy future to create the target negative energy delta. The overall structure is capital efficient and matches the specified time horizon.",
-          "impact_to_portfolio_delta": 550.75,
-          "impact_to_portfolio_vega": 120.50,
-          "positions": [
-            {{
-              "Asset": "BTC",
-              "Type": "Call Option",
-              "Action": "Buy",
-              "Quantity": 10,
-              "Strike Price": 75000,
-              "Expiry Date": "2025-09-30",
-              "Delta": 0.52,
-              "Vega": 150.20
-            }},
-            {{
-              "Asset": "Energy",
-              "Type": "Future",
-              "Action": "Sell",
-              "Quantity": 20,
-              "Strike Price": 60,
-              "Expiry Date": "2025-09-30",
-              "Delta": -20.00,
-              "Vega": 0
-            }}
-          ]
-        }}
-        """
-
-        client = openai.OpenAI()
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-        )
-        
-        ai_response = response.choices[0].message.content.strip()
-        
-        # Ensure the response is clean JSON
-        ai_response = ai_response.lstrip('```json').rstrip('```')
-
-        return jsonify(json.loads(ai_response))
+        if use_local_engine(data):
+            return jsonify(get_local_analysis(data))
+        return jsonify(get_ai_analysis(data))
 
     except Exception as e:
         print(f"An error occurred: {e}")
         return jsonify({"error": "Failed to get AI recommendation."}), 500
 
+@app.route('/ai_analysis/stream', methods=['POST'])
+def ai_analysis_stream():
+    data = request.json
+
+    # Newline-delimited JSON: one event per line, flushed as it is produced
+    def generate():
+        try:
+            for event in stream_ai_analysis(data):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            yield json.dumps({"type": "error", "error": "Failed to get AI recommendation."}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/ai_analysis/batch', methods=['POST'])
+def ai_analysis_batch():
+    data = request.json or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' must be a non-empty list of parameter sets."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch."}), 400
+
+    try:
+        max_concurrency = float(data.get('max_concurrency', BATCH_DEFAULT_CONCURRENCY))
+        item_timeout = float(data.get('timeout', BATCH_DEFAULT_ITEM_TIMEOUT))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'max_concurrency' and 'timeout' must be numbers."}), 400
+    if not (math.isfinite(max_concurrency) and max_concurrency >= 1
+            and math.isfinite(item_timeout) and item_timeout > 0):
+        return jsonify({"error": "'max_concurrency' must be at least 1 and 'timeout' positive; both finite."}), 400
+    max_concurrency = int(max_concurrency)
+
+    start = time.perf_counter()
+    results = get_ai_analysis_batch(items, max_concurrency=max_concurrency, item_timeout=item_timeout)
+    return jsonify({
+        "results": results,
+        "elapsed_ms": (time.perf_counter() - start) * 1000.0
+    })
+
+@app.route('/ai_analysis/stats')
+def ai_analysis_stats():
+    return jsonify(get_ai_cache_stats())
+
 @app.route('/forecast')
 def forecast():
-    return jsonify(get_forecast_data())
+    data = get_forecast_data()
+    if "error" in data:
+        return jsonify(data), 404
+    return jsonify(data)
+
+@app.route('/volatility')
+def volatility():
+    model = get_garch_model()
+    if model is None:
+        return jsonify({"error": "Not enough recorded price history to fit volatility."}), 404
+    return jsonify(model.summary())
 
-@app.route('/hedging')
+@app.route('/hedging', methods=['GET', 'POST'])
 def hedging():
-    return jsonify(get_hedging_suggestions())
+    if request.method == 'GET':
+        return jsonify(get_hedging_suggestions(get_hedge_ratios()))
+
+    data = request.get_json(silent=True) or {}
+    positions = data.get("positions")
+    if not isinstance(positions, list):
+        return jsonify({"error": "Expected a JSON body with a 'positions' list."}), 400
+    try:
+        return jsonify(get_stress_report(positions, get_market_conditions()))
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid position: {e}"}), 400
+
+@app.route('/hedging/ratios')
+def hedging_ratios():
+    ratios = get_hedge_ratios()
+    if ratios is None:
+        return jsonify({"error": "No recorded price history to compute hedge ratios from."}), 404
+    return jsonify(ratios)
+
+@app.route('/risk/var', methods=['POST'])
+def risk_var():
+    data = request.get_json(silent=True) or {}
+    exposures = data.get("exposures")
+    if not isinstance(exposures, dict) or not exposures:
+        return jsonify({"error": "Expected a JSON body with an 'exposures' object."}), 400
+    try:
+        history = load_price_history()
+    except FileNotFoundError:
+        return jsonify({"error": "No recorded price history to calibrate on."}), 404
+    try:
+        paths = int(data.get("paths", 100_000))
+        if paths > MAX_PATHS:
+            raise ValueError(f"paths must be at most {MAX_PATHS:,}")
+        return jsonify(portfolio_var(
+            history,
+            {k: float(v) for k, v in exposures.items()},
+            horizons=data.get("horizons", DEFAULT_HORIZONS),
+            confidence=[float(c) for c in data.get("confidence", DEFAULT_CONFIDENCE)],
+            n_paths=paths,
+            seed=int(data.get("seed", 0)),
+        ))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/profitability')
+def profitability():
+    tables = get_profitability_tables()
+    if tables is None or not len(tables):
+        return jsonify({"error": "No price history recorded yet."}), 404
+    return jsonify({
+        "as_of": str(tables.last_timestamp),
+        "ticks": len(tables),
+        "breakevens": tables.breakevens(),
+        "fleet_breakeven": tables.fleet_breakeven(),
+        "items": tables.summary(),
+    })
+
+@app.route('/quotes')
+def quotes():
+    fields = request.args.get("symbols")
+    service = get_quote_service()
+    return jsonify(service.get_quotes(fields.split(",") if fields else None))
+
+@app.route('/quotes/stats')
+def quotes_stats():
+    return jsonify(get_quote_service().stats())
+
+@app.route('/sites')
+def sites():
+    return jsonify(get_site_store().export())
+
+@app.route('/sites/ranking')
+def sites_ranking():
+    k = request.args.get("k", type=int)
+    if k is not None and k < 1:
+        return jsonify({"error": "k must be a positive integer."}), 400
+    return jsonify(get_scoring_engine().ranking(k))
+
+@app.route('/sites/nearest')
+def sites_nearest():
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    k = request.args.get("k", default=1, type=int)
+    radius_km = request.args.get("radius_km", type=float)
+    if lat is None or lon is None or not -90 <= lat <= 90:
+        return jsonify({"error": "lat and lon are required and lat must be within [-90, 90]."}), 400
+    if radius_km is not None:
+        if radius_km < 0:
+            return jsonify({"error": "radius_km must be non-negative."}), 400
+        return jsonify(get_site_index().within(lat, lon, radius_km))
+    if k < 1:
+        return jsonify({"error": "k must be a positive integer."}), 400
+    return jsonify(get_site_index().nearest(lat, lon, k))
+
+@app.route('/sites/weather_cells')
+def sites_weather_cells():
+    return jsonify([{"cell": list(cell), "sites": names} for cell, names in get_site_index().weather_cells().items()])
+
+@app.route('/sites/allocation', methods=['GET', 'POST'])
+def sites_allocation():
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+    if not isinstance(data, dict) or not isinstance(data.get("prices") or {}, dict):
+        return jsonify({"error": "'prices' must be an object of field: price."}), 400
+    prices = data.get("prices") or get_quote_service().upstream_prices()
+    missing = [f for f in ALLOCATION_PRICE_FIELDS if not isinstance(prices.get(f), (int, float))]
+    if missing:
+        status = 400 if data.get("prices") else 503
+        return jsonify({"error": f"No price for {', '.join(missing)}."}), status
+    try:
+        power_limit = float(data.get("power_limit", request.args.get("power_limit", DEFAULT_POWER_LIMIT)))
+    except (TypeError, ValueError):
+        return jsonify({"error": "power_limit must be a number."}), 400
+    if power_limit < 0:
+        return jsonify({"error": "power_limit must be non-negative."}), 400
+    sites = allocate(get_site_store().names(), prices, power_limit)
+    return jsonify({"prices": {f: prices[f] for f in ALLOCATION_PRICE_FIELDS}, "sites": sites})
+
+@app.route('/sites/refresh', methods=['POST'])
+def sites_refresh():
+    data = request.get_json(silent=True) or {}
+    names = data.get("sites")
+    if names is not None and (not isinstance(names, list) or not all(isinstance(n, str) for n in names)):
+        return jsonify({"error": "'sites' must be a list of site names."}), 400
+    return jsonify(refresh_sites(names, force=bool(data.get("force")), deadline=REFRESH_DEADLINE_SECONDS))
+
+@app.route('/sites/<path:name>')
+def site(name):
+    site_data = get_site_store().get(name)
+    if site_data is None:
+        return jsonify({"error": f"Unknown site {name!r}."}), 404
+    return jsonify(site_data)
 
 @app.route('/market_data')
 def market_data():
     try:
-        response = requests.get('https://mara-hackathon-api.onrender.com/prices')
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return jsonify(response.json())
+        return jsonify(get_market_data())
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/market_data/stats')
+def market_data_stats():
+    return jsonify(get_market_data_stats())
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001) 
\ No newline at end of file
@@ -888,6 +888,41 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function renderPositionsTable(positions) {
+        return `
+            <div class="table-container" style="margin-top: 20px;">
+                <table class="data-table">
+                    <thead>
+                        <tr>
+                            <th>Asset</th>
+                            <th>Type</th>
+                            <th>Action</th>
+                            <th>Quantity</th>
+                            <th>Strike</th>
+                            <th>Expiry</th>
+                            <th>Delta</th>
+                            <th>Vega</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${positions.map(pos => `
+                            <tr>
+                                <td>${pos.Asset}</td>
+                                <td>${pos.Type}</td>
+                                <td>${pos.Action}</td>
+                                <td>${pos.Quantity}</td>
+                                <td>${pos['Strike Price']}</td>
+                                <td>${pos['Expiry Date']}</td>
+                                <td>${pos.Delta}</td>
+                                <td>${pos.Vega}</td>
+                            </tr>
+                        `).join('')}
+                    </tbody>
+                </table>
+            </div>
+        `;
+    }
+
     async function handleAiAnalysis(event) {
         const button = event.currentTarget;
         const dataset = button.dataset;
@@ -926,7 +961,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
 
         try {
-            const response = await fetch('/ai_analysis', {
+            const response = await fetch('/ai_analysis/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -944,7 +979,41 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const result = await response.json();
+            // The endpoint streams newline-delimited JSON events: raw "delta" text,
+            // each "position" as soon as it is complete, then the final "result".
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            const streamedPositions = [];
+            let buffer = '';
+            let result = null;
+
+            const handleEvent = (event) => {
+                if (event.type === 'position') {
+                    streamedPositions.push(event.position);
+                    recommendationBody.innerHTML = `
+                        <p>Generating AI strategy... ${streamedPositions.length} position(s) so far.</p>
+                        ${renderPositionsTable(streamedPositions)}
+                    `;
+                } else if (event.type === 'result') {
+                    result = event.result;
+                } else if (event.type === 'error') {
+                    result = { error: event.error };
+                }
+            };
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+            }
+            if (buffer.trim()) handleEvent(JSON.parse(buffer));
+
+            if (!result) {
+                throw new Error('AI stream ended without a result');
+            }
             
             if (result.error) {
                 recommendationBody.innerHTML = `<p style="color: #ff8c8c;">Error: ${result.error}</p>`;
@@ -953,36 +1022,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Use the keys from the AI response: justification, positions
                 recommendationBody.innerHTML = `
                     <p>${result.justification.replace(/\\n/g, '<br>')}</p>
-                    <div class="table-container" style="margin-top: 20px;">
-                        <table class="data-table">
-                            <thead>
-                                <tr>
-                                    <th>Asset</th>
-                                    <th>Type</th>
-                                    <th>Action</th>
-                                    <th>Quantity</th>
-                                    <th>Strike</th>
-                                    <th>Expiry</th>
-                                    <th>Delta</th>
-                                    <th>Vega</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                ${result.positions.map(pos => `
-                                    <tr>
-                                        <td>${pos.Asset}</td>
-                                        <td>${pos.Type}</td>
-                                        <td>${pos.Action}</td>
-                                        <td>${pos.Quantity}</td>
-                                        <td>${pos['Strike Price']}</td>
-                                        <td>${pos['Expiry Date']}</td>
-                                        <td>${pos.Delta}</td>
-                                        <td>${pos.Vega}</td>
-                                    </tr>
-                                `).join('')}
-                            </tbody>
-                        </table>
-                    </div>
+                    ${renderPositionsTable(result.positions)}
                 `;
                 executeBtn.classList.remove('hidden');
             }
@@ -0,0 +1,216 @@
+import threading
+import time
+
+import app.ai_analysis as ai_analysis
+from app.ai_analysis import StubChatClient, get_ai_analysis, normalize_params
+
+PARAMS = {"exposure": 5, "btc_delta": 0.2, "energy_delta": 0.1, "vega": 1200, "time_horizon": 7}
+
+
+def setup_function():
+    ai_analysis._cache.invalidate()
+
+
+def test_normalize_params_makes_equivalent_requests_equal():
+    assert normalize_params(PARAMS) == normalize_params(
+        {"exposure": "5.0", "btc_delta": 0.2000000001, "energy_delta": "0.1",
+         "vega": 1200.0, "time_horizon": "7"})
+
+
+def test_identical_requests_call_model_once(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+
+    first = get_ai_analysis(PARAMS, client=client)
+    second = get_ai_analysis(dict(PARAMS, exposure="5"), client=client)
+    get_ai_analysis(dict(PARAMS, vega=1500), client=client)
+
+    assert first == second
+    assert len(first["positions"]) == 2
+    assert client.calls == 2
+
+
+def test_concurrent_identical_requests_are_deduplicated(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+    create = client.chat.completions.create
+
+    def slow_create(**kwargs):
+        time.sleep(0.1)
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+    threads = [threading.Thread(target=get_ai_analysis, args=(PARAMS, client)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert client.calls == 1
+
+
+def test_disk_tier_survives_memory_cache_loss(monkeypatch, tmp_path):
+    monkeypatch.setenv("AI_ANALYSIS_CACHE_DIR", str(tmp_path))
+    client = StubChatClient()
+
+    get_ai_analysis(PARAMS, client=client)
+    ai_analysis._cache.invalidate()
+    get_ai_analysis(PARAMS, client=client)
+
+    assert client.calls == 1
+
+
+def test_parse_ai_response_strips_code_fence():
+    assert ai_analysis.parse_ai_response('```json\n{"positions": []}\n```') == {"positions": []}
+
+
+def test_ai_analysis_route_with_stub(monkeypatch):
+    from server import app
+
+    monkeypatch.setenv("AI_ANALYSIS_STUB", "1")
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    response = app.test_client().post('/ai_analysis', json=PARAMS)
+
+    assert response.status_code == 200
+    assert "justification" in response.get_json()
+
+
+def test_position_stream_parser_emits_each_position_once_complete():
+    text = '{"justification": "a } tricky \\" string", "positions": [{"Asset": "BTC", "Nested": {"a": [1]}}, {"Asset": "Energy"}], "x": {}}'
+    parser = ai_analysis.PositionStreamParser()
+    emitted = []
+    for i in range(len(text)):
+        emitted.extend(parser.feed(text[i]))
+
+    assert emitted == [{"Asset": "BTC", "Nested": {"a": [1]}}, {"Asset": "Energy"}]
+
+
+def test_stream_emits_positions_before_result_and_caches(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient(chunk_size=7)
+
+    events = list(ai_analysis.stream_ai_analysis(PARAMS, client=client))
+    kinds = [e["type"] for e in events]
+
+    assert kinds[0] == "delta"
+    assert kinds.count("position") == 2
+    assert kinds[-1] == "result"
+    assert kinds.index("position") < len(kinds) - 2
+    assert events[-1]["result"] == get_ai_analysis(PARAMS, client=client)
+    assert client.calls == 1
+
+
+def test_stream_route_returns_ndjson(monkeypatch):
+    import json
+    from server import app
+
+    monkeypatch.setenv("AI_ANALYSIS_STUB", "1")
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    response = app.test_client().post('/ai_analysis/stream', json=PARAMS)
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert events[-1]["type"] == "result"
+    assert len(events[-1]["result"]["positions"]) == 2
+
+
+def test_batch_runs_concurrently_in_input_order(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+    create = client.chat.completions.create
+
+    def slow_create(**kwargs):
+        time.sleep(0.2)
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+    items = [dict(PARAMS, vega=v) for v in (100, 200, 300, 400)]
+
+    start = time.perf_counter()
+    results = ai_analysis.get_ai_analysis_batch(items, max_concurrency=4, client=client)
+    elapsed = time.perf_counter() - start
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert all(r["ok"] for r in results)
+    assert elapsed < 0.6
+
+
+def test_batch_reports_per_item_errors_and_timeouts(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+    create = client.chat.completions.create
+
+    def flaky_create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        if "Target Vega: 666" in prompt:
+            raise RuntimeError("model unavailable")
+        if "Target Vega: 999" in prompt:
+            time.sleep(1)
+        return create(**kwargs)
+
+    client.chat.completions.create = flaky_create
+    items = [PARAMS, dict(PARAMS, vega=666), dict(PARAMS, vega=999)]
+    results = ai_analysis.get_ai_analysis_batch(items, item_timeout=0.3, client=client)
+
+    assert results[0]["ok"]
+    assert results[1] == dict(results[1], ok=False, error="model unavailable")
+    assert not results[2]["ok"] and "Timed out" in results[2]["error"]
+
+
+def test_hung_item_does_not_hold_the_only_slot(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+    create = client.chat.completions.create
+    release = threading.Event()
+
+    def hanging_create(**kwargs):
+        if "Target Vega: 999" in kwargs["messages"][0]["content"]:
+            release.wait(10)
+        return create(**kwargs)
+
+    client.chat.completions.create = hanging_create
+    items = [dict(PARAMS, vega=999), PARAMS, dict(PARAMS, vega=200)]
+    start = time.perf_counter()
+    results = ai_analysis.get_ai_analysis_batch(items, max_concurrency=1, item_timeout=0.3, client=client)
+    elapsed = time.perf_counter() - start
+    release.set()
+
+    assert not results[0]["ok"] and "Timed out" in results[0]["error"]
+    assert results[1]["ok"] and results[2]["ok"]
+    assert elapsed < 1.0
+
+
+def test_batch_deadline_fails_running_and_queued_items(monkeypatch):
+    monkeypatch.delenv("AI_ANALYSIS_CACHE_DIR", raising=False)
+    client = StubChatClient()
+    create = client.chat.completions.create
+
+    def slow_create(**kwargs):
+        time.sleep(0.3)
+        return create(**kwargs)
+
+    client.chat.completions.create = slow_create
+    items = [dict(PARAMS, vega=v) for v in (100, 200, 300)]
+    start = time.perf_counter()
+    results = ai_analysis.get_ai_analysis_batch(items, max_concurrency=1, item_timeout=5, client=client,
+                                                deadline=0.45)
+    assert time.perf_counter() - start < 0.8
+    assert results[0]["ok"]
+    assert "batch deadline" in results[1]["error"] and "Not started" in results[2]["error"]
+
+
+def test_batch_route_validates_body():
+    from server import app
+
+    assert app.test_client().post('/ai_analysis/batch', json={"items": []}).status_code == 400
+
+
+def test_batch_route_rejects_non_positive_or_infinite_limits():
+    from server import app
+
+    client = app.test_client()
+    items = [{"energy_price": 1.0}]
+    for limits in ({"timeout": 0}, {"timeout": -1}, {"timeout": "inf"}, {"timeout": "nan"},
+                   {"max_concurrency": 0}, {"max_concurrency": -4}, {"max_concurrency": "inf"}):
+        response = client.post('/ai_analysis/batch', json=dict(limits, items=items))
+        assert response.status_code == 400, limits
@@ -0,0 +1,138 @@
+import itertools
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+import app.allocation as allocation
+import app.quotes as quotes
+import app.site_store as site_store
+from app.allocation import AllocationOptimizer, inventory_items, solve_knapsack, unit_margins
+from app.hedge_ratios import load_inventory
+from app.quotes import QuoteService, reference_quotes, upstream_quotes
+from app.site_store import SiteStore
+from server import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRICES = {"hash_price": 2.5, "token_price": 3.0, "energy_price": 0.65}
+
+
+def brute_force(margin, power, limit, caps):
+    ranges = [range(min(c, int(limit // p)) + 1) for c, p in zip(caps, power)]
+    best = 0.0
+    for counts in itertools.product(*ranges):
+        if np.dot(counts, power) <= limit:
+            best = max(best, float(np.dot(counts, margin)))
+    return best
+
+
+def test_knapsack_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        margin = rng.normal(1.0, 1.0, 4)
+        power = rng.integers(1, 10, 4).astype(float)
+        caps = rng.integers(0, 5, 4)
+        limit = float(rng.integers(0, 30))
+        counts, _ = solve_knapsack(margin, power, limit, caps)
+        assert np.dot(counts, power) <= limit and all(0 <= c <= cap for c, cap in zip(counts, caps))
+        assert np.isclose(np.dot(counts, margin), brute_force(margin, power, limit, caps))
+
+        # Any feasible or infeasible incumbent gives the same optimum
+        incumbent = rng.integers(0, 6, 4)
+        warm, _ = solve_knapsack(margin, power, limit, caps, incumbent=incumbent)
+        assert np.isclose(np.dot(warm, margin), np.dot(counts, margin))
+
+
+def test_optimizer_allocates_within_limits():
+    inventory = load_inventory()
+    optimizer = AllocationOptimizer(inventory, {
+        "small": {"power_limit": 20_000, "counts": {"hydro": 1, "asic": 1}},
+        "large": {"power_limit": 1_000_000},
+    })
+    result = optimizer.solve(PRICES)
+    # hydro and asic are capped at one unit; the remaining 5000 fits one GPU
+    assert result["small"]["counts"] == {"air": 0, "hydro": 1, "immersion": 0, "gpu": 1, "asic": 1}
+    assert result["small"]["power"] == 18_333
+    assert result["large"]["power"] <= 1_000_000
+    margins = unit_margins(inventory_items(inventory), PRICES)
+    assert np.isclose(result["large"]["margin"], result["large"]["revenue"] - result["large"]["energy_cost"])
+    assert np.isclose(result["large"]["margin"],
+                      np.dot(list(result["large"]["counts"].values()), margins))
+
+    # Unprofitable items are switched off
+    result = optimizer.solve(dict(PRICES, energy_price=1.0))
+    assert result["large"]["counts"]["air"] == 0 and result["large"]["counts"]["gpu"] == 0
+
+
+def test_warm_start_reuses_and_tracks_prices():
+    optimizer = AllocationOptimizer(load_inventory(), {f"site {i}": {"power_limit": 50_000 + i * 1000}
+                                                       for i in range(20)})
+    optimizer.solve(PRICES)
+    solves = optimizer.stats["solves"]
+    optimizer.solve(PRICES)
+    assert optimizer.stats["solves"] == solves and optimizer.stats["reused"] == 20
+
+    moved = dict(PRICES, hash_price=2.6)
+    warm = optimizer.solve(moved)
+    cold = AllocationOptimizer(load_inventory(), {name: {"power_limit": site["power_limit"]}
+                                                  for name, site in optimizer.sites.items()}).solve(moved)
+    assert all(np.isclose(warm[name]["margin"], cold[name]["margin"]) for name in warm)
+
+
+def test_concurrent_allocations_keep_their_own_limits(monkeypatch):
+    monkeypatch.setattr(allocation, "_optimizer", None)
+    # Switch threads often, so an unlocked solve would see the other request's limits
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    names = [f"site {i}" for i in range(50)]
+    mismatched = []
+
+    def request(limit):
+        for _ in range(20):
+            sites = allocation.allocate(names, PRICES, limit)
+            mismatched.extend(s for s in sites.values() if s["power_limit"] != limit or s["power"] > limit)
+
+    threads = [threading.Thread(target=request, args=(limit,)) for limit in (20_000.0, 500_000.0)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(previous)
+    assert not mismatched
+    monkeypatch.setattr(allocation, "_optimizer", None)
+
+
+def test_allocation_route(tmp_path, monkeypatch):
+    store = SiteStore(str(tmp_path / "sites.db"))
+    with open(os.path.join(ROOT, "saved_data.json")) as f:
+        store.import_document(json.load(f))
+    monkeypatch.setattr(site_store, "_store", store)
+    monkeypatch.setattr(allocation, "_optimizer", None)
+    client = app.test_client()
+
+    response = client.post("/sites/allocation", json={"prices": PRICES, "power_limit": 100_000})
+    sites = response.get_json()["sites"]
+    assert len(sites) == 18 and sites["Paraguay Hydro"]["power"] <= 100_000
+    assert client.post("/sites/allocation", json={"prices": {"hash_price": 1}}).status_code == 400
+    assert client.post("/sites/allocation", json={"prices": PRICES, "power_limit": "x"}).status_code == 400
+    assert client.post("/sites/allocation", json={"prices": [1]}).status_code == 400
+
+    # Without prices, all three come from the latest upstream tick, not the USD/MWh reference quote
+    tick = dict(PRICES, timestamp="2025-06-21T13:00:00")
+    monkeypatch.setattr(quotes, "get_market_data", lambda: [tick])
+    monkeypatch.setattr(quotes, "_service", QuoteService(sources=(reference_quotes, upstream_quotes)))
+    data = client.get("/sites/allocation").get_json()
+    assert data["prices"] == PRICES
+    assert sum(data["sites"]["Paraguay Hydro"]["counts"].values()) > 0
+
+    # Sites removed from the store are dropped from the shared optimizer
+    store.delete("Paraguay Hydro")
+    sites = client.post("/sites/allocation", json={"prices": PRICES}).get_json()["sites"]
+    assert len(sites) == 17 and "Paraguay Hydro" not in allocation._optimizer.sites
+    assert sites["Kearney, NE"]["power_limit"] == allocation.DEFAULT_POWER_LIMIT
+    monkeypatch.setattr(allocation, "_optimizer", None)
+    store.close()
@@ -1,5 +1,14 @@
+import app.quotes as quotes
 from app.api import get_current_btc_price
+from app.quotes import QuoteService, reference_quotes
 
-def test_get_current_btc_price():
+
+def upstream_stub():
+    return {"hash_price": {"price": 2.5, "source": "upstream"}}
+
+
+def test_get_current_btc_price(monkeypatch):
+    monkeypatch.setattr(quotes, "_service", QuoteService(sources=(reference_quotes, upstream_stub)))
     result = get_current_btc_price()
     assert "Error" not in result
+    assert result == "$68,730.00"
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.backtest import backtest, best_policies, policy_grid
+from app.price_history import load_price_history, synthetic_history
+
+HISTORY = load_price_history(synthetic_history(300, seed=6))
+HASHRATE, POWER = 16_000.0, 18_333.0
+
+
+def loop_backtest(history, interval, ratio, cost_rate):
+    """Reference: one policy, tick by tick."""
+    prices = np.column_stack([history["hash_price"], history["energy_price"]])
+    T = len(prices)
+    exposure = np.array([HASHRATE, -POWER])
+    realized, position, hedge, pnl = 0.0, np.zeros(2), 0.0, []
+    start_value = None
+    for t in range(T):
+        if t > 0:
+            hedge += position @ (prices[t] - prices[t - 1])
+        margin = prices[t] @ exposure
+        realized += margin
+        value = realized + (T - 1 - t) * margin
+        start_value = value if start_value is None else start_value
+        if t % interval == 0:
+            target = -ratio * (T - 1 - t) * exposure
+            hedge -= cost_rate * np.abs(target - position) @ prices[t]
+            position = target
+        pnl.append(value - start_value + hedge)
+    return np.array(pnl)
+
+
+def test_vectorized_policies_match_tick_loop():
+    result = backtest(HISTORY, HASHRATE, POWER, intervals=(1, 7, 50), hedge_ratios=(0.0, 0.6), cost_bps=10)
+    policies = result["policies"]
+    for i in range(policies["interval"].size):
+        expected = loop_backtest(HISTORY, policies["interval"][i], policies["hedge_ratio"][i], 10 / 1e4)
+        assert np.allclose(result["hedged"][i], expected, rtol=1e-10, atol=1e-6)
+
+
+def test_unhedged_and_perfect_hedge_limits():
+    result = backtest(HISTORY, HASHRATE, POWER, intervals=(1,), hedge_ratios=(0.0, 1.0), cost_bps=0)
+    none, full = result["hedged"]
+    assert np.array_equal(none, result["unhedged"])
+    assert result["summary"]["variance_reduction"][1] == pytest.approx(1.0)
+    assert np.allclose(full, 0.0, atol=1e-6 * np.abs(result["unhedged"]).max())
+
+
+def test_chunking_and_ranking():
+    a = backtest(HISTORY, HASHRATE, POWER, chunk_policies=7)
+    b = backtest(HISTORY, HASHRATE, POWER)
+    assert np.allclose(a["hedged"], b["hedged"])
+    assert a["hedged"].shape == (policy_grid()["interval"].size, 300)
+    best = best_policies(b, 3)
+    assert [p["pnl_vol"] for p in best] == sorted(p["pnl_vol"] for p in best)
+    assert best[0]["hedge_ratio"] == 1.0
+    assert b["summary"]["trades"].max() == 300
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.evaluation import evaluate, get_results_store, rolling_origins, run_key
+from app.price_history import load_price_history, synthetic_history
+
+HISTORY = load_price_history(synthetic_history(400, seed=5))
+OPTIONS = {"horizons": (1, 6), "min_train": 100, "step": 3}
+
+
+def test_origins_leave_room_for_every_horizon():
+    origins = rolling_origins(400, (1, 6), min_train=100, step=3)
+    assert origins[0] == 99
+    assert origins[-1] + 6 <= 399
+
+
+def test_random_walk_metrics_match_direct_computation():
+    result = evaluate({"model": "random_walk", "params": {"window": 50}}, HISTORY, **OPTIONS)
+    prices = HISTORY["hash_price"]
+    origins = rolling_origins(400, (1, 6), min_train=100, step=3)
+    errors = prices[origins] - prices[origins + 6]
+    metrics = result["horizons"][1]["fields"]["hash_price"]
+    assert result["origins"] == origins.size
+    assert metrics["mae"] == pytest.approx(np.abs(errors).mean())
+    assert metrics["rmse"] == pytest.approx(np.sqrt((errors ** 2).mean()))
+    assert 0.75 < metrics["coverage"] <= 1.0
+
+
+def test_process_pool_matches_serial():
+    config = {"model": "ewma"}
+    serial = evaluate(config, HISTORY, workers=1, **OPTIONS)
+    pooled = evaluate(config, HISTORY, workers=2, **OPTIONS)
+    assert serial["key"] == pooled["key"]
+    assert serial["horizons"] == pooled["horizons"]
+
+
+def test_unchanged_runs_are_served_from_the_store(tmp_path):
+    store = get_results_store(str(tmp_path))
+    config = {"model": "garch", "params": {"refit_every": 100}}
+    first = evaluate(config, HISTORY, store=store, **OPTIONS)
+    again = evaluate(config, HISTORY, store=store, **OPTIONS)
+    assert not first["cached"] and again["cached"]
+    assert again["horizons"] == first["horizons"]
+
+    longer = load_price_history(synthetic_history(401, seed=5))
+    assert run_key(config, longer, (1, 6), 0.9, 100, 3) != first["key"]
+    assert not evaluate({"model": "ewma"}, HISTORY, store=store, **OPTIONS)["cached"]
+
+
+def test_unknown_forecaster_is_rejected():
+    with pytest.raises(ValueError):
+        evaluate({"model": "oracle"}, HISTORY, **OPTIONS)
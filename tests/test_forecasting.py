@@ -1,5 +1,84 @@
-from app.forecasting import forecast_prices
+import json
+
+import numpy as np
+import pytest
+
+import app.forecasting as forecasting
+from app.forecasting import EWMAForecaster, forecast_prices, get_forecast_data
+from app.price_history import load_price_history, synthetic_history
+from app.pricing import norm_ppf
+from server import app
+
 
 def test_forecast_prices():
     # Just test the function runs for now
     forecast_prices()
+
+
+def test_incremental_updates_match_batch_fit():
+    history = load_price_history(synthetic_history(400, seed=2))
+    batch = EWMAForecaster()
+    batch.fit(history)
+
+    incremental = EWMAForecaster()
+    head = {k: v[:250] for k, v in history.items()}
+    incremental.fit(head)
+    assert incremental.fit(history) == 150  # only the unseen ticks
+    assert np.allclose(incremental.var, batch.var)
+    assert np.allclose(incremental.forecast(12)["price"], batch.forecast(12)["price"])
+
+
+def test_ar1_mean_reversion_is_recovered():
+    rng = np.random.default_rng(0)
+    r = np.zeros(20_000)
+    for t in range(1, r.size):
+        r[t] = 0.5 * r[t - 1] + 0.01 * rng.standard_normal()
+    engine = EWMAForecaster(fields=("price",))
+    for p in np.exp(np.cumsum(r)):
+        engine.update([p])
+    assert engine.phi[0] == pytest.approx(0.5, abs=0.1)
+    assert np.sqrt(engine.var[0]) == pytest.approx(0.01, rel=0.3)
+
+
+def test_forecast_cache_is_invalidated_by_new_tick():
+    engine = EWMAForecaster()
+    engine.fit(load_price_history(synthetic_history(100)))
+    first = engine.forecast(12)
+    assert engine.forecast(12) is first
+    engine.forecast(1)
+    assert engine.cache_size() == 2
+    engine.update([2.5, 3.0, 0.65])
+    assert engine.cache_size() == 0
+    assert engine.forecast(12) is not first
+
+
+def test_bands_widen_with_horizon_and_confidence():
+    engine = EWMAForecaster()
+    engine.fit(load_price_history(synthetic_history(500)))
+    short, long = engine.forecast(1), engine.forecast(288)
+    assert np.all(long["upper"] - long["lower"] > short["upper"] - short["lower"])
+    assert np.all(short["lower"] < short["price"]) and np.all(short["price"] < short["upper"])
+    wide = engine.forecast(12, 0.99)
+    assert np.all(wide["upper"] > engine.forecast(12, 0.9)["upper"])
+    assert float(norm_ppf(0.975)) == pytest.approx(1.959963984540054, abs=1e-12)
+
+
+def test_forecast_route_follows_history_file(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(path))
+    forecasting.reset_engine()
+    client = app.test_client()
+    assert client.get("/forecast").status_code == 404
+
+    points = synthetic_history(300)
+    path.write_text(json.dumps(points[100:]))
+    data = client.get("/forecast").get_json()
+    assert set(data["series"]) == {"hash_price", "token_price", "energy_price"}
+    assert [p["horizon"] for p in data["series"]["hash_price"]] == [1, 12, 288]
+    assert data["tick_seconds"] == 300
+
+    path.write_text(json.dumps(points))
+    engine = forecasting.get_engine()
+    assert engine.ticks == 300
+    assert get_forecast_data()["as_of"] == str(engine.last_timestamp)
+    forecasting.reset_engine()
@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+import app.garch as garch
+from app.garch import GarchModel, fit_garch
+from app.price_history import load_price_history, synthetic_history
+from server import app
+
+
+def simulate_garch(n, omega, alpha, beta, seed=0):
+    rng = np.random.default_rng(seed)
+    s2 = omega / (1 - alpha - beta)
+    r = np.empty(n)
+    for t in range(n):
+        r[t] = np.sqrt(s2) * rng.standard_normal()
+        s2 = omega + alpha * r[t] ** 2 + beta * s2
+    return r
+
+
+def test_fit_recovers_parameters_for_several_series():
+    returns = np.column_stack([simulate_garch(8_000, 1e-7, 0.10, 0.85, seed=1),
+                               simulate_garch(8_000, 4e-7, 0.05, 0.90, seed=2)])
+    params = fit_garch(returns)
+    assert params["alpha"] == pytest.approx([0.10, 0.05], abs=0.03)
+    assert params["beta"] == pytest.approx([0.85, 0.90], abs=0.05)
+    assert np.all(params["alpha"] + params["beta"] < 1)
+
+
+def test_update_is_the_garch_recursion():
+    history = load_price_history(synthetic_history(500))
+    model = GarchModel().fit(history)
+    p = model.params
+    previous = model.sigma2.copy()
+    prices = np.exp(model.last_log_price) * np.array([1.01, 0.99, 1.0])
+    model.update(prices)
+    e = np.log([1.01, 0.99, 1.0]) - p["mu"]
+    assert np.allclose(model.sigma2, p["omega"] + p["alpha"] * e * e + p["beta"] * previous)
+
+
+def test_term_structure_reverts_to_long_run_variance():
+    model = GarchModel(fields=("x",))
+    model.params = {"mu": np.zeros(1), "omega": np.array([1e-6]), "alpha": np.array([0.1]),
+                    "beta": np.array([0.8])}
+    model.sigma2 = np.array([4e-5])  # far above the long-run 1e-5
+    forecast = model.forecast((1, 2, 500))
+    assert forecast["tick_vol"][0, 0] == pytest.approx(np.sqrt(4e-5))
+    assert forecast["tick_vol"][1, 0] == pytest.approx(np.sqrt(1e-5 + 0.9 * 3e-5))
+    assert forecast["tick_vol"][2, 0] == pytest.approx(np.sqrt(1e-5))
+    cumulative = sum(1e-5 + 0.9 ** (h - 1) * 3e-5 for h in range(1, 501))
+    assert forecast["horizon_vol"][2, 0] == pytest.approx(np.sqrt(cumulative))
+
+
+def test_volatility_route_filters_new_ticks(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(path))
+    garch.reset_model()
+    client = app.test_client()
+    assert client.get("/volatility").status_code == 404
+
+    points = synthetic_history(400)
+    path.write_text(json.dumps(points[50:]))
+    data = client.get("/volatility").get_json()
+    assert set(data["series"]) == {"hash_price", "token_price", "energy_price"}
+    assert data["series"]["energy_price"]["term_structure"][0]["annualized_vol"] > 0
+    fitted = garch.get_model().params
+
+    path.write_text(json.dumps(points))
+    model = garch.get_model()
+    assert model.ticks_since_fit == 50
+    assert model.params is fitted
+    garch.reset_model()
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+
+import app.hedge_ratios as hedge_ratios
+from app.hedge_ratios import HedgeRatioEngine, RollingMoments, fleet_hashrate, fleet_power, load_inventory
+from app.hedging import get_hedging_suggestions
+from app.price_history import synthetic_history
+from server import app
+
+
+def test_fleet_hashrate_from_inventory():
+    inventory = load_inventory()
+    assert fleet_hashrate(inventory) == 16_000
+    assert fleet_hashrate(inventory, {"hydro": 2}) == 20_000
+    assert fleet_power(inventory) == 18_333
+
+
+def test_rolling_moments_match_window_covariance():
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((1_000, 3)) * [1.0, 5.0, 0.1] + [100.0, 0.0, 3.0]
+    moments = RollingMoments(3, 64)
+    for i, z in enumerate(data):
+        moments.push(z)
+        if i in (1, 40, 63, 500, 999):
+            window = data[max(0, i - 63):i + 1]
+            assert np.allclose(moments.covariance(), np.cov(window, rowvar=False))
+
+
+def test_engine_recovers_known_hedge():
+    rng = np.random.default_rng(1)
+    n = 3_000
+    energy = 0.65 + np.cumsum(rng.standard_normal(n) * 0.002)
+    token = 3.0 + np.cumsum(rng.standard_normal(n) * 0.003)
+    # Hash price moves 0.5 per unit energy move and -0.2 per unit token move, plus noise
+    hash_price = 2.5 + 0.5 * (energy - energy[0]) - 0.2 * (token - token[0]) \
+        + np.cumsum(rng.standard_normal(n) * 0.0005)
+    engine = HedgeRatioEngine(hashrate=1_000.0, windows=(288, 2016))
+    for row in np.column_stack([hash_price, energy, token]):
+        engine.update(row)
+
+    week = engine.ratios()[2016]
+    assert week["observations"] == 2016
+    assert week["hedge"]["energy_price"] == pytest.approx(-500.0, rel=0.05)
+    assert week["hedge"]["token_price"] == pytest.approx(200.0, rel=0.05)
+    assert week["effectiveness"] > 0.8
+    assert week["hedged_vol"] < week["revenue_vol"]
+
+
+def test_hedging_route_reports_ratios(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(path))
+    hedge_ratios.reset_engine()
+    client = app.test_client()
+    assert client.get("/hedging/ratios").status_code == 404
+    assert client.get("/hedging").get_json() == get_hedging_suggestions()
+
+    path.write_text(json.dumps(synthetic_history(100)))
+    ratios = client.get("/hedging/ratios").get_json()
+    assert ratios["12"]["observations"] == 12
+    assert ratios["2016"]["observations"] == 99
+    suggestions = client.get("/hedging").get_json()
+    assert suggestions == get_hedging_suggestions(ratios)
+    assert "units of energy_price" in suggestions[0]
+    hedge_ratios.reset_engine()
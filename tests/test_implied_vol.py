@@ -0,0 +1,60 @@
+import numpy as np
+
+from app.implied_vol import (ABOVE_MAXIMUM, AT_VOL_BOUND, BELOW_INTRINSIC, NOT_AN_OPTION, OK,
+                             VOL_BOUNDS, ChainVolSolver, implied_vol)
+from app.pricing import CALL, FUTURE, PUT, black76
+
+
+def test_recovers_vols_for_a_chain():
+    rng = np.random.default_rng(1)
+    strikes = np.linspace(40_000, 110_000, 500)
+    expiry = rng.uniform(0.02, 1.5, strikes.size)
+    true_vol = rng.uniform(0.2, 1.5, strikes.size)
+    kind = np.where(strikes < 68_730, PUT, CALL)
+    price = black76(68_730, strikes, expiry, true_vol, 0.04, kind)["price"]
+
+    result = implied_vol(price, 68_730, strikes, expiry, 0.04, kind)
+
+    assert result["converged"].all()
+    np.testing.assert_allclose(result["vol"], true_vol, rtol=1e-6)
+
+
+def test_reports_per_quote_failures():
+    good = float(black76(68_730, 70_000, 0.5, 0.65)["price"])
+    result = implied_vol([100.0, good, 80_000.0, 5.0], 68_730, [60_000, 70_000, 50_000, 60], 0.5,
+                         instrument=[CALL, CALL, CALL, FUTURE])
+
+    assert list(result["status"]) == [BELOW_INTRINSIC, OK, ABOVE_MAXIMUM, NOT_AN_OPTION]
+    assert list(result["converged"]) == [False, True, False, False]
+    assert np.isnan(result["vol"][[0, 2, 3]]).all()
+
+
+def test_vols_beyond_the_bounds_are_flagged():
+    price = black76(68_730, 70_000, 0.5, [7.0, 0.65])["price"]
+    result = implied_vol(price, 68_730, 70_000, 0.5)
+
+    assert list(result["status"]) == [AT_VOL_BOUND, OK]
+    assert list(result["converged"]) == [False, True]
+    assert result["vol"][0] == VOL_BOUNDS[1]
+
+
+def test_warm_start_needs_fewer_iterations():
+    strikes = np.linspace(50, 70, 50)
+    price = black76(55.0, strikes, 0.25, 0.4, 0.0, CALL)["price"]
+    cold = implied_vol(price, 55.0, strikes, 0.25)
+
+    moved = black76(55.2, strikes, 0.25, 0.41, 0.0, CALL)["price"]
+    warm = implied_vol(moved, 55.2, strikes, 0.25, initial_vol=cold["vol"])
+
+    assert warm["converged"].all()
+    assert warm["iterations"].max() < cold["iterations"].max()
+
+
+def test_chain_solver_remembers_previous_tick():
+    solver = ChainVolSolver()
+    ids = ["BTC-C-60000", "BTC-C-80000"]
+    price = black76(68_730, [60_000, 80_000], 0.5, 0.65)["price"]
+    solver.solve(ids, price, 68_730, [60_000, 80_000], 0.5)
+
+    assert set(solver.last_vols) == set(ids)
+    np.testing.assert_allclose(list(solver.last_vols.values()), 0.65, rtol=1e-8)
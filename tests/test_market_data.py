@@ -0,0 +1,92 @@
+import threading
+import time
+
+import app.market_data as market_data
+from app.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_hits_until_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    calls = []
+    loader = lambda: calls.append(1) or len(calls)
+
+    assert cache.get("k", loader) == 1
+    clock.now = 5
+    assert cache.get("k", loader) == 1
+    clock.now = 11
+    assert cache.get("k", loader) == 2
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_ttl_cache_serves_stale_while_revalidating():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, stale_seconds=100, clock=clock)
+    cache.set("k", "old")
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    clock.now = 20
+    assert cache.get("k", loader) == "old"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.peek("k") == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("k", loader) == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_ttl_cache_coalesces_concurrent_misses():
+    cache = TTLCache(ttl_seconds=10)
+    calls = []
+    release = threading.Event()
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(1)
+        return "prices"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", slow_loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["prices"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_market_data_route_uses_cache(monkeypatch):
+    from server import app
+
+    calls = []
+    payload = [{"timestamp": "2025-06-21T13:00:00", "energy_price": 1.8,
+                "hash_price": 1.7, "token_price": 1.0}]
+    monkeypatch.setattr(market_data, "fetch_market_data", lambda: calls.append(1) or payload)
+    market_data._cache.invalidate()
+
+    client = app.test_client()
+    assert client.get('/market_data').get_json() == payload
+    assert client.get('/market_data').get_json() == payload
+    assert len(calls) == 1
+    assert client.get('/market_data/stats').get_json()["hits"] >= 1
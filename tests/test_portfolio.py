@@ -0,0 +1,51 @@
+import time
+from datetime import date
+
+import pytest
+
+from app.portfolio import construct_portfolio, portfolio_greeks
+
+TODAY = date(2025, 6, 21)
+MARKET_CONDITIONS = {"btc_price": 68730.0, "energy_price": 55.0, "btc_implied_vol": 0.65,
+                     "energy_implied_vol": 0.40}
+
+
+@pytest.mark.parametrize("btc_delta, energy_delta, vega, horizon", [
+    (0.1, 0.05, 500, 1),
+    (0.4, 0.2, 3500, 30),
+    (0.8, 0.5, 15000, 180),
+    (-2.0, 3.0, -800, 14),
+])
+def test_hits_targets_and_reprices_consistently(btc_delta, energy_delta, vega, horizon):
+    params = {"exposure": 10, "btc_delta": btc_delta, "energy_delta": energy_delta,
+              "vega": vega, "time_horizon": horizon}
+    result = construct_portfolio(params, MARKET_CONDITIONS, today=TODAY)
+
+    assert result["within_tolerance"]
+    assert 1 <= len(result["positions"]) <= 5
+    greeks = portfolio_greeks(result["positions"], MARKET_CONDITIONS, today=TODAY)
+    assert greeks["btc_delta"] == pytest.approx(btc_delta, abs=0.01)
+    assert greeks["energy_delta"] == pytest.approx(energy_delta, abs=0.01)
+    assert greeks["vega"] == pytest.approx(vega, abs=1.0)
+    assert all(p["Expiry Date"] > TODAY.isoformat() for p in result["positions"])
+
+
+def test_is_deterministic_and_fast():
+    params = {"exposure": 5, "btc_delta": 0.2, "energy_delta": 0.1, "vega": 1200, "time_horizon": 7}
+    start = time.perf_counter()
+    first = construct_portfolio(params, MARKET_CONDITIONS, today=TODAY)
+    elapsed = time.perf_counter() - start
+
+    assert construct_portfolio(params, MARKET_CONDITIONS, today=TODAY) == first
+    assert elapsed < 0.1
+
+
+def test_ai_analysis_route_local_engine():
+    from server import app
+
+    response = app.test_client().post('/ai_analysis', json={
+        "engine": "local", "exposure": 5, "btc_delta": 0.2, "energy_delta": 0.1,
+        "vega": 1200, "time_horizon": 7})
+
+    assert response.status_code == 200
+    assert response.get_json()["engine"] == "local"
@@ -0,0 +1,53 @@
+import io
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.price_history import (PriceHistoryFollower, iter_price_points, load_price_history, parse_timestamp,
+                               synthetic_history)
+
+
+def test_iter_price_points_matches_json_load():
+    points = synthetic_history(50)
+    text = json.dumps(points, indent=2)
+    assert list(iter_price_points(io.StringIO(text), chunk_size=7)) == points
+    assert list(iter_price_points(io.StringIO("[]"))) == []
+
+
+def test_timestamps_are_converted_to_utc():
+    noon_utc = datetime(2024, 1, 1, 12)
+    assert parse_timestamp("2024-01-01T12:00:00Z") == noon_utc
+    assert parse_timestamp("2024-01-01T12:00:00") == noon_utc
+    assert parse_timestamp("2024-01-01T14:00:00+02:00") == noon_utc
+    assert parse_timestamp("2024-01-01T12:00:00+02:00") == datetime(2024, 1, 1, 10)
+    assert parse_timestamp(noon_utc.replace(tzinfo=timezone.utc).timestamp()) == noon_utc
+
+    history = load_price_history([{"timestamp": "2024-01-01T12:30:00+02:00", "hash_price": 1.0,
+                                   "token_price": 1.0, "energy_price": 1.0},
+                                  {"timestamp": "2024-01-01T11:00:00Z", "hash_price": 2.0,
+                                   "token_price": 2.0, "energy_price": 2.0}])
+    # 10:30 UTC comes before 11:00 UTC
+    assert history["hash_price"].tolist() == [1.0, 2.0]
+
+
+def test_follower_reads_only_new_points(tmp_path):
+    path = tmp_path / "prices.json"
+    points = synthetic_history(300)
+    follower = PriceHistoryFollower(str(path))
+    assert follower.poll() is None
+
+    path.write_text(json.dumps(points[100:], indent=2))
+    first = follower.poll()
+    assert first["timestamp"].size == 200
+    assert follower.poll() is None
+
+    # Everything after the new points is never decoded, even if it is not valid JSON
+    text = json.dumps(points[:103], indent=2)
+    path.write_text(text[:-1] + ", {broken")
+    new = follower.poll()
+    full = load_price_history(points)
+    assert new["timestamp"].size == 100
+    np.testing.assert_array_equal(new["timestamp"], full["timestamp"][200:])
+    np.testing.assert_array_equal(new["energy_price"], full["energy_price"][200:])
+    assert follower.last_timestamp == full["timestamp"][-1]
@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+
+from app.pricing import CALL, FUTURE, PUT, black76, instrument_code, norm_cdf
+
+
+def test_norm_cdf_matches_erfc():
+    x = np.linspace(-12, 12, 2001)
+    expected = np.array([0.5 * math.erfc(-v / math.sqrt(2)) for v in x])
+    assert np.max(np.abs(norm_cdf(x) - expected)) < 1e-14
+
+
+def test_put_call_parity_across_chain():
+    strikes = np.linspace(40_000, 100_000, 61)
+    call = black76(68_730, strikes, 0.25, 0.65, 0.05, CALL)
+    put = black76(68_730, strikes, 0.25, 0.65, 0.05, PUT)
+    df = math.exp(-0.05 * 0.25)
+    np.testing.assert_allclose(call["price"] - put["price"], df * (68_730 - strikes), atol=1e-8)
+    np.testing.assert_allclose(call["delta"] - put["delta"], df, atol=1e-12)
+
+
+def test_greeks_match_finite_differences():
+    F, K, T, vol, r = 55.0, 60.0, 0.5, 0.40, 0.03
+    base = black76(F, K, T, vol, r, PUT)
+    h = 1e-3
+    up, down = black76(F + h, K, T, vol, r, PUT), black76(F - h, K, T, vol, r, PUT)
+
+    assert abs(base["delta"] - (up["price"] - down["price"]) / (2 * h)) < 1e-6
+    assert abs(base["gamma"] - (up["delta"] - down["delta"]) / (2 * h)) < 1e-6
+    vol_up = black76(F, K, T, vol + 0.01, r, PUT)["price"]
+    assert abs(base["vega"] - (vol_up - base["price"])) < 1e-3
+    day_later = black76(F, K, T - 1 / 365, vol, r, PUT)["price"]
+    assert abs(base["theta"] - (day_later - base["price"])) < 1e-3
+
+
+def test_futures_and_expired_options():
+    result = black76([70_000, 70_000, 70_000], 65_000, [0.5, 0.0, 0.0], 0.65,
+                     instrument=[FUTURE, CALL, PUT])
+    np.testing.assert_allclose(result["price"], [5_000, 5_000, 0])
+    np.testing.assert_allclose(result["delta"], [1, 1, 0])
+    np.testing.assert_allclose(result["vega"], [0, 0, 0])
+
+
+def test_instrument_code_accepts_ai_schema_names():
+    assert [instrument_code(n) for n in ("Call Option", "Put Option", "Future")] == [CALL, PUT, FUTURE]
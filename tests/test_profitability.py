@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pytest
+
+import app.profitability as profitability
+from app.hedge_ratios import load_inventory
+from app.price_history import load_price_history, synthetic_history
+from app.profitability import ProfitabilityTables
+from battery.battery_system import BatterySystem
+from server import app
+
+
+def test_tables_match_per_tick_recomputation():
+    history = load_price_history(synthetic_history(500))
+    tables = ProfitabilityTables(capacity=16)
+    assert tables.fit(history) == 500
+
+    inventory = load_inventory()
+    table = tables.table()
+    hydro = table["items"].index("hydro")
+    spec = inventory["miners"]["hydro"]
+    revenue = spec["hashrate"] * history["hash_price"]
+    assert np.allclose(table["revenue_per_watt"][:, hydro], revenue / spec["power"])
+    assert np.allclose(table["margin"][:, hydro], revenue - spec["power"] * history["energy_price"])
+
+    asic = inventory["inference"]["asic"]
+    assert tables.breakeven_energy_price("asic") == pytest.approx(
+        asic["tokens"] * history["token_price"][-1] / asic["power"])
+    assert tables.breakeven_energy_price("asic", {"token_price": 2.0}) == pytest.approx(
+        2.0 * asic["tokens"] / asic["power"])
+
+
+def test_incremental_updates_equal_one_pass():
+    history = load_price_history(synthetic_history(300))
+    batch = ProfitabilityTables()
+    batch.fit(history)
+
+    incremental = ProfitabilityTables(capacity=4)
+    first = {k: v[:100] for k, v in history.items()}
+    incremental.fit(first)
+    assert incremental.fit(first) == 0
+    for i in range(100, 300):
+        incremental.update({f: history[f][i] for f in incremental.fields}, history["timestamp"][i])
+
+    for key in ("revenue_per_watt", "margin"):
+        assert np.allclose(incremental.table()[key], batch.table()[key])
+    assert incremental.table(last=10)["margin"].shape == (10, 5)
+    for item, row in batch.summary().items():
+        assert incremental.summary()[item] == pytest.approx(row)
+    assert incremental.breakevens() == pytest.approx(batch.breakevens())
+
+
+def test_repeated_quotes_are_recorded_once():
+    tables = ProfitabilityTables()
+    quote = {"timestamp": "2025-06-21T21:00:00Z", "hash_price": 2.5, "token_price": 3.0, "energy_price": 0.65}
+    assert tables.update(quote, quote["timestamp"]) == 1
+    # The daemon polls every minute; the monitor fetches a new quote every five
+    assert tables.update(quote, quote["timestamp"]) == 0
+    assert tables.update(quote, np.datetime64("2025-06-21T20:55:00")) == 0
+    assert tables.update(dict(quote, energy_price=0.7), "2025-06-21T21:05:00") == 1
+    assert len(tables) == 2 and tables.last_timestamp == np.datetime64("2025-06-21T21:05:00")
+
+
+def test_fleet_breakeven_and_battery_discharge():
+    tables = ProfitabilityTables()
+    prices = {"hash_price": 2.5, "token_price": 3.0}
+    # One of each item: (16000 * 2.5 + 6000 * 3.0) / 31666 W
+    assert tables.fleet_breakeven(prices=prices) == pytest.approx(58_000 / 31_666)
+    assert tables.fleet_breakeven(counts={"hydro": 1}, prices=prices) == pytest.approx(5.0)
+
+    battery = BatterySystem(initial_charge=50.0)
+    assert battery.make_decision(1.9, **prices)["action"] == "hold"
+    battery.profitability = tables
+    assert battery.make_decision(1.9, **prices)["action"] == "discharge"
+
+
+def test_profitability_route(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(path))
+    profitability.reset_tables()
+    client = app.test_client()
+    assert client.get("/profitability").status_code == 404
+
+    path.write_text(json.dumps(synthetic_history(50)))
+    data = client.get("/profitability").get_json()
+    assert data["ticks"] == 50
+    assert set(data["breakevens"]) == {"air", "hydro", "immersion", "gpu", "asic"}
+    assert 0 <= data["items"]["air"]["profitable_share"] <= 1
+    profitability.reset_tables()
@@ -0,0 +1,99 @@
+import threading
+
+import requests
+
+import app.quotes as quotes
+from app.ai_analysis import get_market_conditions
+from app.api import get_current_btc_price
+from app.quotes import QuoteService, reference_quotes
+from server import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_service(clock, calls):
+    def btc():
+        calls.append("btc")
+        return {"btc_price": {"price": 70_000.0 + len(calls), "source": "test"}}
+
+    def hashes():
+        calls.append("hash")
+        if len(calls) > 2:
+            raise requests.exceptions.ConnectionError("upstream down")
+        return {"hash_price": {"price": 2.5, "source": "test"}}
+
+    return QuoteService(sources=(btc, hashes), ttl_seconds=10, stale_seconds=0, clock=clock)
+
+
+def test_snapshot_is_shared_until_it_expires():
+    clock, calls = Clock(), []
+    service = make_service(clock, calls)
+    first = service.get_quotes()
+    assert service.get_quotes(("btc_price", "hash_price"))["timestamp"] == first["timestamp"]
+    assert service.prices(("btc_price",)) == {"btc_price": 70_001.0}
+    assert calls == ["btc", "hash"]
+    assert first["quotes"]["token_price"] is None
+
+    clock.now = 11
+    assert service.prices(("btc_price",)) == {"btc_price": 70_003.0}
+    assert calls == ["btc", "hash", "btc", "hash"]
+
+
+def test_failed_source_keeps_previous_quotes_marked_stale():
+    clock, calls = Clock(), []
+    service = make_service(clock, calls)
+    service.get_quotes()
+    clock.now = 11
+    snapshot = service.snapshot()
+    assert snapshot["quotes"]["hash_price"] == {"price": 2.5, "source": "test", "stale": True}
+    assert snapshot["errors"] and "upstream down" in snapshot["errors"][0]
+
+
+def test_reference_prices_can_be_overridden(monkeypatch):
+    monkeypatch.setenv("BTC_PRICE", "99000.5")
+    assert reference_quotes()["btc_price"]["price"] == 99000.5
+    assert reference_quotes()["energy_price"]["price"] == 55.0
+
+
+def test_routes_and_prompt_share_one_snapshot(monkeypatch):
+    clock, calls = Clock(), []
+    monkeypatch.setattr(quotes, "_service", make_service(clock, calls))
+    client = app.test_client()
+
+    data = client.get("/quotes?symbols=btc_price,hash_price").get_json()
+    assert set(data["quotes"]) == {"btc_price", "hash_price"}
+    assert get_current_btc_price() == "$70,001.00"
+    assert get_market_conditions()["btc_price"] == data["quotes"]["btc_price"]["price"]
+    assert b"$70,001.00" in client.get("/").data
+    assert calls == ["btc", "hash"]
+    assert client.get("/quotes/stats").get_json()["hits"] >= 3
+
+
+def test_cold_service_answers_from_initial_sources_without_waiting():
+    release = threading.Event()
+
+    def slow_upstream():
+        release.wait(5)
+        return {"hash_price": {"price": 2.5, "source": "test"}}
+
+    service = QuoteService(sources=(reference_quotes, slow_upstream), initial_sources=(reference_quotes,))
+    first = service.get_quotes(("btc_price", "hash_price"))
+    assert first["quotes"]["btc_price"]["source"] == "reference"
+    assert first["quotes"]["hash_price"] is None
+
+    release.set()
+    service._priming.join(5)
+    assert service.prices(("btc_price", "hash_price")) == {"btc_price": 68730.0, "hash_price": 2.5}
+
+
+def test_market_conditions_fall_back_to_reference_prices(monkeypatch):
+    monkeypatch.setenv("BTC_PRICE", "abc")
+    monkeypatch.setattr(quotes, "_service", QuoteService(sources=(reference_quotes,)))
+    market = get_market_conditions()
+    assert market["btc_price"] == 68730.0 and market["energy_price"] == 55.0
@@ -0,0 +1,81 @@
+import time
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.pricing import CALL, FUTURE, PUT, black76
+from app.risk_book import PositionBook, random_book
+
+TODAY = date(2025, 6, 21)
+MARKET = {"BTC": {"forward": 68_730.0, "vol": 0.65}, "Energy": {"forward": 55.0, "vol": 0.40}}
+
+
+def full_revaluation(book):
+    """Reference: revalue every live position from scratch."""
+    p = book.positions()
+    forward = np.array([book.market[a]["forward"] for a in p["asset"]])
+    vol = np.array([book.market[a]["vol"] for a in p["asset"]])
+    years = np.array([(e - book.valuation_date).days / 365.0 for e in p["expiry"]])
+    is_future = p["instrument"] == FUTURE
+    strike = np.where(is_future, p["entry_price"], p["strike"])
+    g = black76(forward, strike, years, vol, 0.0, p["instrument"])
+    q = p["quantity"]
+    pnl = q * (g["price"] - np.where(is_future, 0.0, p["entry_price"]))
+    return {"value": (q * g["price"]).sum(), "pnl": pnl.sum(), "delta": (q * g["delta"]).sum(),
+            "gamma": (q * g["gamma"]).sum(), "vega": (q * g["vega"]).sum(), "theta": (q * g["theta"]).sum()}
+
+
+def assert_totals_match(book):
+    expected = full_revaluation(book)
+    totals = book.totals()
+    for field, value in expected.items():
+        assert totals[field] == pytest.approx(value, rel=1e-9, abs=1e-6)
+
+
+def test_incremental_edits_match_full_revaluation():
+    book = random_book(2_000, MARKET, TODAY, seed=3)
+    assert_totals_match(book)
+
+    pid = book.add_position("BTC", CALL, 75_000, "2025-09-26", 12)
+    book.update_quantity(pid, -4)
+    book.remove_position(int(book.positions()["id"][0]))
+    book.add_position("Energy", FUTURE, 0, "2025-12-31", 100, entry_price=50.0)
+    assert_totals_match(book)
+
+    book.update_market("BTC", forward=70_000, vol=0.7)
+    book.update_market("Energy", forward=52.0)
+    assert_totals_match(book)
+
+
+def test_subtotals_add_up_to_totals():
+    book = random_book(1_000, MARKET, TODAY, seed=4)
+    book.update_market("BTC", forward=66_000)
+    subtotals = book.subtotals()
+
+    for field in ("delta", "vega", "pnl"):
+        per_asset = sum(s[field] for s in subtotals.values())
+        assert per_asset == pytest.approx(book.totals()[field])
+        for asset, s in subtotals.items():
+            per_expiry = sum(e[field] for e in s["expiries"].values())
+            assert per_expiry == pytest.approx(s[field])
+
+
+def test_pnl_tracks_entry_prices():
+    book = PositionBook(MARKET, TODAY)
+    book.add_position("BTC", FUTURE, 0, "2025-09-26", 2)
+    book.add_position("BTC", PUT, 60_000, "2025-09-26", 1)
+    assert book.totals()["pnl"] == pytest.approx(0.0)
+
+    book.update_market("BTC", forward=69_730.0)
+    put_change = (black76(69_730, 60_000, 97 / 365, 0.65, 0.0, PUT)["price"]
+                  - black76(68_730, 60_000, 97 / 365, 0.65, 0.0, PUT)["price"])
+    assert book.totals()["pnl"] == pytest.approx(2 * 1_000 + float(put_change))
+
+
+def test_large_book_refreshes_quickly_on_one_input():
+    book = random_book(100_000, MARKET, TODAY, seed=5)
+    start = time.perf_counter()
+    book.update_market("BTC", forward=69_500.0)
+    assert time.perf_counter() - start < 0.5
+    assert len(book) == 100_000
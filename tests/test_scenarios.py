@@ -0,0 +1,69 @@
+from datetime import date
+
+import numpy as np
+
+from app.hedging import get_hedging_suggestions, get_stress_report
+from app.risk_book import random_book
+from app.scenarios import revalue_grid
+from server import app
+
+TODAY = date(2025, 6, 21)
+MARKET = {"BTC": {"forward": 68_730.0, "vol": 0.65}, "Energy": {"forward": 55.0, "vol": 0.40}}
+SHOCKS = {"BTC": np.array([-0.3, 0.0, 0.2]), "Energy": np.array([-0.1, 0.0, 0.1, 0.4])}
+VOL_SHOCKS = np.array([-0.1, 0.0, 0.05])
+
+
+def test_grid_matches_full_revaluation_of_each_cell():
+    book = random_book(300, MARKET, TODAY, seed=1)
+    grid = revalue_grid(book, SHOCKS, VOL_SHOCKS, workers=1)
+    assert grid["pnl"].shape == (3, 4, 3)
+    base = book.totals()["value"]
+
+    # Unshocked cell is flat
+    assert abs(grid["pnl"][1, 1, 1]) < 1e-6 * max(abs(base), 1.0)
+
+    for i, j, k in [(0, 3, 0), (2, 0, 2), (1, 2, 1)]:
+        shocked = random_book(300, MARKET, TODAY, seed=1)
+        shocked.update_market("BTC", MARKET["BTC"]["forward"] * (1 + SHOCKS["BTC"][i]),
+                              MARKET["BTC"]["vol"] + VOL_SHOCKS[k])
+        shocked.update_market("Energy", MARKET["Energy"]["forward"] * (1 + SHOCKS["Energy"][j]),
+                              MARKET["Energy"]["vol"] + VOL_SHOCKS[k])
+        expected = shocked.totals()["value"] - base
+        assert np.isclose(grid["pnl"][i, j, k], expected, rtol=1e-9, atol=1e-6)
+
+
+def test_worst_cells_are_sorted_minimum_cells():
+    book = random_book(200, MARKET, TODAY, seed=2)
+    grid = revalue_grid(book, SHOCKS, VOL_SHOCKS, workers=1, worst_count=4)
+    worst = [cell["pnl"] for cell in grid["worst"]]
+    assert worst == sorted(worst)
+    assert np.isclose(worst[0], grid["pnl"].min())
+    assert set(grid["worst"][0]) == {"BTC_shock", "Energy_shock", "vol_shock", "pnl"}
+
+
+def test_process_pool_matches_serial(monkeypatch):
+    import app.scenarios as scenarios
+    monkeypatch.setattr(scenarios, "CHUNK_ELEMENTS", 600)  # several chunks per asset
+    book = random_book(400, MARKET, TODAY, seed=3)
+    serial = revalue_grid(book, SHOCKS, VOL_SHOCKS, workers=1)
+    pooled = revalue_grid(book, SHOCKS, VOL_SHOCKS, workers=2)
+    assert np.allclose(serial["pnl"], pooled["pnl"])
+
+
+def test_stress_report_and_hedging_route():
+    market = {"btc_price": 68_730.0, "energy_price": 55.0, "btc_implied_vol": 0.65, "energy_implied_vol": 0.40}
+    positions = [{"Asset": "BTC", "Type": "Future", "Action": "Buy", "Quantity": 2,
+                  "Strike Price": 68_730.0, "Expiry Date": "2025-09-30"}]
+    report = get_stress_report(positions, market, TODAY)
+    assert report["greeks"]["delta"] == 2.0
+    assert np.isclose(report["moves"]["BTC"]["down"], -0.5 * 68_730.0 * 2)
+    assert report["worst"][0]["BTC_shock"] == -0.5
+    assert any(line.startswith("Sell 2.00 BTC") for line in report["suggestions"])
+
+    client = app.test_client()
+    assert client.get("/hedging").get_json() == get_hedging_suggestions()
+    response = client.post("/hedging", json={"positions": positions})
+    assert response.status_code == 200
+    assert response.get_json()["greeks"]["delta"] == 2.0
+    assert client.post("/hedging", json={}).status_code == 400
+    assert client.post("/hedging", json={"positions": [{"Asset": "BTC"}]}).status_code == 400
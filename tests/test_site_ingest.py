@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import app.site_ingest as site_ingest
+from app.cache import DiskCache
+from app.site_ingest import SITES, SiteIngester, load_sites, process_site_data
+from app.site_store import SiteStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IRRADIANCE = {f"202401{day:02d}": 4.0 + day / 10 for day in range(1, 32)}
+IRRADIANCE["20240115"] = -999.0
+
+
+class StandIn:
+    """Local stand-in for the NASA POWER and Open-Meteo APIs."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fail = {}  # path -> number of 503s to send before succeeding
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def respond(self, path, query):
+        lat, lon = float(query["latitude"][0]), float(query["longitude"][0])
+        if path == "/api/temporal/daily/point":
+            return {"properties": {"parameter": {"ALLSKY_SFC_SW_DWN": IRRADIANCE}}}
+        return {"latitude": lat, "longitude": lon,
+                "current": {"temperature_2m": 20.0 + lat / 10},
+                "hourly": {"time": ["2025-06-21T00:00"], "temperature_2m": [lat]}}
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    state = StandIn()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            with state.lock:
+                state.requests.append(self.path)
+                state.active += 1
+                state.max_active = max(state.max_active, state.active)
+                failing = state.fail.get(url.path, 0)
+                if failing:
+                    state.fail[url.path] = failing - 1
+            try:
+                time.sleep(state.delay)
+                if failing:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps(state.respond(url.path, parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                with state.lock:
+                    state.active -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(site_ingest, "NASA_POWER_URL", base)
+    monkeypatch.setattr(site_ingest, "OPEN_METEO_URL", base)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def ingester(tmp_path):
+    store = SiteStore(str(tmp_path / "sites.db"))
+    yield SiteIngester(store=store, cache_dir=str(tmp_path / "cache"), backoff=0.01, rng=random.Random(1))
+    store.close()
+
+
+def test_process_site_data_matches_php():
+    site = SITES[0]
+    weather = {"current": {"temperature_2m": 20.0}}
+    record = process_site_data({"properties": {"parameter": {"ALLSKY_SFC_SW_DWN": IRRADIANCE}}},
+                               weather, site, random.Random(0))
+    total = sum(v * 0.277778 * 1000 * 0.20 for v in IRRADIANCE.values() if v >= 0)
+    assert record["total_kwh"] == pytest.approx(total)
+    assert record["avg_daily_kwh"] == pytest.approx(total / 31)
+    assert record["annual_kwh_yr"] == pytest.approx(total / 31 * 365)
+    assert record["energy_type"] == site["type"] and record["weather"] is weather
+    assert 1 <= record["performance_score"] <= 10
+    assert record["recommendation"] == "Moderate solar potential. Consider for smaller scale or supplementary power."
+    assert set(record) == set(json.load(open(os.path.join(ROOT, "saved_data.json")))["sites"][0])
+    assert process_site_data({"error": "bad"}, weather, site) is None
+
+
+def test_ingest_all_sites_with_bounded_concurrency(stand_in, ingester):
+    stand_in.delay = 0.05
+    ingester.concurrency = 4
+    result = asyncio.run(ingester.ingest())
+
+    assert result["updated"] == [s["name"] for s in SITES] and not result["failed"]
+    assert len(ingester.store) == len(SITES)
+    assert stand_in.max_active <= 4
+    # Wolf Hollow and Granbury share coordinates: one request per API for both
+    assert len(stand_in.requests) == 2 * (len(SITES) - 1)
+    # Weather is requested at the center of the site's grid cell
+    assert ingester.store.get("Findlay, OH")["weather"]["hourly"]["temperature_2m"] == [41.05]
+    # ...and stored once for the sites in that cell
+    shared = ingester.store.weather("0.1:323,-978")
+    assert shared["latitude"] == 32.35
+    for name in ("Wolf Hollow, TX", "Granbury, TX"):
+        assert ingester.store.get(name)["weather"] == shared
+
+
+def test_only_stale_sites_are_refreshed(stand_in, ingester):
+    asyncio.run(ingester.ingest(SITES[:3]))
+    stand_in.requests.clear()
+
+    result = asyncio.run(ingester.ingest(SITES[:4]))
+    assert result["skipped"] == [s["name"] for s in SITES[:3]]
+    assert result["updated"] == [SITES[3]["name"]]
+    assert len(stand_in.requests) == 2
+
+    # Forced refresh reuses cached responses for the same (lat, lon, date range)
+    stand_in.requests.clear()
+    result = asyncio.run(ingester.ingest(SITES[:3], force=True))
+    assert len(result["updated"]) == 3 and stand_in.requests == []
+
+
+def test_retries_then_failure_keeps_stored_site(stand_in, ingester):
+    stand_in.fail["/api/temporal/daily/point"] = 2
+    result = asyncio.run(ingester.ingest(SITES[:1]))
+    assert result["updated"] == [SITES[0]["name"]]
+    assert ingester.stats["retries"] == 2
+
+    before = ingester.store.get(SITES[0]["name"])
+    ingester.solar_cache = DiskCache(ingester.solar_cache.directory + "2", float("inf"))
+    stand_in.fail["/api/temporal/daily/point"] = 100
+    result = asyncio.run(ingester.ingest(SITES[:1], force=True))
+    assert result["failed"] == [SITES[0]["name"]] and "503" in result["errors"][SITES[0]["name"]]
+    assert ingester.store.get(SITES[0]["name"]) == before
+
+
+def test_sites_come_from_the_file_shared_with_php():
+    assert load_sites(os.path.join(ROOT, "sites.json")) == SITES
+    assert len(SITES) == 18 and "$sitesFile" in open(os.path.join(ROOT, "api.php")).read()
+
+
+def test_deadline_abandons_slow_sites(stand_in, ingester):
+    asyncio.run(ingester.ingest(SITES[:1]))
+    stand_in.delay = 1.0
+    start = time.perf_counter()
+    result = asyncio.run(ingester.ingest(SITES[:3], force=True, deadline=0.2))
+    assert time.perf_counter() - start < 0.8
+    # Cached responses finish in time; sites waiting on the network do not
+    assert result["updated"] == [SITES[0]["name"]]
+    assert result["failed"] == [s["name"] for s in SITES[1:3]]
+    assert "Timed out" in result["errors"][SITES[1]["name"]]
@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+
+import app.site_scoring as site_scoring
+import app.site_store as site_store
+from app.site_scoring import ScoringEngine, score_features, score_site, site_features, synthetic_sites
+from app.site_store import SiteStore
+from server import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "saved_data.json")) as f:
+    SITES = json.load(f)["sites"]
+
+
+def full_ranking(engine):
+    return sorted(range(len(engine)), key=lambda i: (-engine.scores[i], i))
+
+
+def test_scores_are_deterministic_and_vectorized():
+    features = np.array([site_features(s) for s in SITES])
+    scores = score_features(features)
+    assert np.array_equal(scores, score_features(features))
+    assert all(round(float(s), 1) == score_site(site) for s, site in zip(scores, SITES))
+    assert ((scores >= 1) & (scores <= 10)).all()
+    # More energy never scores lower, everything else equal
+    site = dict(SITES[0], avg_daily_kwh=SITES[0]["avg_daily_kwh"] * 2)
+    assert score_site(site) >= score_site(SITES[0])
+    assert score_site({"name": "Empty"}) == 1.0
+
+
+def test_incremental_updates_match_full_ranking():
+    sites = synthetic_sites(500)
+    engine = ScoringEngine(sites)
+    assert engine.top() == full_ranking(engine)
+
+    rng = np.random.default_rng(3)
+    for i in rng.integers(0, 500, 200):
+        engine.update(dict(sites[i], avg_daily_kwh=float(rng.uniform(0, 20000))))
+        assert engine.top(10) == full_ranking(engine)[:10]
+    engine.update({"name": "New", "avg_daily_kwh": 1e9, "hardware": {"gpu_total": 10, "gpu_used": 0,
+                                                                     "battery_capacity_mwh": 20}})
+    assert engine.top() == full_ranking(engine)
+    assert engine.best()["name"] == "New" and engine.rank_of("New") == 1
+
+
+def test_ranked_results_refer_to_sites():
+    engine = ScoringEngine(SITES)
+    best = engine.ranked_sites(3)
+    assert all(any(site is s for s in SITES) for site in best)
+    assert [row["name"] for row in engine.ranking(3)] == [site["name"] for site in best]
+
+
+def test_sync_rescores_changed_sites(tmp_path, monkeypatch):
+    store = SiteStore(str(tmp_path / "sites.db"))
+    store.import_document({"sites": SITES})
+    engine = ScoringEngine().sync(store)
+    assert len(engine) == len(SITES)
+
+    worst = engine.ranking()[-1]["name"]
+    store.update(worst, {"avg_daily_kwh": 1e9})
+    engine.sync(store)
+    assert engine.ranking(1)[0]["name"] == worst
+
+    # One site removed and another added: same count, different sites
+    store.delete(worst)
+    store.put({"name": "Replacement", "lat": 1.0, "lon": 2.0, "avg_daily_kwh": 10.0})
+    engine.sync(store)
+    assert len(engine) == len(SITES) and worst not in engine.names
+    assert engine.best()["name"] != worst and engine.rank_of("Replacement") == len(SITES)
+    store.update("Replacement", {"avg_daily_kwh": 1e9})
+    worst = "Replacement"
+    assert engine.sync(store).best()["name"] == worst
+
+    monkeypatch.setattr(site_store, "_store", store)
+    monkeypatch.setattr(site_scoring, "_engine", None)
+    client = app.test_client()
+    assert client.get("/sites/ranking?k=2").get_json()[0]["name"] == worst
+    assert client.get("/sites/ranking?k=0").status_code == 400
+    store.close()
@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+import app.site_store as site_store
+from app.site_scoring import ScoringEngine
+from app.site_store import SiteStore
+from server import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "saved_data.json")) as f:
+    SAVED = json.load(f)
+# bestSite is the top of the scoring ranking, not api.php's highest avg_daily_kwh
+EXPORTED = dict(SAVED, bestSite=ScoringEngine(SAVED["sites"]).best())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SiteStore(str(tmp_path / "sites.db"))
+    store.import_document(SAVED)
+    yield store
+    store.close()
+
+
+def test_export_round_trips_saved_data(store):
+    assert len(store) == 18
+    assert store.export() == EXPORTED
+    assert EXPORTED["bestSite"]["name"] == "McCamey, TX"
+    assert store.names()[0] == SAVED["sites"][0]["name"]
+
+
+def test_lookup_by_name(store):
+    assert store.get("Paraguay Hydro") == next(s for s in SAVED["sites"] if s["name"] == "Paraguay Hydro")
+    assert store.get("Atlantis") is None
+
+
+def test_partial_update_rewrites_only_that_site(store):
+    before = {name: store.updated_at(name) for name in store.names()}
+    site = store.update("Kearney, NE", {"performance_score": 3.5, "avg_daily_kwh": 10**9})
+    assert site["performance_score"] == 3.5
+    assert site["weather"] == store.get("Kearney, NE")["weather"]
+
+    changed = [name for name in store.names() if store.updated_at(name) != before[name]]
+    assert changed == ["Kearney, NE"]
+    assert store.best_site()["name"] == "Kearney, NE"
+    assert store.update("Atlantis", {"x": 1}) is None
+
+
+def test_new_sites_append_and_export_to_file(store, tmp_path):
+    store.put({"name": "New Site", "lat": 1.0, "lon": 2.0, "avg_daily_kwh": 0})
+    assert store.names()[-1] == "New Site"
+    assert store.delete("New Site") and not store.delete("New Site")
+
+    path = tmp_path / "saved_data.json"
+    store.export_to_file(str(path))
+    assert json.loads(path.read_text()) == EXPORTED
+
+
+def test_weather_is_stored_once_per_cell(store):
+    weather = {"current": {"temperature_2m": 12.0}}
+    for name in ("North", "South"):
+        store.put({"name": name, "lat": 40.0, "lon": -100.0, "weather": weather}, weather_cell="0.1:400,-1000")
+    with sqlite3.connect(store.path) as db:
+        rows = db.execute("SELECT data FROM sites WHERE weather_cell IS NOT NULL").fetchall()
+        assert len(rows) == 2 and all("weather" not in json.loads(data) for data, in rows)
+        assert db.execute("SELECT COUNT(*) FROM weather").fetchone()[0] == 1
+    north, south = store.all()[-2:]
+    assert north["weather"] == weather and north["weather"] is south["weather"]
+
+    since = time.time()
+    colder = {"current": {"temperature_2m": -5.0}}
+    assert store.update("North", {"weather": colder})["weather"] == colder
+    assert store.get("South")["weather"] == colder
+    assert [site["name"] for site in store.changed_since(since)] == ["North", "South"]
+    # Imported sites keep their own weather
+    assert store.get("Kearney, NE")["weather"] == next(
+        s for s in SAVED["sites"] if s["name"] == "Kearney, NE")["weather"]
+
+
+def test_site_routes(tmp_path, monkeypatch):
+    monkeypatch.setenv("SITE_STORE_PATH", str(tmp_path / "sites.db"))
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(site_store, "_store", None)
+    client = app.test_client()
+    assert client.get("/sites").get_json()["bestSite"] == EXPORTED["bestSite"]
+    assert client.get("/sites/Garden City, TX").get_json()["lat"] == 31.864
+    assert client.get("/sites/Atlantis").status_code == 404
+    site_store._store.close()
+    monkeypatch.setattr(site_store, "_store", None)
@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+
+import app.site_store as site_store
+import app.spatial_index as spatial_index
+from app.site_store import SiteStore
+from app.spatial_index import SiteIndex, grid_cell, group_by_cell, haversine_km, synthetic_sites
+from server import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(os.path.join(ROOT, "saved_data.json")) as f:
+    SITES = json.load(f)["sites"]
+
+
+def brute_force(sites, lat, lon):
+    distances = haversine_km(lat, lon, [s["lat"] for s in sites], [s["lon"] for s in sites])
+    order = np.lexsort((np.arange(len(sites)), distances))
+    return [sites[i]["name"] for i in order], distances[order]
+
+
+def test_nearest_and_radius_match_brute_force():
+    sites = synthetic_sites(3000)
+    index = SiteIndex(sites, leaf_size=8)
+    rng = np.random.default_rng(2)
+    for lat, lon in zip(rng.uniform(-90, 90, 50), rng.uniform(-180, 180, 50)):
+        names, distances = brute_force(sites, lat, lon)
+        nearest = index.nearest(lat, lon, 5)
+        assert [r["name"] for r in nearest] == names[:5]
+        assert np.allclose([r["distance_km"] for r in nearest], distances[:5])
+
+        within = index.within(lat, lon, 500)
+        assert [r["name"] for r in within] == names[:int((distances <= 500).sum())]
+
+
+def test_queries_across_the_antimeridian():
+    sites = [{"name": "West", "lat": 0.0, "lon": 179.9}, {"name": "East", "lat": 0.0, "lon": -179.9},
+             {"name": "Far", "lat": 0.0, "lon": 170.0}]
+    index = SiteIndex(sites)
+    assert [r["name"] for r in index.nearest(0.0, -179.95, 2)] == ["East", "West"]
+    assert [r["name"] for r in index.within(0.0, 180.0, 20)] == ["West", "East"]
+    assert SiteIndex([]).nearest(0, 0) == []
+
+
+def test_sites_sharing_a_weather_cell_are_grouped():
+    groups = SiteIndex(SITES).weather_cells()
+    assert sum(len(names) for names in groups.values()) == len(SITES)
+    assert groups[grid_cell(32.3357, -97.7335)] == ["Wolf Hollow, TX", "Granbury, TX"]
+    assert len(group_by_cell(SITES, degrees=1.0)) < len(groups)
+
+
+def test_site_routes(tmp_path, monkeypatch):
+    store = SiteStore(str(tmp_path / "sites.db"))
+    store.import_document({"sites": SITES})
+    monkeypatch.setattr(site_store, "_store", store)
+    spatial_index.reset_index()
+    client = app.test_client()
+
+    assert client.get("/sites/nearest?lat=41.0&lon=-83.6").get_json()[0]["name"] == "Findlay, OH"
+    near_ohio = client.get("/sites/nearest?lat=40.5&lon=-81&radius_km=50").get_json()
+    assert [r["name"] for r in near_ohio] == ["Hannibal, OH", "Hopedale, OH"]
+    assert client.get("/sites/nearest?lat=100&lon=0").status_code == 400
+    cells = client.get("/sites/weather_cells").get_json()
+    assert ["Wolf Hollow, TX", "Granbury, TX"] in [c["sites"] for c in cells]
+
+    store.put({"name": "New Site", "lat": 41.01, "lon": -83.61})
+    assert client.get("/sites/nearest?lat=41.0&lon=-83.6").get_json()[0]["name"] == "New Site"
+    spatial_index.reset_index()
+    store.close()
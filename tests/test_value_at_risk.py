@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.price_history import PRICE_FIELDS, load_price_history, log_returns, synthetic_history
+from app.value_at_risk import calibrate, portfolio_var, risk_measures, simulate_pnl
+from server import app
+
+HISTORY = load_price_history(synthetic_history(3_000, seed=4))
+EXPOSURES = {"hash_price": 1000.0, "energy_price": -3333.0}
+
+
+def test_history_is_chronological_and_deduplicated():
+    points = synthetic_history(10)
+    history = load_price_history(points + points[:3] + [{"timestamp": "bad"}])
+    assert history["timestamp"].size == 10
+    assert np.all(np.diff(history["timestamp"]).astype(int) > 0)
+    assert history["hash_price"][-1] == points[0]["hash_price"]
+    assert log_returns(history).shape == (9, len(PRICE_FIELDS))
+
+
+def test_calibration_recovers_correlation():
+    model = calibrate(HISTORY)
+    assert np.allclose(np.diag(model["correlation"]), 1.0)
+    assert model["correlation"][0, 1] == pytest.approx(0.6, abs=0.06)
+    assert model["correlation"][0, 2] == pytest.approx(-0.3, abs=0.06)
+    assert model["tick_seconds"] == 300
+
+
+def test_simulation_is_deterministic_and_independent_of_workers():
+    model = calibrate(HISTORY)
+    a = simulate_pnl(model, EXPOSURES, (1, 12), n_paths=5_000, seed=7, chunk_paths=1_000)
+    b = simulate_pnl(model, EXPOSURES, (1, 12), n_paths=5_000, seed=7, chunk_paths=1_000, workers=2)
+    c = simulate_pnl(model, EXPOSURES, (1, 12), n_paths=5_000, seed=8, chunk_paths=1_000)
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, c)
+
+
+def test_simulated_var_matches_analytic_for_a_single_series():
+    model = calibrate(HISTORY)
+    pnl = simulate_pnl(model, {"hash_price": 1.0}, (4,), n_paths=200_000, seed=1)[:, 0]
+    spot, vol = model["spot"][0], model["vol"][0] * 2.0  # sqrt(4 ticks)
+    analytic = spot * (1 - np.exp(-1.6448536 * vol))
+    assert risk_measures(pnl, (0.95,))[0.95]["var"] == pytest.approx(analytic, rel=0.02)
+
+
+def test_risk_measures_on_known_sample():
+    measures = risk_measures(np.arange(-50, 50, dtype=float), (0.95,))[0.95]
+    assert measures == {"var": 46.0, "es": 48.0}
+
+
+def test_portfolio_var_grows_with_horizon_and_confidence():
+    result = portfolio_var(HISTORY, EXPOSURES, horizons=(12, 1), n_paths=20_000)
+    assert [h["ticks"] for h in result["horizons"]] == [1, 12]
+    short, long = (h["measures"] for h in result["horizons"])
+    assert long["0.95"]["var"] > short["0.95"]["var"]
+    assert short["0.99"]["es"] >= short["0.99"]["var"] >= short["0.95"]["var"]
+
+
+def test_var_route(tmp_path, monkeypatch):
+    path = tmp_path / "prices.json"
+    path.write_text(json.dumps(synthetic_history(500)))
+    client = app.test_client()
+
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(tmp_path / "missing.json"))
+    assert client.post("/risk/var", json={"exposures": EXPOSURES}).status_code == 404
+
+    monkeypatch.setenv("PRICE_HISTORY_FILE", str(path))
+    response = client.post("/risk/var", json={"exposures": EXPOSURES, "paths": 2_000, "horizons": [1]})
+    assert response.status_code == 200
+    assert response.get_json()["horizons"][0]["measures"]["0.99"]["var"] > 0
+    assert client.post("/risk/var", json={"exposures": {"btc": 1}}).status_code == 400
+    assert client.post("/risk/var", json={}).status_code == 400
+    for confidence in ([0.0], [1.0], [1.5], [-0.1], ["nan"], [0.95, 1.0]):
+        response = client.post("/risk/var", json={"exposures": EXPOSURES, "paths": 2_000, "confidence": confidence})
+        assert response.status_code == 400, confidence
+        assert "between 0 and 1" in response.get_json()["error"]
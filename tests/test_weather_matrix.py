@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+from app.weather_matrix import WEATHER_VARIABLES, build_weather_matrix, load_weather_matrix, synthetic_sites
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVED_DATA = os.path.join(ROOT, "saved_data.json")
+
+
+def test_saved_data_packs_onto_utc_hours(tmp_path):
+    with open(SAVED_DATA) as f:
+        sites = json.load(f)["sites"]
+    matrix = load_weather_matrix(SAVED_DATA, str(tmp_path / "weather.npy"))
+    assert isinstance(matrix.data, np.memmap)
+    assert matrix.shape == (len(sites), matrix.times.size, len(WEATHER_VARIABLES))
+    assert np.all(np.diff(matrix.times) == np.timedelta64(1, "h"))
+
+    for site in sites:
+        hourly = site["weather"].get("hourly")
+        row = matrix.site(site["name"])
+        if not hourly:
+            assert np.isnan(row).all()
+            continue
+        # First local hour shifted to UTC by the site's offset
+        offset = site["weather"]["utc_offset_seconds"] // 3600
+        start = matrix.time_index(np.datetime64(hourly["time"][0], "h") - np.timedelta64(offset, "h"))
+        for k, name in enumerate(WEATHER_VARIABLES):
+            assert np.allclose(row[start:start + 168, k], hourly[name])
+        assert np.isnan(row[:start]).all() and np.isnan(row[start + 168:]).all()
+
+    means = matrix.site_means()
+    i = matrix.site_index("Findlay, OH")
+    hourly = sites[i]["weather"]["hourly"]
+    assert np.isclose(means["cloud_cover"][i], np.mean(hourly["cloud_cover"]))
+    assert np.isnan(means["temperature_2m"][matrix.site_index("Murray, KY")])
+
+
+def test_cache_is_reused_until_source_changes(tmp_path):
+    source = tmp_path / "saved_data.json"
+    cache = str(tmp_path / "weather.npy")
+    sites = synthetic_sites(5, hours=24)
+    source.write_text(json.dumps({"sites": sites}))
+
+    first = load_weather_matrix(str(source), cache)
+    built_at = os.stat(cache).st_mtime_ns
+    second = load_weather_matrix(str(source), cache)
+    assert os.stat(cache).st_mtime_ns == built_at
+    assert np.array_equal(first.data, second.data, equal_nan=True)
+
+    sites[0]["weather"]["hourly"]["temperature_2m"][0] = 99.0
+    extra = synthetic_sites(1, hours=24, seed=1)
+    extra[0]["name"] = "Site 5"
+    source.write_text(json.dumps({"sites": sites + extra}))
+    third = load_weather_matrix(str(source), cache)
+    assert third.shape[0] == 6
+    temperature = third.site("Site 0")[:, 0]
+    assert temperature[~np.isnan(temperature)][0] == 99.0
+
+
+def test_build_handles_missing_values():
+    sites = synthetic_sites(2, hours=3)
+    sites[1]["weather"]["hourly"]["cloud_cover"][1] = None
+    matrix = build_weather_matrix(sites + [{"name": "Empty", "weather": None}])
+    assert matrix.shape[0] == 3
+    assert np.isnan(matrix.variable("cloud_cover")[2]).all()
+    assert np.isnan(matrix.variable("cloud_cover")[1]).sum() == matrix.times.size - 2
+
+
+def test_half_hour_offsets_round_to_the_nearest_hour():
+    hourly = {"time": ["2025-06-21T12:00"], "temperature_2m": [20.0]}
+    sites = [{"name": name, "weather": {"utc_offset_seconds": offset, "hourly": hourly}}
+             for name, offset in (("St. John's", -12600), ("Mumbai", 19800), ("Kathmandu", 20700))]
+    matrix = build_weather_matrix(sites, ("temperature_2m",))
+    utc = {name: str(matrix.times[~np.isnan(matrix.site(name)[:, 0])][0]) for name in matrix.sites}
+    assert utc == {"St. John's": "2025-06-21T15", "Mumbai": "2025-06-21T06", "Kathmandu": "2025-06-21T06"}
+
+
+def test_matrix_without_its_sidecar_is_rebuilt(tmp_path):
+    source = tmp_path / "saved_data.json"
+    cache = str(tmp_path / "weather.npy")
+    sites = synthetic_sites(3, hours=24)
+    source.write_text(json.dumps({"sites": sites}))
+    load_weather_matrix(str(source), cache)
+
+    # A crash between the two renames: another matrix, the old sidecar
+    np.save(cache, np.zeros((3, 7, 2), dtype=np.float32))
+    matrix = load_weather_matrix(str(source), cache)
+    assert np.array_equal(matrix.data, build_weather_matrix(sites).data, equal_nan=True)
+    assert isinstance(matrix.data, np.memmap)